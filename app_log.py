@@ -0,0 +1,109 @@
+"""日志子系统：有界环形缓冲 + 可选的异步滚动日志文件
+
+任意线程调用 log() 只做级别判断和一次入队；界面按帧批量取出写入文本框，
+文件写入由后台线程完成。被级别或组件过滤掉的日志在格式化之前就被丢弃。
+"""
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+def _level_value(level):
+    if isinstance(level, int):
+        return level
+    return LEVELS.get(str(level).upper(), logging.INFO)
+
+
+class LogBuffer:
+    """线程安全的有界日志缓冲"""
+    def __init__(self, capacity=1000, level="INFO", component_levels=None):
+        self.capacity = capacity
+        self.lines = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.level = _level_value(level)
+        self.component_levels = {}
+        self.set_component_levels(component_levels or {})
+        self._file_queue = None
+        self._file_listener = None
+        self._file_logger = None
+
+    def resize(self, capacity):
+        """调整缓冲容量，保留最近的日志"""
+        with self._lock:
+            self.capacity = capacity
+            self.lines = deque(self.lines, maxlen=capacity)
+            self._pending = deque(self._pending, maxlen=capacity)
+
+    def set_level(self, level):
+        self.level = _level_value(level)
+
+    def set_component_levels(self, component_levels):
+        """按组件设置最低级别，如 {"lazyload": "WARNING"}"""
+        self.component_levels = {k: _level_value(v) for k, v in component_levels.items()}
+
+    def enabled(self, level, component="app"):
+        return _level_value(level) >= self.component_levels.get(component, self.level)
+
+    def log(self, message, level="INFO", component="app"):
+        """记录一条日志，返回是否被接受"""
+        value = _level_value(level)
+        if value < self.component_levels.get(component, self.level):
+            return False
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        line = f"[{timestamp}] {message}"
+        with self._lock:
+            self.lines.append(line)
+            self._pending.append(line)
+        file_logger = self._file_logger
+        if file_logger is not None:
+            file_logger.log(value, "[%s] %s", component, message)
+        return True
+
+    def drain(self):
+        """取出尚未显示的日志行（供界面批量写入）"""
+        with self._lock:
+            if not self._pending:
+                return []
+            pending = list(self._pending)
+            self._pending.clear()
+            return pending
+
+    def open_file(self, path, max_bytes=1024 * 1024, backup_count=3):
+        """开启滚动日志文件，写文件在后台线程进行"""
+        self.close_file()
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        self._file_queue = queue.SimpleQueue()
+        self._file_listener = logging.handlers.QueueListener(self._file_queue, handler)
+        self._file_listener.start()
+
+        logger = logging.getLogger(f"{__name__}.{id(self)}")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.handlers = [logging.handlers.QueueHandler(self._file_queue)]
+        self._file_logger = logger
+
+    def close_file(self):
+        """停止后台写线程并刷新剩余日志"""
+        if self._file_listener is None:
+            return
+        self._file_logger = None
+        self._file_listener.stop()
+        for handler in self._file_listener.handlers:
+            handler.close()
+        self._file_listener = None
+        self._file_queue = None
@@ -0,0 +1,105 @@
+"""可选的 asyncio HTTP 引擎（需要 httpx，安装 h2 后启用 HTTP/2）
+
+事件循环运行在独立的后台线程中，不阻塞 Tk 主循环：
+- 同步调用方（GitHubImageManager 的各个方法）通过 request() 把请求交给事件循环并等待结果；
+- 缩略图加载通过 download() 直接拿到 concurrent.futures.Future，不占用线程，
+  几百个小文件可以同时在同一条 HTTP/2 连接上复用。
+download() 与 github_manager.request 一样按调用线程的优先级申请 net_scheduler 名额
+（在事件循环中等待，不占用线程），并记录指标与追踪 span。
+总并发数另由 asyncio.Semaphore 限制。未安装 httpx 时 available() 返回 False，程序继续使用 requests。
+"""
+import asyncio
+import importlib.util
+import threading
+import time
+
+import metrics
+import net_scheduler
+import tracing
+
+
+def available():
+    return importlib.util.find_spec("httpx") is not None
+
+
+def http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+class AsyncEngine:
+    """在后台线程的事件循环上运行的共享 httpx.AsyncClient"""
+    def __init__(self, max_concurrent=64, http2=None, timeout=60.0):
+        import httpx
+
+        self.http2 = http2_available() if http2 is None else http2
+        self.max_concurrent = max_concurrent
+        self._httpx = httpx
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-http", daemon=True)
+        self._thread.start()
+        self._semaphore = None
+        self._client = None
+        asyncio.run_coroutine_threadsafe(self._setup(timeout), self._loop).result()
+
+    async def _setup(self, timeout):
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._client = self._httpx.AsyncClient(
+            http2=self.http2,
+            timeout=self._httpx.Timeout(timeout),
+            limits=self._httpx.Limits(max_connections=self.max_concurrent),
+            follow_redirects=True
+        )
+
+    async def request_async(self, method, url, **kwargs):
+        # requests 的 stream 参数在这里不需要：响应体总是完整读取
+        kwargs.pop("stream", None)
+        async with self._semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    def submit(self, coro):
+        """把协程交给事件循环执行，返回 concurrent.futures.Future（可 cancel）"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def request(self, method, url, **kwargs):
+        """同步接口：在调用线程中等待结果，返回 httpx.Response"""
+        return self.submit(self.request_async(method, url, **kwargs)).result()
+
+    async def _download(self, url, timeout, cls):
+        endpoint = metrics.endpoint_of(url)
+        with tracing.span(f"http.{endpoint}", method="GET", url=url, engine="async") as span:
+            async with net_scheduler.slot_async(cls):
+                start = time.perf_counter()
+                try:
+                    response = await self.request_async("GET", url, timeout=timeout)
+                except Exception:
+                    metrics.record_request("GET", url, "error", time.perf_counter() - start)
+                    raise
+                received = len(response.content)
+                metrics.record_request(
+                    "GET", url, response.status_code, time.perf_counter() - start, 0, received, response.headers
+                )
+                span.set(status=response.status_code, bytes_received=received)
+        if response.status_code != 200:
+            raise Exception(f"下载失败: HTTP {response.status_code}")
+        return response.content
+
+    def download(self, url, timeout=30, priority=None):
+        """异步下载，返回 Future（结果为响应体字节）
+
+        priority 为 net_scheduler 的优先级，未指定时使用调用线程当前的优先级。
+        """
+        if priority is None:
+            priority = net_scheduler.current_priority()
+        return self.submit(self._download(url, timeout, priority))
+
+    def network_errors(self):
+        return (self._httpx.TransportError,)
+
+    def close(self):
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=5)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,157 @@
+"""端到端性能基准：基于本地模拟服务器测量 GitHubImageManager 的各项操作
+
+模拟服务器在独立进程中运行，峰值内存（tracemalloc）只统计客户端一侧。
+对每个仓库规模分别测量 list / tree / upload / rename / delete / thumbnail，
+输出 ops/s、p50/p99 延迟与峰值内存，可用 --json 保存以便在不同提交间比较。
+
+用法:
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --sizes 10,1000,50000 --ops 50 --latency 0.02 --json e2e.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from github_manager import GitHubImageManager, http  # noqa: E402
+
+
+def start_server(latency, jitter, error_rate):
+    """启动模拟服务器子进程，返回 (进程, 客户端配置)"""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "fake_github.py"), "--port", "0",
+         "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate),
+         "--rate-limit", str(10 ** 9)],
+        stdout=subprocess.PIPE, text=True
+    )
+    config = json.loads(proc.stdout.readline())
+    return proc, config
+
+
+def control(config, **payload):
+    response = http().post(f"{config['api_base']}/_control", json=payload)
+    response.raise_for_status()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(name, items, func):
+    """对每个 item 调用 func，记录延迟与峰值内存"""
+    latencies = []
+    errors = 0
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        try:
+            func(item)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "op": name,
+        "count": len(latencies),
+        "errors": errors,
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else 0.0,
+        "peak_mem_kb": peak / 1024,
+    }
+
+
+def make_thumbnail(data):
+    """与界面相同的缩略图处理（需要 PIL）"""
+    import thumbnail_render
+
+    return thumbnail_render.render(data)[0]
+
+
+def bench_size(config, size, ops, repeat):
+    from fake_github import make_png
+
+    control(config, reset=True, seed={"path": "images", "count": size})
+    config = dict(config, path="images")
+    results = []
+
+    results.append(measure("list", range(repeat), lambda _: GitHubImageManager.list_image_items(config)))
+    results.append(measure("tree", range(repeat), lambda _: GitHubImageManager.get_tree(config)))
+
+    items = GitHubImageManager.list_image_items(config)[:ops]
+
+    if importlib.util.find_spec("PIL") is not None:
+        thumbnail = lambda item: make_thumbnail(GitHubImageManager.download(item["download_url"]))
+        thumb_name = "thumbnail"
+    else:
+        thumbnail = lambda item: GitHubImageManager.download(item["download_url"])
+        thumb_name = "thumbnail_fetch"
+    results.append(measure(thumb_name, items, thumbnail))
+
+    new_files = [(f"images/new_{i:06d}.png", make_png(64, 48, (i % 256, 7, 9))) for i in range(ops)]
+    results.append(measure(
+        "upload", new_files,
+        lambda entry: GitHubImageManager.upload_content(entry[1], entry[0], "bench upload", config)
+    ))
+
+    half = len(items) // 2
+    results.append(measure(
+        "rename", items[:half],
+        lambda item: GitHubImageManager.rename_path(item["path"], "renamed_" + item["name"], config, item=item)
+    ))
+    results.append(measure(
+        "delete", items[half:],
+        lambda item: GitHubImageManager.delete_path(item["path"], config, sha=item["sha"])
+    ))
+
+    for result in results:
+        result["size"] = size
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端性能基准（本地模拟服务器）")
+    parser.add_argument("--sizes", default="10,100,1000,10000,50000", help="仓库图片数量，逗号分隔")
+    parser.add_argument("--ops", type=int, default=20, help="每项写操作/缩略图的次数")
+    parser.add_argument("--repeat", type=int, default=5, help="列表操作的重复次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟网络延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+    proc, config = start_server(args.latency, args.jitter, args.error_rate)
+    all_results = []
+    try:
+        print(f"{'size':>7} {'op':<16} {'count':>5} {'err':>4} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'peak KB':>9}")
+        for size in [int(s) for s in args.sizes.split(",") if s]:
+            for r in bench_size(config, size, min(args.ops, size), args.repeat):
+                all_results.append(r)
+                print(f"{r['size']:>7} {r['op']:<16} {r['count']:>5} {r['errors']:>4} {r['ops_per_sec']:>9.1f} "
+                      f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['peak_mem_kb']:>9.1f}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": all_results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""HTTP 引擎基准：线程池 + requests 与 async_http 引擎（httpx）并发下载缩略图原图的对比
+
+默认使用本地模拟服务器（仅 HTTP/1.1，对比的是线程与事件循环的开销）；用 --urls 传入
+真实的 raw 地址列表（每行一个，HTTPS）即可测量 HTTP/2 多路复用的效果。
+每种方式在独立子进程中运行，分别报告吞吐、单请求 p50/p99、峰值线程数与峰值 RSS。
+
+用法:
+    python benchmarks/bench_http.py --count 300 --concurrency 8,64 --latency 0.05
+    python benchmarks/bench_http.py --urls urls.txt --concurrency 64 --json http.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_e2e import control, percentile, start_server  # noqa: E402
+
+
+class ThreadSampler:
+    """后台采样进程内的线程数"""
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.peak - 1   # 不计采样线程本身
+
+
+def run_threaded(urls, concurrency):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from github_manager import http
+
+    session = http().Session()
+    adapter = http().adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def fetch(url):
+        t0 = time.perf_counter()
+        response = session.get(url, timeout=30)
+        response.raise_for_status()
+        return time.perf_counter() - t0, len(response.content), f"HTTP/{response.raw.version / 10:.1f}"
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(fetch, urls))
+
+
+def run_async(urls, concurrency):
+    import async_http
+
+    engine = async_http.AsyncEngine(concurrency)
+
+    async def fetch(url):
+        t0 = time.perf_counter()
+        response = await engine.request_async("GET", url, timeout=30)
+        response.raise_for_status()
+        return time.perf_counter() - t0, len(response.content), response.http_version
+
+    try:
+        futures = [engine.submit(fetch(url)) for url in urls]
+        return [future.result() for future in futures]
+    finally:
+        engine.close()
+
+
+def run_mode(mode, urls, concurrency):
+    """在当前（子）进程内运行一种方式并返回结果"""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sampler = ThreadSampler()
+    start = time.perf_counter()
+    rows = (run_async if mode == "async" else run_threaded)(urls, concurrency)
+    elapsed = time.perf_counter() - start
+    peak_threads = sampler.stop()
+    latencies = [row[0] for row in rows]
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "count": len(rows),
+        "bytes": sum(row[1] for row in rows),
+        "protocol": ",".join(sorted({row[2] for row in rows})),
+        "req_per_sec": len(rows) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_threads": peak_threads,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_growth_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+    }
+
+
+def run_isolated(mode, urls, concurrency):
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--concurrency", str(concurrency)],
+        input=json.dumps(urls), capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"mode": mode, "concurrency": concurrency, "error": proc.stderr.strip().splitlines()[-1]}
+    return json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 引擎基准（requests 线程池 vs asyncio）")
+    parser.add_argument("--count", type=int, default=300, help="模拟服务器上的图片数量")
+    parser.add_argument("--concurrency", default="8,64", help="并发数，逗号分隔")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟网络延迟（秒）")
+    parser.add_argument("--urls", help="改用文件中的真实地址（每行一个）")
+    parser.add_argument("--modes", default="threaded,async")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        urls = json.loads(sys.stdin.read())
+        print(json.dumps(run_mode(args.child, urls, int(args.concurrency))))
+        return
+
+    proc = None
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        from github_manager import GitHubImageManager
+
+        proc, config = start_server(args.latency, 0.0, 0.0)
+        control(config, reset=True, seed={"path": "images", "count": args.count})
+        items = GitHubImageManager.list_image_items(dict(config, path="images"))
+        urls = [item["download_url"] for item in items]
+
+    results = []
+    try:
+        print(f"{'mode':<9} {'conc':>5} {'count':>6} {'proto':<9} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} "
+              f"{'threads':>7} {'rss KB':>9}")
+        for concurrency in [int(c) for c in args.concurrency.split(",") if c]:
+            for mode in args.modes.split(","):
+                r = run_isolated(mode, urls, concurrency)
+                results.append(r)
+                if "error" in r:
+                    print(f"{mode:<9} {concurrency:>5}  失败: {r['error']}")
+                    continue
+                print(f"{r['mode']:<9} {r['concurrency']:>5} {r['count']:>6} {r['protocol']:<9} "
+                      f"{r['req_per_sec']:>9.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                      f"{r['peak_threads']:>7} {r['peak_rss_kb']:>9}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""图片记录内存基准：构建 N 条记录的图片库（含一个排序视图）并测量占用的内存
+
+index ms 为 reset 加首次按名称排序查询的耗时。
+
+用法:
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --counts 10000,100000 --json records.json
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from image_library import ImageLibrary, SortMode, make_record  # noqa: E402
+
+
+def synthetic_items(count):
+    """与 contents API 返回格式相同的条目"""
+    return [
+        {
+            "name": f"img_{i:07d}.png",
+            "path": f"images/{i % 100:02d}/img_{i:07d}.png",
+            "sha": f"{i:040x}",
+            "size": 1000 + i % 50000,
+            "download_url": f"https://raw.githubusercontent.com/owner/repo/main/images/{i % 100:02d}/img_{i:07d}.png",
+        }
+        for i in range(count)
+    ]
+
+
+def measure(count):
+    items = synthetic_items(count)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = [make_record(item) for item in items]
+    build = time.perf_counter() - start
+    records_bytes = tracemalloc.get_traced_memory()[0]
+
+    library = ImageLibrary()
+    start = time.perf_counter()
+    library.reset(records)
+    library.query(SortMode.NAME_ASC)
+    query = time.perf_counter() - start
+    del records
+    gc.collect()
+    total_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "count": count,
+        "records_bytes": records_bytes,
+        "library_bytes": total_bytes,
+        "bytes_per_image": total_bytes / count,
+        "build_ms": build * 1000,
+        "index_ms": query * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="图片记录内存基准")
+    parser.add_argument("--counts", default="1000,10000,100000", help="记录数量，逗号分隔")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'count':>8} {'records MB':>11} {'library MB':>11} {'B/image':>8} {'build ms':>9} {'index ms':>9}")
+    for count in [int(c) for c in args.counts.split(",") if c]:
+        r = measure(count)
+        results.append(r)
+        print(f"{r['count']:>8} {r['records_bytes'] / 2 ** 20:>11.1f} {r['library_bytes'] / 2 ** 20:>11.1f} "
+              f"{r['bytes_per_image']:>8.0f} {r['build_ms']:>9.1f} {r['index_ms']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""启动时间基准测试
+
+多次冷启动 main.py，记录从进程创建到首帧绘制、到第一张缩略图显示的时间；
+同时测量 cli.py 的启动时间。结果可用 --json 保存，便于在不同提交之间比较。
+
+用法:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --runs 10 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_gui_once(timeout):
+    """启动一次图形界面，返回 {阶段: 秒}"""
+    env = dict(os.environ, GHIU_STARTUP_BENCH="1")
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py")],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    marks = {}
+    try:
+        out, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        out, _ = proc.communicate()
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) == 3 and parts[0] == "STARTUP":
+            marks[parts[1]] = float(parts[2]) - start
+    return marks
+
+
+def run_cli_once():
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "cli.py"), "--help"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+    )
+    return {"cli_help": time.perf_counter() - start}
+
+
+def summarize(samples):
+    summary = {}
+    keys = sorted({k for s in samples for k in s})
+    for key in keys:
+        values = sorted(s[key] for s in samples if key in s)
+        summary[key] = {
+            "runs": len(values),
+            "min": values[0],
+            "median": statistics.median(values),
+            "max": values[-1],
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动时间基准测试")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="单次GUI启动的超时秒数")
+    parser.add_argument("--skip-gui", action="store_true", help="只测命令行启动（无显示环境时使用）")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        sample = run_cli_once()
+        if not args.skip_gui:
+            sample.update(run_gui_once(args.timeout))
+        samples.append(sample)
+
+    summary = summarize(samples)
+    for key, stats in summary.items():
+        print(f"{key:<16} runs={stats['runs']:<3} min={stats['min'] * 1000:8.1f}ms "
+              f"median={stats['median'] * 1000:8.1f}ms max={stats['max'] * 1000:8.1f}ms")
+    if "first_thumbnail" not in summary and not args.skip_gui:
+        print("未记录到首张缩略图（config.json 未配置或仓库为空）")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"samples": samples, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""缩略图渲染微基准：分阶段计时与峰值内存
+
+用合成的 PNG / JPEG / GIF（100 KB ~ 30 MB，随机噪声，几乎不可压缩）测量
+thumbnail_render 的每个阶段：decode / fit / mask / putalpha / ctkimage / compact。
+每个用例在独立子进程中运行，峰值内存取进程 RSS 峰值（PIL 的像素内存不经过
+tracemalloc，因此不能只统计 Python 分配）。
+
+结果可保存为 JSON，并与之前的结果比较，超过阈值的阶段视为性能回退：
+    python benchmarks/bench_thumbnail.py --json thumb.json
+    python benchmarks/bench_thumbnail.py --compare thumb.json --threshold 0.2
+
+benchmarks/baselines/thumbnail.json 是一次默认参数运行的参考结果（机器信息见其中的 meta）。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FORMATS = ("PNG", "JPEG", "GIF")
+DEFAULT_SIZES = "100K,1M,5M,30M"
+STAGES = ("decode", "fit", "mask", "putalpha", "ctkimage", "compact")
+# 噪声图像每像素大约占用的字节数，用于估算尺寸
+BYTES_PER_PIXEL = {"PNG": 3.0, "JPEG": 1.6, "GIF": 1.1}
+
+
+def parse_size(text):
+    units = {"K": 1024, "M": 1024 * 1024}
+    text = text.strip().upper()
+    if text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def _encode(fmt, width, height):
+    import io
+    from PIL import Image
+
+    if fmt == "GIF":
+        img = Image.frombytes("P", (width, height), os.urandom(width * height))
+        img.putpalette(list(range(256)) * 3)
+    else:
+        img = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    buffer = io.BytesIO()
+    options = {"quality": 90} if fmt == "JPEG" else {}
+    img.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def make_input(fmt, target_bytes):
+    """生成接近目标大小的合成图片（4:3），估算一次后按实际大小修正"""
+    pixels = target_bytes / BYTES_PER_PIXEL[fmt]
+    for _ in range(2):
+        width = max(16, int((pixels * 4 / 3) ** 0.5))
+        height = max(12, width * 3 // 4)
+        data = _encode(fmt, width, height)
+        pixels = pixels * target_bytes / len(data)
+    return data, width, height
+
+
+def _max_rss_kb():
+    """本进程的峰值 RSS（KB）
+
+    Linux 上 ru_maxrss 在 exec 后保留父进程的峰值（父进程生成大图时很高），
+    因此优先读取 /proc/self/status 中只属于当前进程映像的 VmHWM。
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_case(path, repeat):
+    """在当前（子）进程中测量一个输入文件，返回各阶段耗时与内存增量"""
+    import thumbnail_render
+    from thumbnail_cache import ThumbnailCache
+
+    try:
+        import customtkinter as ctk
+    except ImportError:
+        ctk = None
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    timings = {stage: [] for stage in STAGES}
+    rss_delta = {}
+    cache = ThumbnailCache()
+    baseline = _max_rss_kb()
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        timings[stage].append((time.perf_counter() - start) * 1000)
+        if first and baseline is not None:
+            rss_delta[stage] = _max_rss_kb() - baseline
+        return result
+
+    for i in range(repeat):
+        first = i == 0
+        img = timed("decode", thumbnail_render.decode, data)
+        thumb = timed("fit", thumbnail_render.fit, img)
+        mask = timed("mask", thumbnail_render.rounded_mask)
+        thumb = timed("putalpha", thumbnail_render.apply_mask, thumb, mask)
+        if ctk is not None:
+            timed("ctkimage", lambda t: ctk.CTkImage(light_image=t, dark_image=t, size=thumbnail_render.THUMB_SIZE), thumb)
+        timed("compact", cache.store_compact, "bench", thumb)
+        del img, thumb, mask
+
+    stages = {}
+    for stage, values in timings.items():
+        if values:
+            stages[stage] = {
+                "median_ms": statistics.median(values),
+                "min_ms": min(values),
+                "max_ms": max(values),
+                "peak_rss_delta_kb": rss_delta.get(stage),
+            }
+    total = sum(s["median_ms"] for s in stages.values())
+    return {"stages": stages, "total_ms": total, "peak_rss_kb": _max_rss_kb()}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file, threshold):
+    """与基线比较各阶段中位耗时，返回回退的条目"""
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = {(r["format"], r["target"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["format"], r["target"]))
+        if not old:
+            continue
+        for stage, stats in r["stages"].items():
+            before = old["stages"].get(stage, {}).get("median_ms")
+            if before and stats["median_ms"] > before * (1 + threshold):
+                regressions.append((r["format"], r["target"], stage, before, stats["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缩略图渲染微基准")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="输入文件大小，如 100K,1M,30M")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复次数")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    parser.add_argument("--compare", help="与之前保存的JSON结果比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对变慢比例")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        json.dump(run_case(args.case, args.repeat), sys.stdout)
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'format':<6} {'target':>6} {'bytes':>10} {'pixels':>11} "
+              + " ".join(f"{s:>9}" for s in STAGES) + f" {'peak MB':>8}")
+        for fmt in [f.strip().upper() for f in args.formats.split(",") if f.strip()]:
+            for target in [s.strip() for s in args.sizes.split(",") if s.strip()]:
+                data, width, height = make_input(fmt, parse_size(target))
+                path = os.path.join(tmp, f"{fmt}_{target}.{fmt.lower()}")
+                with open(path, "wb") as f:
+                    f.write(data)
+                del data
+                output = subprocess.check_output(
+                    [sys.executable, os.path.abspath(__file__), "--case", path, "--repeat", str(args.repeat)],
+                    text=True
+                )
+                result = dict(json.loads(output), format=fmt, target=target,
+                              bytes=os.path.getsize(path), width=width, height=height)
+                results.append(result)
+                cells = " ".join(
+                    f"{result['stages'][s]['median_ms']:>9.2f}" if s in result["stages"] else f"{'-':>9}"
+                    for s in STAGES
+                )
+                peak = result["peak_rss_kb"] / 1024 if result["peak_rss_kb"] else 0
+                print(f"{fmt:<6} {target:>6} {result['bytes']:>10} {f'{width}x{height}':>11} {cells} {peak:>8.1f}")
+
+    if args.json:
+        try:
+            import PIL
+            pillow = PIL.__version__
+        except ImportError:
+            pillow = None
+        meta = {"commit": _git_commit(), "python": platform.python_version(), "pillow": pillow,
+                "platform": platform.platform(), "repeat": args.repeat}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for fmt, target, stage, before, after in regressions:
+            print(f"回退: {fmt} {target} {stage} {before:.2f} ms -> {after:.2f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
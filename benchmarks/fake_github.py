@@ -0,0 +1,490 @@
+"""本地 GitHub API 模拟服务器（仅标准库）
+
+模拟 GitHubImageManager 用到的接口，便于在没有网络和 GitHub 账号时做测试与基准：
+- contents：GET（目录/文件）、PUT（创建/更新）、DELETE，目录列表最多返回 1000 项（与 GitHub 一致）
+- git 数据：trees（含 branch:path 与 recursive）、blobs、commits、ref 读取与快进更新
+- raw：/raw/{owner}/{repo}/{branch}/{path}
+- graphql：仅支持按路径查询最近一次提交时间（history(first: 1, path: ...) 别名）
+- 速率限制响应头（X-RateLimit-*），额度耗尽时返回 403
+- 可注入的延迟与错误率，运行中可通过 POST /_control 调整
+
+用法:
+    python benchmarks/fake_github.py --port 8765 --latency 0.05
+    然后在 config.json 中设置:
+        "api_base": "http://127.0.0.1:8765", "raw_base": "http://127.0.0.1:8765/raw"
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+
+def _blob_sha(data):
+    return hashlib.sha1(f"blob {len(data)}\0".encode("ascii") + data).hexdigest()
+
+
+def _object_sha(kind, payload):
+    return hashlib.sha1(f"{kind}\0".encode("ascii") + payload.encode("utf-8")).hexdigest()
+
+
+def make_png(width, height, color):
+    """生成纯色 RGB PNG（不依赖 PIL），用于填充模拟仓库"""
+    row = b"\x00" + bytes(color) * width
+    raw = row * height
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data +
+                struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def synthetic_images(path, count, width=64, height=48):
+    """生成 count 张内容互不相同的图片：{仓库路径: PNG 字节}"""
+    prefix = f"{path.strip('/')}/" if path.strip("/") else ""
+    return {
+        f"{prefix}img_{i:06d}.png": make_png(width, height, (i % 256, (i // 256) % 256, (i // 65536) % 256))
+        for i in range(count)
+    }
+
+
+class FakeRepoStore:
+    """内存中的仓库：blob、扁平化的树（路径 -> blob sha）、提交与分支
+
+    树对象只保留最近的若干个，避免大仓库下每次提交复制整张文件表导致内存膨胀。
+    """
+    MAX_TREES = 64
+
+    def __init__(self, repo="owner/repo", branch="main"):
+        self.repo = repo
+        self.lock = threading.RLock()
+        self.blobs = {}
+        self.trees = OrderedDict()   # tree sha -> {路径: blob sha}
+        self._ids = itertools.count()
+        self.commits = {}    # commit sha -> {"tree", "parents", "message"}
+        self.branches = {}
+        self.dates = {}      # 分支 -> {路径: 最近一次提交时间}
+        self._commit({}, [], "Initial commit", branch)
+
+    def _tree(self, files):
+        sha = _object_sha("tree", str(next(self._ids)))
+        self.trees[sha] = dict(files)
+        while len(self.trees) > self.MAX_TREES:
+            self.trees.popitem(last=False)
+        return sha
+
+    def _commit(self, files, parents, message, branch=None):
+        tree = self._tree(files)
+        sha = _object_sha("commit", str(next(self._ids)))
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        if branch is not None:
+            self.branches[branch] = sha
+        return sha
+
+    def files(self, branch):
+        head = self.branches.get(branch)
+        if head is None:
+            return None
+        return self.trees[self.commits[head]["tree"]]
+
+    def put_blob(self, data):
+        sha = _blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def commit_files(self, branch, changes, message):
+        """在分支上提交变更（路径 -> 数据 bytes，None 表示删除）"""
+        with self.lock:
+            files = dict(self.files(branch) or {})
+            dates = self.dates.setdefault(branch, {})
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            for path, data in changes.items():
+                if data is None:
+                    files.pop(path, None)
+                    dates.pop(path, None)
+                else:
+                    files[path] = self.put_blob(data)
+                    dates[path] = now
+            parent = self.branches.get(branch)
+            return self._commit(files, [parent] if parent else [], message, branch)
+
+    def seed(self, files, branch="main", message="Seed"):
+        """批量写入初始文件（路径 -> bytes），只产生一次提交"""
+        return self.commit_files(branch, files, message)
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), store=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=5000, contents_limit=1000):
+        super().__init__(address, FakeGitHubHandler)
+        self.store = store or FakeRepoStore()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_remaining = rate_limit
+        self.rate_reset = int(time.time()) + 3600
+        self.contents_limit = contents_limit
+        self.request_count = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_config(self, **extra):
+        """返回可直接交给 GitHubImageManager 的配置"""
+        config = {
+            "token": "fake-token",
+            "repo": self.store.repo,
+            "branch": "main",
+            "path": "",
+            "custom_domain": "",
+            "api_base": self.base_url,
+            "raw_base": f"{self.base_url}/raw",
+        }
+        config.update(extra)
+        return config
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- 通用 ----
+    def _send(self, status, body=None, raw=None, content_type="application/json", rate_limited=True):
+        payload = raw if raw is not None else json.dumps(body if body is not None else {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        if rate_limited:
+            server = self.server
+            self.send_header("X-RateLimit-Limit", str(server.rate_limit))
+            self.send_header("X-RateLimit-Remaining", str(max(0, server.rate_remaining)))
+            self.send_header("X-RateLimit-Used", str(server.rate_limit - max(0, server.rate_remaining)))
+            self.send_header("X-RateLimit-Reset", str(server.rate_reset))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        self._send(status, {"message": message})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _inject(self, api=True):
+        """注入延迟、随机错误与速率限制，返回是否已发送错误响应"""
+        server = self.server
+        server.request_count += 1
+        delay = server.latency + (random.random() * server.jitter if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self._read_json()
+            self._error(502, "Injected server error")
+            return True
+        if api:
+            server.rate_remaining -= 1
+            if server.rate_remaining < 0:
+                self._read_json()
+                self._error(403, "API rate limit exceeded")
+                return True
+        return False
+
+    def _route(self, method):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = [unquote(p) for p in parsed.path.split("/") if p]
+
+        if parts[:1] == ["_control"] and method == "POST":
+            return self._control()
+        if parts[:1] == ["raw"]:
+            if self._inject(api=False):
+                return
+            return self._raw(parts[1:])
+        if parts == ["graphql"] and method == "POST":
+            if self._inject():
+                return
+            return self._graphql()
+        if len(parts) >= 4 and parts[0] == "repos" and "/".join(parts[1:3]) == self.server.store.repo:
+            if self._inject():
+                return
+            rest = parts[3:]
+            if rest[0] == "contents":
+                return self._contents(method, "/".join(rest[1:]), query)
+            if rest[0] == "git":
+                return self._git(method, rest[1:], query)
+        self._error(404, "Not Found")
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def _control(self):
+        data = self._read_json()
+        server = self.server
+        if data.get("reset"):
+            server.store = FakeRepoStore(server.store.repo)
+            server.rate_remaining = server.rate_limit
+            server.request_count = 0
+        if "seed" in data:
+            seed = data["seed"]
+            server.store.seed(synthetic_images(seed.get("path", ""), seed.get("count", 0),
+                                               seed.get("width", 64), seed.get("height", 48)))
+        for key in ("latency", "jitter", "error_rate", "contents_limit"):
+            if key in data:
+                setattr(server, key, data[key])
+        if "rate_limit" in data:
+            server.rate_limit = server.rate_remaining = data["rate_limit"]
+        self._send(200, {"ok": True}, rate_limited=False)
+
+    # ---- raw ----
+    def _raw(self, parts):
+        store = self.server.store
+        if len(parts) < 4:
+            return self._error(404, "Not Found")
+        branch, path = parts[2], "/".join(parts[3:])
+        with store.lock:
+            files = store.files(branch) or {}
+            sha = files.get(path)
+            data = store.blobs.get(sha) if sha else None
+        if data is None:
+            return self._send(404, raw=b"404: Not Found", content_type="text/plain", rate_limited=False)
+        self._send(200, raw=data, content_type="application/octet-stream", rate_limited=False)
+
+    # ---- graphql ----
+    _HISTORY = re.compile(r'(\w+): history\(first: 1, path: ("(?:[^"\\]|\\.)*")\)')
+
+    def _graphql(self):
+        data = self._read_json()
+        store = self.server.store
+        variables = data.get("variables") or {}
+        if f"{variables.get('owner')}/{variables.get('name')}" != store.repo:
+            return self._send(200, {"data": {"repository": None}, "errors": [{"message": "Could not resolve to a Repository"}]})
+        with store.lock:
+            if variables.get("ref") not in store.branches:
+                return self._send(200, {"data": {"repository": {"object": None}}})
+            dates = store.dates.get(variables["ref"], {})
+            commit = {}
+            for alias, literal in self._HISTORY.findall(data.get("query", "")):
+                date = dates.get(json.loads(literal))
+                commit[alias] = {"nodes": [{"committedDate": date}] if date else []}
+        self._send(200, {"data": {"repository": {"object": commit}}})
+
+    # ---- contents ----
+    def _item(self, path, sha, branch, data=None):
+        store = self.server.store
+        size = len(store.blobs[sha]) if data is None else len(data)
+        return {
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": sha,
+            "size": size,
+            "type": "file",
+            "url": f"{self.server.base_url}/repos/{store.repo}/contents/{quote(path)}?ref={branch}",
+            "download_url": f"{self.server.base_url}/raw/{store.repo}/{branch}/{quote(path)}",
+        }
+
+    def _contents(self, method, path, query):
+        store = self.server.store
+        if method == "GET":
+            branch = query.get("ref", ["main"])[0]
+            with store.lock:
+                files = store.files(branch)
+                if files is None:
+                    return self._error(404, "No commit found for the ref")
+                if path in files:
+                    item = self._item(path, files[path], branch)
+                    item["content"] = base64.b64encode(store.blobs[files[path]]).decode("ascii")
+                    item["encoding"] = "base64"
+                    return self._send(200, item)
+                prefix = f"{path}/" if path else ""
+                entries, dirs = [], set()
+                for file_path, sha in files.items():
+                    if not file_path.startswith(prefix):
+                        continue
+                    rest = file_path[len(prefix):]
+                    if "/" in rest:
+                        dirs.add(rest.split("/", 1)[0])
+                    else:
+                        entries.append(self._item(file_path, sha, branch))
+            if not entries and not dirs:
+                return self._error(404, "Not Found")
+            listing = [
+                {"name": d, "path": prefix + d, "type": "dir", "sha": "", "size": 0, "download_url": None}
+                for d in sorted(dirs)
+            ] + sorted(entries, key=lambda e: e["name"])
+            return self._send(200, listing[:self.server.contents_limit])
+
+        data = self._read_json()
+        branch = data.get("branch", "main")
+        with store.lock:
+            files = store.files(branch)
+            if files is None:
+                return self._error(404, "Branch not found")
+            current = files.get(path)
+            if method == "PUT":
+                if current is not None and data.get("sha") != current:
+                    return self._error(422, '"sha" wasn\'t supplied.' if not data.get("sha") else "sha does not match")
+                content = base64.b64decode(data.get("content", ""))
+                commit = store.commit_files(branch, {path: content}, data.get("message", ""))
+                item = self._item(path, _blob_sha(content), branch, content)
+                return self._send(201 if current is None else 200, {"content": item, "commit": {"sha": commit}})
+            if method == "DELETE":
+                if current is None:
+                    return self._error(404, "Not Found")
+                if data.get("sha") != current:
+                    return self._error(409, "sha does not match")
+                commit = store.commit_files(branch, {path: None}, data.get("message", ""))
+                return self._send(200, {"content": None, "commit": {"sha": commit}})
+        self._error(405, "Method Not Allowed")
+
+    # ---- git 数据 ----
+    def _git(self, method, parts, query):
+        store = self.server.store
+        kind = parts[0] if parts else ""
+        with store.lock:
+            if kind == "trees" and method == "GET":
+                return self._get_tree("/".join(parts[1:]), query)
+            if kind == "trees" and method == "POST":
+                data = self._read_json()
+                base = dict(store.trees.get(data.get("base_tree"), {}))
+                for entry in data.get("tree", []):
+                    if entry.get("sha") is None:
+                        base.pop(entry["path"], None)
+                    elif entry["sha"] not in store.blobs:
+                        return self._error(422, "Invalid blob sha")
+                    else:
+                        base[entry["path"]] = entry["sha"]
+                return self._send(201, {"sha": store._tree(base)})
+            if kind == "blobs" and method == "POST":
+                data = self._read_json()
+                sha = store.put_blob(base64.b64decode(data.get("content", "")))
+                return self._send(201, {"sha": sha})
+            if kind == "commits" and method == "POST":
+                data = self._read_json()
+                if data.get("tree") not in store.trees:
+                    return self._error(422, "Invalid tree")
+                sha = _object_sha("commit", str(next(store._ids)))
+                store.commits[sha] = {"tree": data["tree"], "parents": data.get("parents", []),
+                                      "message": data.get("message", "")}
+                return self._send(201, {"sha": sha, "tree": {"sha": data["tree"]}})
+            if kind == "commits" and method == "GET" and len(parts) == 2:
+                commit = store.commits.get(parts[1])
+                if commit is None:
+                    return self._error(404, "Not Found")
+                return self._send(200, {"sha": parts[1], "tree": {"sha": commit["tree"]},
+                                        "parents": [{"sha": p} for p in commit["parents"]],
+                                        "message": commit["message"]})
+            if kind in ("ref", "refs") and parts[1:2] == ["heads"]:
+                branch = "/".join(parts[2:])
+                head = store.branches.get(branch)
+                if method == "GET":
+                    if head is None:
+                        return self._error(404, "Not Found")
+                    return self._send(200, {"ref": f"refs/heads/{branch}", "object": {"sha": head, "type": "commit"}})
+                if method == "PATCH":
+                    data = self._read_json()
+                    new = store.commits.get(data.get("sha"))
+                    if new is None:
+                        return self._error(422, "Object does not exist")
+                    if not data.get("force") and head not in new["parents"]:
+                        return self._error(422, "Update is not a fast forward")
+                    store.branches[branch] = data["sha"]
+                    return self._send(200, {"ref": f"refs/heads/{branch}", "object": {"sha": data["sha"], "type": "commit"}})
+        self._error(404, "Not Found")
+
+    def _get_tree(self, tree_ish, query):
+        store = self.server.store
+        ref, _, path = tree_ish.partition(":")
+        if ref in store.branches:
+            files = store.trees[store.commits[store.branches[ref]]["tree"]]
+        elif ref in store.trees:
+            files = store.trees[ref]
+        else:
+            return self._error(404, "Not Found")
+        prefix = f"{path.strip('/')}/" if path.strip("/") else ""
+        recursive = query.get("recursive", ["0"])[0] not in ("0", "false", "")
+        entries, dirs = [], set()
+        for file_path, sha in sorted(files.items()):
+            if not file_path.startswith(prefix):
+                continue
+            rest = file_path[len(prefix):]
+            if "/" in rest:
+                segments = rest.split("/")
+                for depth in range(1, len(segments) if recursive else 2):
+                    dirs.add("/".join(segments[:depth]))
+                if not recursive:
+                    continue
+            entries.append({"path": rest, "mode": "100644", "type": "blob", "sha": sha,
+                            "size": len(store.blobs[sha])})
+        if prefix and not entries and not dirs:
+            return self._error(404, "Not Found")
+        tree = [{"path": d, "mode": "040000", "type": "tree", "sha": ""} for d in sorted(dirs)] + entries
+        self._send(200, {"sha": _object_sha("tree", tree_ish), "tree": tree, "truncated": False})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 GitHub API 模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--repo", default="owner/repo")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 502 的概率")
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = FakeGitHubServer(
+        (args.host, args.port), store=FakeRepoStore(args.repo), latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, rate_limit=args.rate_limit
+    )
+    # 第一行输出客户端配置（端口为 0 时包含实际端口），供基准脚本读取
+    print(json.dumps(server.client_config()), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
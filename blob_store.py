@@ -0,0 +1,157 @@
+"""以 git blob SHA 为键的本地内容存储
+
+同一份图片内容在本机只通过网络下载一次：缩略图、预览、保存到本地都从这里读取。
+内容由 SHA 唯一确定、永不改变，因此缓存不需要重新校验；写入前会校验 SHA，
+下载到的内容与 SHA 不符（远程文件已变化）时不写入。
+
+超出磁盘预算时按最近使用时间淘汰（使用时更新文件的修改时间，重启后仍然有效）。
+多个线程同时请求同一对象时只发起一次下载，其余线程等待结果。
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from github_manager import git_blob_sha
+from metrics import REGISTRY
+
+
+def default_directory():
+    """各平台的用户缓存目录"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "GitHubImageUploader", "blobs")
+
+
+class BlobStore:
+    """磁盘上的不可变对象存储：<目录>/ab/cdef...（SHA 前两位作为子目录）-> 内容"""
+    def __init__(self, directory=None, budget_bytes=512 * 1024 * 1024):
+        self.directory = directory or default_directory()
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._index = None        # sha -> 字节数，按最近使用排序（首次访问时扫描）
+        self._inflight = {}       # sha -> Future
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, sha):
+        return os.path.join(self.directory, sha[:2], sha[2:])
+
+    def _ensure_index(self):
+        """首次使用时扫描磁盘，按修改时间恢复使用顺序（调用方持有锁）"""
+        if self._index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for prefix in os.listdir(self.directory):
+                folder = os.path.join(self.directory, prefix)
+                if len(prefix) != 2 or not os.path.isdir(folder):
+                    continue
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_file() and not entry.name.endswith(".tmp"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, prefix + entry.name, stat.st_size))
+        entries.sort()
+        self._index = OrderedDict((sha, size) for _, sha, size in entries)
+        self.total_bytes = sum(self._index.values())
+
+    def __contains__(self, sha):
+        with self._lock:
+            self._ensure_index()
+            return sha in self._index
+
+    def get(self, sha):
+        """读取对象，不存在时返回None"""
+        with self._lock:
+            self._ensure_index()
+            if sha not in self._index:
+                return None
+            self._index.move_to_end(sha)
+        path = self._path(sha)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                size = self._index.pop(sha, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+        return data
+
+    def put(self, sha, data):
+        """校验后写入对象（先写临时文件再原子改名），返回是否写入"""
+        if git_blob_sha(data) != sha:
+            return False
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._ensure_index()
+            if sha not in self._index:
+                self._index[sha] = len(data)
+                self.total_bytes += len(data)
+            self._index.move_to_end(sha)
+            self._evict()
+        return True
+
+    def _evict(self):
+        """按最久未用顺序删除对象直到回到预算内（调用方持有锁）"""
+        while self.total_bytes > self.budget_bytes and len(self._index) > 1:
+            sha, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(sha))
+            except OSError:
+                pass
+
+    def fetch(self, sha, loader):
+        """读取对象；不存在时调用 loader() 下载并存入
+
+        同一 SHA 的并发请求只调用一次 loader，其余调用方等待并共享结果。
+        """
+        data = self.get(sha)
+        if data is not None:
+            self.hits += 1
+            REGISTRY.inc("ghiu_blob_store_requests_total", result="hit")
+            return data
+
+        with self._lock:
+            if sha in self._index:
+                stored = True   # 在上面的读取之后刚被其他线程写入
+            else:
+                stored = False
+                future = self._inflight.get(sha)
+                owner = future is None
+                if owner:
+                    future = self._inflight[sha] = Future()
+        if stored:
+            return self.fetch(sha, loader)
+        if not owner:
+            REGISTRY.inc("ghiu_blob_store_requests_total", result="shared")
+            return future.result()
+
+        self.misses += 1
+        REGISTRY.inc("ghiu_blob_store_requests_total", result="miss")
+        try:
+            data = loader()
+            try:
+                self.put(sha, data)
+            except OSError:
+                pass  # 磁盘写入失败不影响本次使用
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(sha, None)
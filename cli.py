@@ -0,0 +1,383 @@
+"""GitHub图床命令行工具（无界面，不导入任何GUI库）
+
+用法示例:
+    python cli.py upload a.png b.jpg --concurrency 4
+    python cli.py list --json
+    python cli.py delete images/a.png
+    python cli.py rename images/a.png b.png
+    python cli.py sync ./assets --delete
+    python cli.py watch ~/Pictures/Screenshots --markdown
+"""
+import argparse
+import json
+import os
+import sys
+
+import shards
+from github_manager import GitHubImageManager
+from partitions import PartitionLoader
+from repo_sync import plan_sync, apply_sync, upload_batch
+
+
+CONFIG_FILE = "config.json"
+MAX_FILE_SIZE = 25 * 1024 * 1024
+
+
+def load_config(args):
+    """读取配置文件，并用命令行参数/环境变量覆盖"""
+    config = {"token": "", "repo": "", "path": "", "branch": "main", "custom_domain": ""}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    if not config.get("token") and os.environ.get("GITHUB_TOKEN"):
+        config["token"] = os.environ["GITHUB_TOKEN"]
+    for key in ("token", "repo", "path", "branch", "custom_domain"):
+        value = getattr(args, key, None)
+        if value is not None:
+            config[key] = value
+    return config
+
+
+def _run_batched(items, func, concurrency, batch_size):
+    """分批并发执行 func(item)，返回 (item, 结果, 错误) 列表，保持输入顺序"""
+    results = []
+    if concurrency <= 1:
+        for item in items:
+            try:
+                results.append((item, func(item), None))
+            except Exception as e:
+                results.append((item, None, e))
+        return results
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    batch_size = batch_size or len(items) or 1
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for start in range(0, len(items), batch_size):
+            results.extend(pool.map(call, items[start:start + batch_size]))
+    return results
+
+
+def _emit(args, results, text_lines):
+    if args.json:
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for line in text_lines:
+            print(line)
+    return 0 if all(r.get("ok", True) for r in results) else 1
+
+
+def _shard_config(shard, config):
+    return config if not shard.name else shard.config(config)
+
+
+def _item_result(item, config, shard=None):
+    config = _shard_config(shard, config) if shard is not None else config
+    result = {
+        "path": item["path"],
+        "sha": item.get("sha"),
+        "size": item.get("size"),
+        "url": GitHubImageManager.url_scheme(config).display_url(item["path"]),
+        "ok": True,
+    }
+    if shard is not None and shard.name:
+        result["shard"] = shard.name
+    return result
+
+
+def _select_shard(args, config):
+    """--shard 指定的分片（未配置分片时为顶层仓库）"""
+    all_shards = shards.shards_from_config(config)
+    if not args.shard:
+        return all_shards[0]
+    for shard in all_shards:
+        if shard.name == args.shard:
+            return shard
+    raise Exception(f"未知的分片: {args.shard}")
+
+
+def _router(config):
+    """新上传使用的分片路由器；size 策略按仓库信息中的大小计算（每个分片只请求一次）"""
+    sizes = {}
+
+    def size_of(shard):
+        if shard not in sizes:
+            sizes[shard] = GitHubImageManager.repo_size(_shard_config(shard, config))
+        return sizes[shard]
+
+    return shards.router_from_config(config, shards.shards_from_config(config), size_of)
+
+
+def cmd_upload(args, config):
+    router = _router(config)
+    targets = {}
+    for file_path in args.files:
+        if args.shard:
+            targets[file_path] = _select_shard(args, config)
+        elif file_path == "-":
+            targets[file_path] = router.route(args.name or "-")
+        else:
+            targets[file_path] = router.route(os.path.basename(file_path), os.path.getsize(file_path))
+
+    def upload(file_path):
+        shard_config = _shard_config(targets[file_path], config)
+        if file_path == "-":
+            # 从标准输入读取数据，直接上传而不落地临时文件
+            if not args.name:
+                raise Exception("从标准输入上传时需要 --name 指定文件名")
+            return GitHubImageManager.upload_content(
+                sys.stdin.buffer,
+                GitHubImageManager.upload_path(shard_config, args.name),
+                f"Upload {args.name}",
+                shard_config
+            )
+        if os.path.getsize(file_path) > MAX_FILE_SIZE:
+            raise Exception("文件过大 (超过25MB)")
+        return GitHubImageManager.upload_image_item(file_path, shard_config)
+
+    results, lines = [], []
+    for file_path, item, error in _run_batched(args.files, upload, args.concurrency, args.batch_size):
+        if error is None:
+            result = dict(_item_result(item, config, targets[file_path]), file=file_path)
+            lines.append(f"上传成功: {file_path} -> {result['url']}")
+        else:
+            result = {"file": file_path, "ok": False, "error": str(error)}
+            lines.append(f"上传失败: {file_path}: {error}")
+        results.append(result)
+    return _emit(args, results, lines)
+
+
+def cmd_list(args, config):
+    all_shards = shards.shards_from_config(config)
+    if config.get("upload_layout"):
+        # 按日期分区存放时从新到旧列出所有分区
+        loader = PartitionLoader([(s, _shard_config(s, config)) for s in all_shards], config["upload_layout"])
+        items = loader.load_current()
+        for _, older in iter(loader.load_next, None):
+            items.extend(older)
+    else:
+        items = shards.list_items(all_shards, config)
+    results = [_item_result(item, config, shard) for shard, item in items]
+    lines = [f"{r['path']}\t{r['size']}\t{r['url']}" for r in results]
+    return _emit(args, results, lines)
+
+
+def _to_repo_path(target, args, config):
+    """把仓库路径或链接解析为 (分片配置, 路径)；链接按各分片的地址规则匹配"""
+    if target.startswith(("http://", "https://")):
+        candidates = [_select_shard(args, config)] if args.shard else shards.shards_from_config(config)
+        for shard in candidates:
+            shard_config = _shard_config(shard, config)
+            path = GitHubImageManager.url_scheme(shard_config).path_of(target)
+            if path is not None:
+                return shard_config, path
+        raise Exception(f"无法解析URL: {target}")
+    return _shard_config(_select_shard(args, config), config), target.strip("/")
+
+
+def cmd_delete(args, config):
+    targets = [_to_repo_path(t, args, config) for t in args.targets]
+    results, lines = [], []
+    for (_, path), _, error in _run_batched(
+        targets, lambda t: GitHubImageManager.delete_path(t[1], t[0]), args.concurrency, args.batch_size
+    ):
+        if error is None:
+            results.append({"path": path, "ok": True})
+            lines.append(f"已删除: {path}")
+        else:
+            results.append({"path": path, "ok": False, "error": str(error)})
+            lines.append(f"删除失败: {path}: {error}")
+    return _emit(args, results, lines)
+
+
+def cmd_rename(args, config):
+    shard_config, path = _to_repo_path(args.target, args, config)
+    try:
+        item = GitHubImageManager.rename_path(path, args.new_name, shard_config)
+    except Exception as e:
+        return _emit(args, [{"path": path, "ok": False, "error": str(e)}], [f"重命名失败: {e}"])
+    result = dict(_item_result(item, shard_config), old_path=path)
+    return _emit(args, [result], [f"重命名成功: {path} -> {result['path']}"])
+
+
+def cmd_sync(args, config):
+    """把本地目录增量同步到存储路径：只上传新增或内容变化的文件，一次提交
+
+    整个目录同步到一个分片：--shard 指定，否则由分片策略按目录名与总大小选择。
+    """
+    if args.shard:
+        shard = _select_shard(args, config)
+    else:
+        total = sum(os.path.getsize(os.path.join(root, name))
+                    for root, _, names in os.walk(args.directory) for name in names)
+        shard = _router(config).route(os.path.basename(os.path.abspath(args.directory)), total)
+    config = _shard_config(shard, config)
+    plan = plan_sync(args.directory, config, delete=args.delete)
+    result = dict(plan.to_dict(), ok=True, dry_run=args.dry_run, commit=None)
+    if shard.name:
+        result["shard"] = shard.name
+    lines = [f"上传: {p}" for _, p, _ in plan.uploads] + [f"删除: {p}" for p in plan.deletes]
+
+    if not args.dry_run and not plan.is_empty():
+        result["commit"] = apply_sync(plan, config, message=args.message, concurrency=max(1, args.concurrency))
+        lines.append(f"已提交: {result['commit']}")
+    lines.append(f"新增/变化 {len(plan.uploads)}，删除 {len(plan.deletes)}，未变化 {plan.unchanged}")
+
+    if args.json:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for line in lines:
+            print(line)
+    return 0
+
+
+def cmd_watch(args, config):
+    """监视文件夹，新图片写入完成后按批自动上传（Ctrl+C 退出）"""
+    from datetime import datetime
+    from watch_folder import FolderWatcher
+
+    def output(line):
+        print(line, flush=True)
+        if args.log:
+            with open(args.log, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now().isoformat(timespec='seconds')} {line}\n")
+
+    def on_batch(files):
+        # 与 upload 相同按分片分组，每个分片一次提交
+        router = _router(config)
+        groups = {}
+        for file_path in files:
+            shard = _select_shard(args, config) if args.shard else router.route(
+                os.path.basename(file_path), os.path.getsize(file_path)
+            )
+            groups.setdefault(shard, []).append(file_path)
+        for shard, group in groups.items():
+            shard_config = _shard_config(shard, config)
+            for file_path, repo_path, sha in upload_batch(group, shard_config, concurrency=max(1, args.concurrency)):
+                url = GitHubImageManager.url_scheme(shard_config).display_url(repo_path)
+                if args.json:
+                    result = {"file": file_path, "path": repo_path, "sha": sha, "url": url}
+                    if shard.name:
+                        result["shard"] = shard.name
+                    output(json.dumps(result, ensure_ascii=False))
+                elif args.markdown:
+                    output(f"![{os.path.basename(repo_path)}]({url})")
+                else:
+                    output(url)
+
+    watcher = FolderWatcher(
+        args.directory, on_batch,
+        on_error=lambda e: print(f"上传失败: {e}", file=sys.stderr, flush=True),
+        debounce=args.debounce,
+        use_inotify=not args.poll
+    ).start()
+    print(f"正在监视 {watcher.directory} ({watcher.backend})，Ctrl+C 退出", file=sys.stderr, flush=True)
+    try:
+        watcher.wait()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def _common_options(with_defaults):
+    """全局选项：既可写在子命令之前，也可写在子命令之后
+
+    子命令上的副本不设默认值（SUPPRESS），未在子命令后给出时保留子命令前的值。
+    """
+    def default(value):
+        return value if with_defaults else argparse.SUPPRESS
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default=default(CONFIG_FILE), help="配置文件路径 (默认 config.json)")
+    common.add_argument("--token", default=default(None), help="GitHub访问令牌 (也可用环境变量 GITHUB_TOKEN)")
+    common.add_argument("--repo", default=default(None), help="仓库名称，格式: 用户名/仓库名")
+    common.add_argument("--path", default=default(None), help="存储路径")
+    common.add_argument("--branch", default=default(None), help="分支名称")
+    common.add_argument("--custom-domain", dest="custom_domain", default=default(None), help="自定义域名")
+    common.add_argument("--shard", default=default(None), help="配置了多个分片时，上传/删除/重命名针对的分片名称")
+    common.add_argument("--json", action="store_true", default=default(False), help="以JSON格式输出结果")
+    common.add_argument("--concurrency", type=int, default=default(1), help="并发请求数 (默认 1)")
+    common.add_argument("--batch-size", type=int, default=default(0), help="每批处理的数量 (默认不分批)")
+    common.add_argument("--trace", default=default(None), help="把操作追踪写入该文件（Chrome trace 格式）")
+    common.add_argument("--metrics", default=default(None),
+                        help="结束时导出请求指标（.prom 为Prometheus格式，否则为JSON）")
+    return common
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="GitHub图床命令行工具", parents=[_common_options(True)]
+    )
+    common = _common_options(False)
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    upload = sub.add_parser("upload", parents=[common], help="上传图片")
+    upload.add_argument("files", nargs="+", help="本地文件，使用 - 表示从标准输入读取")
+    upload.add_argument("--name", help="从标准输入上传时使用的文件名")
+    upload.set_defaults(func=cmd_upload)
+
+    list_cmd = sub.add_parser("list", parents=[common], help="列出图片")
+    list_cmd.set_defaults(func=cmd_list)
+
+    delete = sub.add_parser("delete", parents=[common], help="删除图片（仓库路径或链接）")
+    delete.add_argument("targets", nargs="+")
+    delete.set_defaults(func=cmd_delete)
+
+    rename = sub.add_parser("rename", parents=[common], help="重命名图片")
+    rename.add_argument("target")
+    rename.add_argument("new_name")
+    rename.set_defaults(func=cmd_rename)
+
+    sync = sub.add_parser("sync", parents=[common], help="把本地目录增量同步到存储路径（一次提交）")
+    sync.add_argument("directory")
+    sync.add_argument("--delete", action="store_true", help="删除远程存在但本地已没有的图片")
+    sync.add_argument("--dry-run", action="store_true", help="只列出需要变更的文件")
+    sync.add_argument("--message", help="提交信息")
+    sync.set_defaults(func=cmd_sync)
+
+    watch = sub.add_parser("watch", parents=[common], help="监视文件夹并自动上传新图片")
+    watch.add_argument("directory")
+    watch.add_argument("--debounce", type=float, default=2.0, help="合并为一批的时间窗口（秒）")
+    watch.add_argument("--poll", action="store_true", help="强制使用定时扫描而不是 inotify")
+    watch.add_argument("--markdown", action="store_true", help="输出Markdown格式链接")
+    watch.add_argument("--log", help="把链接追加写入该文件")
+    watch.set_defaults(func=cmd_watch)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config(args)
+    if args.trace:
+        import tracing
+        tracing.enable(args.trace)
+    try:
+        return args.func(args, config)
+    except Exception as e:
+        if args.json:
+            json.dump({"ok": False, "error": str(e)}, sys.stdout, ensure_ascii=False)
+            sys.stdout.write("\n")
+        else:
+            print(f"错误: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.trace:
+            import tracing
+            tracing.disable()
+        if args.metrics:
+            from metrics import REGISTRY
+            REGISTRY.export(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
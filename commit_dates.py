@@ -0,0 +1,130 @@
+"""图片的真实上传时间（路径最近一次提交的时间）
+
+contents API 不返回时间，REST 需要每个文件一次 commits 请求。这里改用 GraphQL：
+一个查询中为几十个路径各放一个 history(first: 1) 别名，一次请求取回一批时间。
+
+结果按 (仓库@分支, 路径) 缓存在本地索引文件中，并记录当时的 blob SHA：内容未变化
+（SHA 相同）时直接使用缓存的时间，只有新增或变化的图片才需要查询。查询在后台线程中
+以 BACKGROUND 优先级进行，不与界面上的可见请求争抢连接。
+"""
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+import net_scheduler
+from github_manager import GitHubImageManager
+
+
+def local_time(iso):
+    """GraphQL 返回的 UTC 时间 -> 本地时间字符串（可直接按字符串排序）"""
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).astimezone().strftime("%Y-%m-%d %H:%M")
+
+
+def now_string():
+    return datetime.now().strftime("%Y-%m-%d %H:%M")
+
+
+def _scope(shard):
+    return f"{shard.repo}@{shard.branch}" if shard is not None else ""
+
+
+class CommitDateIndex:
+    """本地的时间索引：{仓库@分支: {路径: [blob SHA, ISO 时间]}}"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, shard, path, sha):
+        """缓存的本地时间字符串；没有记录或内容已变化时返回空字符串"""
+        with self._lock:
+            entry = self._entries.get(_scope(shard), {}).get(path)
+        if entry is None or entry[0] != sha:
+            return ""
+        return local_time(entry[1])
+
+    def put(self, shard, path, sha, iso):
+        with self._lock:
+            self._entries.setdefault(_scope(shard), {})[path] = [sha, iso]
+            self._dirty = True
+
+    def save(self):
+        """有变化时写回磁盘（先写临时文件再替换，中断时不会留下半个文件）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._entries, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+
+class DateResolver:
+    """在单个后台线程中批量查询缺少时间的图片
+
+    submit(config, shard, records) 提交 [(key, 路径, SHA)]；每查完一批调用
+    on_dates([(key, 本地时间)])，出错时调用 on_error(异常) 并跳过该批。
+    """
+    def __init__(self, index, on_dates, on_error=None, batch_size=50):
+        self.index = index
+        self.on_dates = on_dates
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = set()     # 已排队的 (分片范围, 路径, SHA)
+        self._thread = None
+
+    def submit(self, config, shard, records):
+        with self._lock:
+            batch = []
+            for key, path, sha in records:
+                ident = (_scope(shard), path, sha)
+                if ident not in self._pending:
+                    self._pending.add(ident)
+                    batch.append((key, path, sha))
+            if not batch:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        for i in range(0, len(batch), self.batch_size):
+            self._queue.put((config, shard, batch[i:i + self.batch_size]))
+
+    def _run(self):
+        net_scheduler.set_thread_priority(net_scheduler.BACKGROUND)
+        while True:
+            config, shard, batch = self._queue.get()
+            try:
+                dates = GitHubImageManager.commit_dates([path for _, path, _ in batch], config)
+                updates = []
+                for key, path, sha in batch:
+                    if path in dates:
+                        self.index.put(shard, path, sha, dates[path])
+                        updates.append((key, local_time(dates[path])))
+                if updates:
+                    self.on_dates(updates)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+            finally:
+                with self._lock:
+                    for _, path, sha in batch:
+                        self._pending.discard((_scope(shard), path, sha))
+            if self._queue.empty():
+                try:
+                    self.index.save()
+                except OSError as e:
+                    if self.on_error is not None:
+                        self.on_error(e)
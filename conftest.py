@@ -0,0 +1,20 @@
+"""测试共用的夹具：本地 GitHub API 模拟服务器（benchmarks/fake_github.py）"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+
+@pytest.fixture
+def fake_github():
+    """启动一个空仓库的模拟服务器，返回 (服务器, 客户端配置)"""
+    pytest.importorskip("requests")
+    from fake_github import FakeGitHubServer
+
+    server = FakeGitHubServer().start()
+    try:
+        yield server, server.client_config(path="images")
+    finally:
+        server.stop()
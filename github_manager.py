@@ -0,0 +1,619 @@
+"""GitHub图床管理核心功能（不依赖任何图形界面库）
+
+requests 在第一次发起网络请求时才导入，命令行工具启动时不需要为它付出导入开销。
+"""
+import base64
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import quote, unquote
+
+import metrics
+import net_scheduler
+import tracing
+from image_library import IMAGE_EXTENSIONS
+
+
+API_BASE = "https://api.github.com"
+RAW_BASE = "https://raw.githubusercontent.com"
+
+_requests = None
+_engine = None
+
+
+def http():
+    """延迟导入 requests"""
+    global _requests
+    if _requests is None:
+        import requests
+        _requests = requests
+    return _requests
+
+
+def set_engine(engine):
+    """使用 async_http.AsyncEngine 发送请求；传入None恢复使用 requests"""
+    global _engine
+    _engine = engine
+
+
+def network_errors():
+    """连接失败、超时等可重试错误的异常类型"""
+    errors = (http().exceptions.RequestException,)
+    engine = _engine
+    if engine is not None:
+        errors += engine.network_errors()
+    return errors
+
+
+def request(method, url, **kwargs):
+    """发起HTTP请求并记录指标，所有网络请求都应经过这里
+
+    开启优先级调度时先按当前线程的优先级排队（排队时间不计入请求延迟）。
+    """
+    endpoint = metrics.endpoint_of(url)
+    with tracing.span(f"http.{endpoint}", method=method, url=url) as span, net_scheduler.slot():
+        start = time.perf_counter()
+        try:
+            engine = _engine
+            if engine is not None:
+                response = engine.request(method, url, **kwargs)
+            else:
+                response = http().request(method, url, **kwargs)
+        except Exception:
+            metrics.record_request(method, url, "error", time.perf_counter() - start)
+            raise
+        # requests 的请求体在 body，httpx 的在 content
+        body = getattr(response.request, "body", None)
+        if body is None:
+            body = getattr(response.request, "content", None)
+        sent = len(body) if isinstance(body, (bytes, str)) else 0
+        if kwargs.get("stream"):
+            # 流式下载不在这里读取响应体，按声明的长度计
+            received = int(response.headers.get("Content-Length") or 0)
+        else:
+            received = len(response.content)
+        metrics.record_request(
+            method, url, response.status_code, time.perf_counter() - start, sent, received, response.headers
+        )
+        span.set(status=response.status_code, bytes_sent=sent, bytes_received=received)
+    return response
+
+
+class UrlScheme:
+    """仓库路径与链接之间的转换
+
+    raw 与自定义域名的前缀按仓库和分支预先拼好，分支名中含 "/" 也能正确处理。
+    """
+    __slots__ = ("raw_prefix", "display_prefix")
+
+    def __init__(self, raw_base, repo, branch, custom_domain=""):
+        self.raw_prefix = f"{raw_base}/{repo}/{branch}/"
+        self.display_prefix = f"{custom_domain}/" if custom_domain else self.raw_prefix
+
+    def raw_url(self, path):
+        return self.raw_prefix + quote(path)
+
+    def display_url(self, path):
+        """复制给用户的链接（设置了自定义域名时使用自定义域名）"""
+        return self.display_prefix + quote(path)
+
+    def path_of(self, url):
+        """由 raw 链接或自定义域名链接得到仓库路径，不属于本仓库与分支时返回None"""
+        url = url.split("?", 1)[0].split("#", 1)[0]
+        for prefix in (self.raw_prefix, self.display_prefix):
+            if url.startswith(prefix) and len(url) > len(prefix):
+                return unquote(url[len(prefix):])
+        return None
+
+
+@lru_cache(maxsize=16)
+def _url_scheme(raw_base, repo, branch, custom_domain):
+    return UrlScheme(raw_base, repo, branch, custom_domain)
+
+
+def encode_base64(source, chunk_size=3 * 256 * 1024):
+    """把 bytes / 文件对象 / 字节块迭代器 增量编码为 base64 字符串
+
+    分块编码时保持 3 字节对齐，避免整个原始内容与编码结果同时驻留内存。
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return base64.b64encode(source).decode("ascii")
+
+    if hasattr(source, "read"):
+        chunks = iter(lambda: source.read(chunk_size), b"")
+    else:
+        chunks = iter(source)
+
+    parts = []
+    remainder = b""
+    for chunk in chunks:
+        chunk = remainder + bytes(chunk)
+        aligned = len(chunk) - len(chunk) % 3
+        if aligned:
+            parts.append(base64.b64encode(chunk[:aligned]).decode("ascii"))
+        remainder = chunk[aligned:]
+    if remainder:
+        parts.append(base64.b64encode(remainder).decode("ascii"))
+    return "".join(parts)
+
+
+def git_blob_sha(data):
+    """计算与 git 一致的 blob SHA-1"""
+    digest = hashlib.sha1()
+    digest.update(f"blob {len(data)}\0".encode("ascii"))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class GitHubImageManager:
+    """GitHub图床管理核心功能类"""
+    @staticmethod
+    def _headers(config):
+        return {
+            "Authorization": f"token {config['token']}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+
+    @staticmethod
+    def _api_base(config):
+        """API 地址，可通过 api_base 指向兼容的服务（如本地模拟服务器）"""
+        return (config.get("api_base") or API_BASE).rstrip("/")
+
+    @staticmethod
+    def _raw_base(config):
+        return (config.get("raw_base") or RAW_BASE).rstrip("/")
+
+    @staticmethod
+    def _contents_url(config, path=""):
+        base = f"{GitHubImageManager._api_base(config)}/repos/{config['repo']}/contents"
+        return f"{base}/{quote(path)}" if path else base
+
+    @staticmethod
+    def _check_config(config):
+        required = ["token", "repo"]
+        if any(not config.get(k) for k in required):
+            raise ValueError("缺少必要配置参数")
+
+    @staticmethod
+    def target_path(config, filename):
+        """根据配置的存储路径得到文件在仓库中的路径"""
+        path = config.get("path", "").strip("/")
+        return f"{path}/{filename}" if path else filename
+
+    @staticmethod
+    def upload_path(config, filename, when=None):
+        """新上传文件的仓库路径：配置了 upload_layout（如 "%Y/%m"）时放入按日期命名的子目录"""
+        layout = (config.get("upload_layout") or "").strip("/")
+        if not layout:
+            return GitHubImageManager.target_path(config, filename)
+        partition = (when or datetime.now()).strftime(layout)
+        return GitHubImageManager.target_path(config, f"{partition}/{filename}")
+
+    @staticmethod
+    def upload_image(file_path, config):
+        """上传图片到GitHub仓库"""
+        return GitHubImageManager.upload_image_item(file_path, config)["download_url"]
+
+    @staticmethod
+    def upload_image_item(file_path, config):
+        """上传图片到GitHub仓库，返回contents API的文件条目"""
+        filename = os.path.basename(file_path)
+        with open(file_path, "rb") as f:
+            return GitHubImageManager.upload_content(
+                f,
+                GitHubImageManager.upload_path(config, filename),
+                f"Upload {filename}",
+                config
+            )
+
+    @staticmethod
+    def upload_content(source, target_path, message, config, sha=None):
+        """上传内存中的数据到仓库指定路径，返回contents API的文件条目
+
+        source 可以是 bytes、文件对象（有 read 方法）或字节块迭代器，无需落地临时文件；
+        target_path 为完整的仓库路径（不再拼接存储路径）；覆盖已有文件时需提供其 sha。
+        """
+        GitHubImageManager._check_config(config)
+        # 文件对象是边读边编码的，读取时间也计入这一段
+        with tracing.span("upload.encode", path=target_path) as span:
+            content = encode_base64(source)
+            span.set(encoded_bytes=len(content))
+        return GitHubImageManager._put_content(target_path.strip("/"), content, message, config, sha=sha)
+
+    @staticmethod
+    def _put_content(upload_path, content, message, config, sha=None, retries=3):
+        """通过contents API写入文件（content 为 base64 字符串），分支被并发更新时重试"""
+        payload = {
+            "message": message,
+            "content": content,
+            "branch": config.get("branch", "main")
+        }
+        if sha:
+            payload["sha"] = sha
+
+        for attempt in range(retries + 1):
+            response = request(
+                "PUT",
+                GitHubImageManager._contents_url(config, upload_path),
+                headers=GitHubImageManager._headers(config),
+                json=payload
+            )
+            # 409: 并发提交导致分支头已变化，稍后重试即可
+            if response.status_code == 409 and attempt < retries:
+                metrics.record_retry(str(response.url), "409")
+                time.sleep(0.5 * (attempt + 1))
+                continue
+            break
+
+        if response.status_code not in [200, 201]:
+            raise Exception(response.json().get("message", "上传失败"))
+
+        return response.json()["content"]
+
+    @staticmethod
+    def repo_size(config):
+        """仓库大小（字节，GitHub 统计的近似值，包含历史）"""
+        GitHubImageManager._check_config(config)
+        response = request(
+            "GET",
+            f"{GitHubImageManager._api_base(config)}/repos/{config['repo']}",
+            headers=GitHubImageManager._headers(config)
+        )
+        if response.status_code != 200:
+            raise Exception(f"获取仓库信息失败: {response.json().get('message', '未知错误')}")
+        return response.json().get("size", 0) * 1024
+
+    @staticmethod
+    def commit_dates(paths, config):
+        """一次 GraphQL 查询取得多个路径最近一次提交的时间，返回 {路径: ISO 时间}
+
+        每个路径是同一查询中的一个 history(first: 1) 别名，几十个路径只需一个请求；
+        没有提交记录的路径不出现在结果中。
+        """
+        GitHubImageManager._check_config(config)
+        if not paths:
+            return {}
+        owner, name = config["repo"].split("/", 1)
+        fields = "\n".join(
+            f"p{i}: history(first: 1, path: {json.dumps(path)}) {{ nodes {{ committedDate }} }}"
+            for i, path in enumerate(paths)
+        )
+        query = (
+            "query($owner: String!, $name: String!, $ref: String!) {"
+            " repository(owner: $owner, name: $name) { object(expression: $ref) { ... on Commit {\n"
+            f"{fields}\n"
+            "} } } }"
+        )
+        response = request(
+            "POST",
+            f"{GitHubImageManager._api_base(config)}/graphql",
+            headers=GitHubImageManager._headers(config),
+            json={"query": query, "variables": {
+                "owner": owner, "name": name, "ref": config.get("branch", "main")
+            }}
+        )
+        data = response.json() if response.content else {}
+        if response.status_code != 200 or data.get("errors"):
+            errors = data.get("errors") or [data]
+            raise Exception(f"获取提交时间失败: {errors[0].get('message', '未知错误')}")
+        commit = ((data.get("data") or {}).get("repository") or {}).get("object") or {}
+        dates = {}
+        for i, path in enumerate(paths):
+            nodes = (commit.get(f"p{i}") or {}).get("nodes") or []
+            if nodes:
+                dates[path] = nodes[0]["committedDate"]
+        return dates
+
+    @staticmethod
+    def list_images(config):
+        """获取仓库中的图片列表"""
+        return [item["download_url"] for item in GitHubImageManager.list_image_items(config)]
+
+    @staticmethod
+    def list_image_items(config):
+        """获取仓库中的图片条目（含路径、SHA、大小）"""
+        return GitHubImageManager.list_directory(config, config.get("path", ""))[1]
+
+    @staticmethod
+    def list_directory(config, path, missing_ok=False):
+        """列出一个目录，返回 (子目录条目, 图片条目)；missing_ok 时目录不存在返回两个空列表"""
+        if not all(k in config for k in ["token", "repo"]):
+            raise ValueError("缺少必要配置参数")
+
+        response = request(
+            "GET",
+            GitHubImageManager._contents_url(config, path.strip("/")),
+            headers=GitHubImageManager._headers(config),
+            params={"ref": config.get("branch", "main")}
+        )
+
+        if response.status_code == 200:
+            items = response.json()
+            return (
+                [item for item in items if item["type"] == "dir"],
+                [
+                    item for item in items
+                    if item["type"] == "file" and
+                    item["name"].lower().endswith(IMAGE_EXTENSIONS)
+                ]
+            )
+        if response.status_code == 404 and missing_ok:
+            return [], []
+        raise Exception(response.json().get("message", "获取文件列表失败"))
+
+    @staticmethod
+    def get_file_item(path, config):
+        """获取单个文件的contents条目，不存在时返回None"""
+        response = request(
+            "GET",
+            GitHubImageManager._contents_url(config, path),
+            headers=GitHubImageManager._headers(config),
+            params={"ref": config.get("branch", "main")}
+        )
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise Exception("获取文件信息失败")
+        return response.json()
+
+    @staticmethod
+    def delete_image(url, config):
+        """从GitHub删除图片"""
+        path = GitHubImageManager._extract_path_from_url(url, config)
+        return GitHubImageManager.delete_path(path, config)
+
+    @staticmethod
+    def delete_path(path, config, sha=None):
+        """按仓库路径删除文件（已知SHA时省去一次查询）"""
+        if sha is None:
+            item = GitHubImageManager.get_file_item(path, config)
+            if item is None:
+                raise Exception("获取文件信息失败")
+            sha = item["sha"]
+
+        # 执行删除
+        response = request(
+            "DELETE",
+            GitHubImageManager._contents_url(config, path),
+            headers=GitHubImageManager._headers(config),
+            json={
+                "message": f"Delete {os.path.basename(path)}",
+                "sha": sha,
+                "branch": config.get("branch", "main")
+            }
+        )
+
+        if response.status_code != 200:
+            raise Exception("删除失败")
+
+        return True
+
+    @staticmethod
+    def download(url, timeout=30):
+        """下载文件内容"""
+        response = request("GET", url, timeout=timeout)
+        if response.status_code != 200:
+            raise Exception(f"下载失败: HTTP {response.status_code}")
+        return response.content
+
+    @staticmethod
+    def rename_path(path, new_name, config, item=None):
+        """重命名仓库中的文件，返回新文件条目
+
+        通过一次提交改写文件树，新路径直接引用原有的 blob，不需要下载或重新上传内容。
+        item 为已知的文件条目（需含 sha，可含 size），提供时省去一次查询。
+        新路径上已有文件（或目录）时抛出 FileExistsError，不会覆盖。
+        """
+        GitHubImageManager._check_config(config)
+        with tracing.span("rename", path=path, new_name=new_name):
+            folder = os.path.dirname(path)
+            new_path = f"{folder}/{new_name}" if folder else new_name
+            if new_path == path:
+                raise ValueError("新文件名与原文件名相同")
+            if GitHubImageManager.get_file_item(new_path, config) is not None:
+                raise FileExistsError(f"目标文件已存在: {new_path}")
+
+            if item is None:
+                item = GitHubImageManager.get_file_item(path, config)
+                if item is None:
+                    raise Exception("获取文件信息失败")
+
+            GitHubImageManager.commit_tree_changes(
+                {new_path: item["sha"], path: None},
+                f"Rename {os.path.basename(path)} to {new_name}",
+                config
+            )
+            return {
+                "name": new_name,
+                "path": new_path,
+                "sha": item["sha"],
+                "size": item.get("size", 0),
+                "type": "file",
+                "download_url": GitHubImageManager.raw_url(new_path, config)
+            }
+
+    # ---- Git 数据 API：一次提交写入/删除多个文件 ----
+    @staticmethod
+    def _git_url(config, endpoint):
+        return f"{GitHubImageManager._api_base(config)}/repos/{config['repo']}/git/{endpoint}"
+
+    @staticmethod
+    def get_tree(config, path=None, recursive=True):
+        """获取分支上某个目录的文件树（默认递归），返回 {仓库路径: blob SHA}"""
+        GitHubImageManager._check_config(config)
+        branch = config.get("branch", "main")
+        path = (config.get("path", "") if path is None else path).strip("/")
+        tree_ish = f"{branch}:{path}" if path else branch
+        response = request(
+            "GET",
+            GitHubImageManager._git_url(config, f"trees/{quote(tree_ish, safe='/:')}"),
+            headers=GitHubImageManager._headers(config),
+            params={"recursive": "1"} if recursive else None
+        )
+        if response.status_code == 404:
+            return {}
+        if response.status_code != 200:
+            raise Exception(response.json().get("message", "获取文件树失败"))
+        data = response.json()
+        if data.get("truncated"):
+            raise Exception("文件树过大被截断，请缩小存储路径范围")
+        prefix = f"{path}/" if path else ""
+        return {
+            prefix + entry["path"]: entry["sha"]
+            for entry in data["tree"] if entry["type"] == "blob"
+        }
+
+    @staticmethod
+    def create_blob(source, config):
+        """上传文件内容为 git blob（source 同 upload_content），返回 blob SHA"""
+        response = request(
+            "POST",
+            GitHubImageManager._git_url(config, "blobs"),
+            headers=GitHubImageManager._headers(config),
+            json={"content": encode_base64(source), "encoding": "base64"}
+        )
+        if response.status_code != 201:
+            raise Exception(response.json().get("message", "上传文件内容失败"))
+        return response.json()["sha"]
+
+    @staticmethod
+    def commit_tree_changes(changes, message, config):
+        """在分支上用一次提交应用多个文件变更
+
+        changes: {仓库路径: blob SHA}，SHA 为 None 表示删除该文件。
+        返回新提交的 SHA；分支在此期间被其他提交更新时抛出异常，不会强制覆盖。
+        """
+        GitHubImageManager._check_config(config)
+        if not changes:
+            return None
+        branch = config.get("branch", "main")
+        headers = GitHubImageManager._headers(config)
+
+        response = request("GET", GitHubImageManager._git_url(config, f"ref/heads/{quote(branch)}"), headers=headers)
+        if response.status_code != 200:
+            raise Exception(response.json().get("message", "获取分支信息失败"))
+        parent_sha = response.json()["object"]["sha"]
+
+        response = request("GET", GitHubImageManager._git_url(config, f"commits/{parent_sha}"), headers=headers)
+        if response.status_code != 200:
+            raise Exception(response.json().get("message", "获取提交信息失败"))
+        base_tree = response.json()["tree"]["sha"]
+
+        tree = [
+            {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+            for path, sha in sorted(changes.items())
+        ]
+        response = request(
+            "POST",
+            GitHubImageManager._git_url(config, "trees"),
+            headers=headers,
+            json={"base_tree": base_tree, "tree": tree}
+        )
+        if response.status_code != 201:
+            raise Exception(response.json().get("message", "创建文件树失败"))
+        tree_sha = response.json()["sha"]
+
+        response = request(
+            "POST",
+            GitHubImageManager._git_url(config, "commits"),
+            headers=headers,
+            json={"message": message, "tree": tree_sha, "parents": [parent_sha]}
+        )
+        if response.status_code != 201:
+            raise Exception(response.json().get("message", "创建提交失败"))
+        commit_sha = response.json()["sha"]
+
+        response = request(
+            "PATCH",
+            GitHubImageManager._git_url(config, f"refs/heads/{quote(branch)}"),
+            headers=headers,
+            json={"sha": commit_sha, "force": False}
+        )
+        if response.status_code != 200:
+            raise Exception(response.json().get("message", "更新分支失败，分支可能已被其他提交更新"))
+        return commit_sha
+
+    @staticmethod
+    def delete_paths(paths, config, message=None):
+        """一次提交删除多个文件，返回提交 SHA"""
+        paths = list(paths)
+        if message is None:
+            message = f"Delete {len(paths)} file(s)"
+        return GitHubImageManager.commit_tree_changes({path: None for path in paths}, message, config)
+
+    @staticmethod
+    def move_paths(paths, folder, config, shas=None, message=None):
+        """一次提交把多个文件移动到 folder 目录，返回 {旧路径: 新路径}
+
+        只改写文件树，直接复用已有的 blob，不需要下载或重新上传内容；
+        shas 为已知的 {路径: blob SHA}，缺失的逐个查询。
+        目标目录中已有同名文件（或多个文件同名）时抛出 FileExistsError，不做任何修改。
+        """
+        folder = folder.strip("/")
+        shas = dict(shas or {})
+        moves = {}
+        changes = {}
+        targets = {}
+        for path in paths:
+            name = os.path.basename(path)
+            new_path = f"{folder}/{name}" if folder else name
+            if new_path != path:
+                targets[path] = new_path
+        if not targets:
+            return moves
+        taken = set(GitHubImageManager.get_tree(config, folder, recursive=False))
+        conflicts = set()
+        for new_path in targets.values():
+            if new_path in taken:
+                conflicts.add(new_path)
+            taken.add(new_path)
+        if conflicts:
+            raise FileExistsError(f"目标目录中已有同名文件: {', '.join(sorted(conflicts))}")
+        for path, new_path in targets.items():
+            sha = shas.get(path)
+            if not sha:
+                item = GitHubImageManager.get_file_item(path, config)
+                if item is None:
+                    raise Exception(f"获取文件信息失败: {path}")
+                sha = item["sha"]
+            moves[path] = new_path
+            changes[new_path] = sha
+            changes[path] = None
+        if moves:
+            if message is None:
+                message = f"Move {len(moves)} file(s) to {folder or '/'}"
+            GitHubImageManager.commit_tree_changes(changes, message, config)
+        return moves
+
+    @staticmethod
+    def url_scheme(config):
+        """当前仓库、分支与自定义域名对应的链接规则"""
+        return _url_scheme(
+            GitHubImageManager._raw_base(config), config.get("repo", ""),
+            config.get("branch") or "main", (config.get("custom_domain") or "").rstrip("/")
+        )
+
+    @staticmethod
+    def raw_url(path, config):
+        """仓库路径对应的 raw.githubusercontent.com 链接"""
+        return GitHubImageManager.url_scheme(config).raw_url(path)
+
+    @staticmethod
+    def apply_custom_domain(url, config):
+        """应用自定义域名（不属于当前仓库与分支的链接原样返回）"""
+        if not config.get("custom_domain"):
+            return url
+        scheme = GitHubImageManager.url_scheme(config)
+        path = scheme.path_of(url)
+        return url if path is None else scheme.display_url(path)
+
+    @staticmethod
+    def _extract_path_from_url(url, config):
+        """从URL提取GitHub路径"""
+        path = GitHubImageManager.url_scheme(config).path_of(url)
+        if path is None:
+            raise Exception("无法解析URL")
+        return path
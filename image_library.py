@@ -0,0 +1,309 @@
+"""图片库视图模型：紧凑的图片记录 + 增量维护的有序视图 + 过滤"""
+import bisect
+import os
+import sys
+from enum import Enum, auto
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+
+
+class SortMode(Enum):
+    NAME_ASC = auto()
+    NAME_DESC = auto()
+    SIZE_ASC = auto()
+    SIZE_DESC = auto()
+    DATE_ASC = auto()
+    DATE_DESC = auto()
+    DIMENSIONS_ASC = auto()
+    DIMENSIONS_DESC = auto()
+    FORMAT_ASC = auto()
+    FORMAT_DESC = auto()
+
+
+# 排序模式 -> (排序字段, 是否倒序)
+SORT_FIELDS = {
+    SortMode.NAME_ASC: ("name", False),
+    SortMode.NAME_DESC: ("name", True),
+    SortMode.SIZE_ASC: ("size", False),
+    SortMode.SIZE_DESC: ("size", True),
+    SortMode.DATE_ASC: ("date", False),
+    SortMode.DATE_DESC: ("date", True),
+    SortMode.DIMENSIONS_ASC: ("dimensions", False),
+    SortMode.DIMENSIONS_DESC: ("dimensions", True),
+    SortMode.FORMAT_ASC: ("format", False),
+    SortMode.FORMAT_DESC: ("format", True),
+}
+
+# 界面下拉框显示名称
+SORT_LABELS = {
+    "名称 ↑": SortMode.NAME_ASC,
+    "名称 ↓": SortMode.NAME_DESC,
+    "大小 ↑": SortMode.SIZE_ASC,
+    "大小 ↓": SortMode.SIZE_DESC,
+    "日期 ↑": SortMode.DATE_ASC,
+    "日期 ↓": SortMode.DATE_DESC,
+    "尺寸 ↑": SortMode.DIMENSIONS_ASC,
+    "尺寸 ↓": SortMode.DIMENSIONS_DESC,
+    "格式 ↑": SortMode.FORMAT_ASC,
+    "格式 ↓": SortMode.FORMAT_DESC,
+}
+
+# 类型过滤下拉框 -> 扩展名
+FORMAT_LABELS = {
+    "全部类型": None,
+    "PNG": ("png",),
+    "JPG": ("jpg", "jpeg"),
+    "GIF": ("gif",),
+}
+
+
+def record_key(shard, path):
+    """在合并视图中唯一标识图片：单一仓库时就是路径，多分片时加上分片名"""
+    return f"{shard.name}:{path}" if shard is not None and shard.name else path
+
+
+class ImageRecord:
+    """一张图片的紧凑记录
+
+    名称、目录由路径推导，链接由 github_manager.UrlScheme 按需生成，记录本身只保存
+    路径、所在分片、内容 SHA、大小、尺寸与日期，以及界面的加载状态；排序与过滤频繁使用的
+    小写文件名与格式在创建时算好一次（路径不会原地修改）。
+    """
+    __slots__ = ("path", "shard", "sha", "size", "width", "height", "date", "loaded", "failed",
+                 "name_lower", "format")
+
+    def __init__(self, path, sha="", size=0, width=0, height=0, date="", loaded=False, failed=False, shard=None):
+        self.path = path
+        self.shard = shard
+        self.sha = sha
+        self.size = size
+        self.width = width
+        self.height = height
+        self.date = date
+        self.loaded = loaded
+        self.failed = failed
+        self.name_lower = path.rpartition("/")[2].lower()
+        self.format = sys.intern(os.path.splitext(self.name_lower)[1][1:])
+
+    @property
+    def key(self):
+        return record_key(self.shard, self.path)
+
+    @property
+    def name(self):
+        return self.path.rpartition("/")[2]
+
+    @property
+    def folder(self):
+        return self.path.rpartition("/")[0]
+
+    def __repr__(self):
+        return f"ImageRecord({self.path!r}, sha={self.sha!r}, size={self.size})"
+
+
+def make_record(item, shard=None, date=""):
+    """由GitHub contents API返回的条目构建图片记录（date 为上传时间，未知时为空）"""
+    return ImageRecord(
+        item.get("path") or item["name"],
+        sha=item.get("sha") or "",
+        size=item.get("size") or 0,
+        date=date,
+        shard=shard
+    )
+
+
+def sort_key(record, field):
+    """记录在某个排序字段上的键（名称作为次级键保证稳定顺序），只由已存好的字段组成"""
+    name = record.name_lower
+    if field == "name":
+        return (name,)
+    if field == "size":
+        return (record.size, name)
+    if field == "date":
+        return (record.date, name)
+    if field == "dimensions":
+        return (record.width * record.height, record.width, name)
+    return (record.format, name)
+
+
+class ImageFilter:
+    """图片过滤条件，未设置的条件不参与匹配"""
+    def __init__(self, formats=None, min_size=None, max_size=None, folder="", keyword=""):
+        self.formats = {f.lower().lstrip(".") for f in formats} if formats else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.folder = folder.strip("/")
+        self.keyword = keyword.lower()
+
+    def is_empty(self):
+        return not (self.formats or self.min_size is not None or self.max_size is not None
+                    or self.folder or self.keyword)
+
+    def match(self, record):
+        if self.formats and record.format not in self.formats:
+            return False
+        size = record.size
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        if self.folder:
+            folder = record.folder
+            if folder != self.folder and not folder.startswith(self.folder + "/"):
+                return False
+        if self.keyword and self.keyword not in record.name_lower:
+            return False
+        return True
+
+
+class ImageLibrary:
+    """按 record.key 索引的图片集合（可包含多个分片）
+
+    每个排序字段维护一个升序视图（(排序键, key) 列表），首次使用时整体排序一次，
+    之后的新增/删除/更新通过 bisect 增量维护，不再触发整表重排。
+    排序键由记录中预先算好的小写文件名、格式等字段直接组成，不再做字符串处理。
+    """
+    def __init__(self):
+        self._records = {}
+        self._views = {}
+        self._total_size = 0
+        self._shard_sizes = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def get(self, key):
+        return self._records.get(key)
+
+    def records(self):
+        return list(self._records.values())
+
+    def reset(self, records):
+        """用完整列表替换当前内容，已构建的视图全部失效"""
+        self._records = {r.key: r for r in records}
+        self._views = {}
+        self._total_size = 0
+        self._shard_sizes = {}
+        for record in self._records.values():
+            self._count_size(record, 1)
+
+    def add(self, record):
+        """新增或替换单条记录，已构建的视图使用二分插入"""
+        key = record.key
+        if key in self._records:
+            self.remove(key)
+        self._records[key] = record
+        self._count_size(record, 1)
+        for field, view in self._views.items():
+            bisect.insort(view, (sort_key(record, field), key))
+
+    def _count_size(self, record, sign):
+        self._total_size += sign * record.size
+        shard = record.shard
+        self._shard_sizes[shard] = self._shard_sizes.get(shard, 0) + sign * record.size
+
+    @staticmethod
+    def _discard(view, entry):
+        index = bisect.bisect_left(view, entry)
+        if index < len(view) and view[index] == entry:
+            del view[index]
+
+    def remove(self, key):
+        """删除单条记录，返回被删除的记录"""
+        record = self._records.pop(key, None)
+        if record is None:
+            return None
+        self._count_size(record, -1)
+        for field, view in self._views.items():
+            self._discard(view, (sort_key(record, field), key))
+        return record
+
+    def update(self, key, **fields):
+        """更新记录字段，仅对排序键发生变化的视图重新定位"""
+        record = self._records.get(key)
+        if record is None:
+            return None
+        old_keys = {field: sort_key(record, field) for field in self._views}
+        self._count_size(record, -1)
+        for name, value in fields.items():
+            setattr(record, name, value)
+        self._count_size(record, 1)
+        for field, view in self._views.items():
+            new_key = sort_key(record, field)
+            if old_keys[field] == new_key:
+                continue
+            self._discard(view, (old_keys[field], key))
+            bisect.insort(view, (new_key, key))
+        return record
+
+    def update_in_view(self, view, key, sort_mode, image_filter=None, **fields):
+        """更新记录字段，并让按 sort_mode 排好序的记录列表 view 保持有序
+
+        排序键变化时把记录从原位置移到新位置，返回 (原位置, 新位置)；排序键不变或记录
+        不在 view 中时返回None。
+        """
+        record = self._records.get(key)
+        if record is None:
+            return None
+        field = SORT_FIELDS[sort_mode][0]
+        old_key = sort_key(record, field)
+        index = None
+        if image_filter is None or image_filter.match(record):
+            found = self.view_index(view, key, sort_mode)
+            if found < len(view) and view[found].key == key:
+                index = found
+        self.update(key, **fields)
+        if index is None or sort_key(record, field) == old_key:
+            return None
+        del view[index]
+        new_index = self.view_index(view, key, sort_mode)
+        view.insert(new_index, record)
+        return index, new_index
+
+    def _view(self, field):
+        view = self._views.get(field)
+        if view is None:
+            view = sorted((sort_key(record, field), key) for key, record in self._records.items())
+            self._views[field] = view
+        return view
+
+    def query(self, sort_mode=SortMode.NAME_ASC, image_filter=None):
+        """按排序模式返回（过滤后的）记录列表"""
+        field, descending = SORT_FIELDS[sort_mode]
+        view = self._view(field)
+        ordered = reversed(view) if descending else view
+        records = self._records
+        if image_filter is None or image_filter.is_empty():
+            return [records[key] for _, key in ordered]
+        return [records[key] for _, key in ordered if image_filter.match(records[key])]
+
+    def view_index(self, view, key, sort_mode):
+        """在按 sort_mode 排好序的记录列表中二分查找 key 的位置（key 须在库中）"""
+        field, descending = SORT_FIELDS[sort_mode]
+        target = (sort_key(self._records[key], field), key)
+        lo, hi = 0, len(view)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = view[mid]
+            entry = (sort_key(other, field), other.key)
+            if (entry > target) if descending else (entry < target):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def last(self, field):
+        """返回指定字段上最大的记录（如最新日期），无记录时返回None"""
+        view = self._view(field)
+        return self._records[view[-1][1]] if view else None
+
+    def total_size(self):
+        return self._total_size
+
+    def shard_sizes(self):
+        """各分片中已加载图片的总大小（副本，可交给其他线程使用）"""
+        return dict(self._shard_sizes)
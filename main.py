@@ -1,16 +1,35 @@
 import os
+import time
 import json
-import base64
 import threading
-import requests
-import re
 import io
-from datetime import datetime
-from urllib.parse import urlparse
-from PIL import Image, ImageOps, ImageDraw
+from concurrent.futures import Future
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, simpledialog, Menu, Toplevel, Label
 import webbrowser
+import github_manager
+from github_manager import GitHubImageManager, git_blob_sha
+from image_library import (
+    ImageLibrary, ImageFilter, SortMode, SORT_LABELS, FORMAT_LABELS, make_record, record_key
+)
+from ui_dispatcher import UIDispatcher
+from app_log import LogBuffer, LEVELS
+from thumbnail_cache import ThumbnailCache
+import thumbnail_render
+import metrics
+import tracing
+from repo_sync import plan_sync, apply_sync, upload_batch
+from watch_folder import FolderWatcher
+import upload_journal
+from upload_journal import UploadJournal
+from blob_store import BlobStore
+from prefetch import Prefetcher
+import net_scheduler
+import async_http
+from mirrors import MirrorSelector, hosts_from_config
+import shards
+from partitions import PartitionLoader
+from commit_dates import CommitDateIndex, DateResolver, now_string
 
 
 # 初始化设置
@@ -18,148 +37,136 @@ ctk.set_appearance_mode("System")  # 跟随系统主题
 ctk.set_default_color_theme("blue")  # 蓝色主题
 CONFIG_FILE = "config.json"
 
-class GitHubImageManager:
-    """GitHub图床管理核心功能类"""
-    @staticmethod
-    def upload_image(file_path, config):
-        """上传图片到GitHub仓库"""
-        required = ["token", "repo"]
-        if any(config.get(k) is None for k in required):
-            raise ValueError("缺少必要配置参数")
-
-        with open(file_path, "rb") as f:
-            content = base64.b64encode(f.read()).decode("utf-8")
-
-        headers = {
-            "Authorization": f"token {config['token']}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-
-        path = config.get("path", "").strip("/")
-        filename = os.path.basename(file_path)
-        upload_path = f"{path}/{filename}" if path else filename
-
-        response = requests.put(
-            f"https://api.github.com/repos/{config['repo']}/contents/{upload_path}",
-            headers=headers,
-            json={
-                "message": f"Upload {filename}",
-                "content": content,
-                "branch": config.get("branch", "main")
-            }
-        )
-
-        if response.status_code not in [200, 201]:
-            raise Exception(response.json().get("message", "上传失败"))
-        
-        return response.json()["content"]["download_url"]
-
-    @staticmethod
-    def list_images(config):
-        """获取仓库中的图片列表"""
-        if not all(k in config for k in ["token", "repo"]):
-            raise ValueError("缺少必要配置参数")
-
-        headers = {
-            "Authorization": f"token {config['token']}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-
-        path = config.get("path", "").strip("/")
-        url = f"https://api.github.com/repos/{config['repo']}/contents/{path}" if path else \
-              f"https://api.github.com/repos/{config['repo']}/contents"
-
-        response = requests.get(
-            url,
-            headers=headers,
-            params={"ref": config.get("branch", "main")}
-        )
-
-        if response.status_code == 200:
-            return [
-                item["download_url"] for item in response.json() 
-                if item["type"] == "file" and
-                item["name"].lower().endswith((".png", ".jpg", ".jpeg", ".gif"))
-            ]
-        else:
-            raise Exception(response.json().get("message", "获取文件列表失败"))
-
-    @staticmethod
-    def delete_image(url, config):
-        """从GitHub删除图片"""
-        path = GitHubImageManager._extract_path_from_url(url, config)
-        
-        headers = {
-            "Authorization": f"token {config['token']}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-
-        # 获取文件SHA
-        response = requests.get(
-            f"https://api.github.com/repos/{config['repo']}/contents/{path}",
-            headers=headers,
-            params={"ref": config.get("branch", "main")}
-        )
-
-        if response.status_code != 200:
-            raise Exception("获取文件信息失败")
-
-        # 执行删除
-        response = requests.delete(
-            f"https://api.github.com/repos/{config['repo']}/contents/{path}",
-            headers=headers,
-            json={
-                "message": f"Delete {os.path.basename(path)}",
-                "sha": response.json()["sha"],
-                "branch": config.get("branch", "main")
-            }
-        )
-
-        if response.status_code != 200:
-            raise Exception("删除失败")
-
-        return True
-
-    @staticmethod
-    def _extract_path_from_url(url, config):
-        """从URL提取GitHub路径"""
-        if config.get("custom_domain") and url.startswith(config["custom_domain"]):
-            url = url.replace(config["custom_domain"], "https://raw.githubusercontent.com")
-
-        match = re.search(
-            r"https://raw\.githubusercontent\.com/([^/]+/[^/]+)/([^/]+)/(.+)", 
-            url
-        )
-        if not match:
-            raise Exception("无法解析URL")
-
-        return match.group(3)
+# 启动基准测试（benchmarks/bench_startup.py 设置）：输出首帧/首张缩略图时间后退出
+STARTUP_BENCH = os.environ.get("GHIU_STARTUP_BENCH") == "1"
 
 class ModernImageUploader(ctk.CTk):
     """现代化GitHub图床管理工具"""
     def __init__(self):
         super().__init__()
         
+        # 工作线程的界面操作统一交给主线程执行
+        self.ui = UIDispatcher(self)
+        
         # 窗口设置
         self.title("GitHub图床管理工具")
         self.geometry("1280x800")
         self.minsize(1024, 768)
         
+        # 日志缓冲（配置加载前即可记录）
+        self.log_buffer = LogBuffer()
+        
         # 加载配置
         self.config = self._load_config()
-        self.images = []
+        self._configure_logging()
+        self._configure_tracing()
+        self.cards = {}
         self.current_image = None
         self.current_loaded = 0
         
+        # 多选：已选图片路径与 Shift 范围选择的起点
+        self.selected = set()
+        self._select_anchor = None
+        
+        # 图片库与当前视图
+        self.library = ImageLibrary()
+        # 各分片大小的快照，只在主线程更新；后台线程的分片路由读取它而不是正在变化的图片库
+        self.shard_sizes = {}
+        self.view = []
+        self.image_filter = ImageFilter()
+        self.sort_mode = SortMode.__members__.get(self.config.get("sort_mode"), SortMode.NAME_ASC)
+        self._render_generation = 0
+        
         # 懒加载设置
         self.lazyload_enabled = self.config.get("lazyload_enabled", True)
         self.dynamic_batch_size = self.config.get("dynamic_batch_size", 30)
         
+        # 缩略图内存预算
+        self.thumbnails = ThumbnailCache(int(self.config.get("thumbnail_memory_mb") or 64) * 1024 * 1024)
+        self.thumbnail_keep_rows = self.config.get("thumbnail_keep_rows", 3)
+        
+        # 按 blob SHA 缓存的图片内容，同一张图在本机只下载一次
+        self.blobs = BlobStore(
+            self.config.get("blob_cache_dir") or None,
+            int(self.config.get("blob_cache_mb") or 512) * 1024 * 1024
+        )
+        
+        # 网络请求按优先级调度；主线程上的请求默认视为可见区域的加载
+        net_scheduler.enable(
+            int(self.config.get("network_max_concurrent") or 8),
+            self.config.get("network_limits") or {}
+        )
+        net_scheduler.set_thread_priority(net_scheduler.VISIBLE)
+        
+        # 分片存储：未配置 shards 时只有当前仓库一个分片
+        self.shards = shards.shards_from_config(self.config)
+        
+        # 按日期分区（upload_layout）时列表从新到旧逐个分区加载
+        self.partitions = None
+        self._partition_loading = False
+        self._partition_retry_at = 0.0
+        
+        # 真实上传时间：本地索引 + 后台批量 GraphQL 查询
+        self.date_index = CommitDateIndex(self.config.get("date_index") or "commit_dates.json")
+        self.date_resolver = DateResolver(
+            self.date_index,
+            lambda updates: self.ui.call(self._apply_dates, updates),
+            lambda e: self._log(f"获取上传时间失败: {e}", "WARNING", "refresh"),
+            int(self.config.get("date_batch_size") or 50)
+        )
+        
+        # 图片内容从 raw / 自定义域名 / 镜像中最快的健康主机获取
+        self.mirrors = MirrorSelector(hosts_from_config(self.config))
+        
+        # 可选的 asyncio HTTP 引擎（需要 httpx）：少量复用的连接上并发大量请求
+        self.async_engine = None
+        if self.config.get("http_engine") == "async":
+            if async_http.available():
+                self.async_engine = async_http.AsyncEngine(int(self.config.get("async_max_concurrent") or 64))
+                github_manager.set_engine(self.async_engine)
+                self._log(f"使用异步HTTP引擎 (HTTP/2: {'是' if self.async_engine.http2 else '否'})", component="network")
+            else:
+                self._log("未安装 httpx，继续使用 requests", "WARNING", "network")
+        
+        # 缩略图预取：按滚动方向与速度提前加载即将出现的卡片。所有缩略图都经预取器在后台
+        # 加载，prefetch_workers 为 0 时只保留一个线程、只加载可见卡片（不提前加载）
+        workers = int(self.config.get("prefetch_workers") or 0)
+        self.prefetch_ahead = workers > 0
+        if self.async_engine is not None:
+            # 下载在事件循环上进行，后台线程只负责生成缩略图
+            self.prefetcher = Prefetcher(
+                self._prefetch_thumbnail, self._on_prefetched, max(1, workers),
+                fetch=self._prefetch_fetch, fetch_limit=self.async_engine.max_concurrent
+            )
+        else:
+            self.prefetcher = Prefetcher(self._prefetch_thumbnail, self._on_prefetched, max(1, workers))
+        self._scroll_sample = None     # (视口顶部位置, 时间)
+        self._scroll_velocity = 0.0    # 像素/秒，向下为正
+        
+        # 磁盘上的上传队列，中断的上传在下次启动时继续
+        self.upload_journal = UploadJournal(self.config.get("upload_journal") or "upload_queue.jsonl")
+        self._upload_lock = threading.Lock()
+        self._upload_worker = None
+        self._closing = threading.Event()
+        
         # 创建UI
         self._setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         
-        # 加载图片
+        # 首帧绘制完成后再开始网络与图片相关的工作
+        self._first_thumbnail_shown = False
+        self.after_idle(self._on_first_frame)
+
+    def _on_first_frame(self):
+        """首帧已绘制：开始加载图片列表"""
+        if STARTUP_BENCH:
+            print(f"STARTUP first_frame {time.time():.6f}", flush=True)
         self.refresh_images()
+        pending = self.upload_journal.unfinished()
+        if pending and self.config.get("token") and not STARTUP_BENCH:
+            self._log(f"继续上次未完成的上传: {len(pending)} 个文件", component="upload")
+            self._start_upload_worker()
+        self.after(250, self._sync_viewport)
 
     def _load_config(self):
         """加载配置文件"""
@@ -173,7 +180,34 @@ class ModernImageUploader(ctk.CTk):
             "auto_refresh": True,
             "lazyload_enabled": True,
             "dynamic_batch_size": 30,
-            "theme_mode": "System"
+            "theme_mode": "System",
+            "sort_mode": "NAME_ASC",
+            "log_level": "INFO",
+            "log_filters": {},
+            "log_max_lines": 1000,
+            "log_file": "",
+            "thumbnail_memory_mb": 64,
+            "thumbnail_keep_rows": 3,
+            "watch_debounce": 2.0,
+            "watch_markdown": False,
+            "trace_file": "",
+            "upload_journal": "upload_queue.jsonl",
+            "blob_cache_dir": "",
+            "blob_cache_mb": 512,
+            "prefetch_workers": 4,
+            "prefetch_lookahead": 1.0,
+            "prefetch_max_rows": 12,
+            "network_max_concurrent": 8,
+            "network_limits": {},
+            "mirrors": [],
+            "shards": [],
+            "shard_policy": "size",
+            "shard_max_mb": 800,
+            "upload_layout": "",
+            "date_index": "commit_dates.json",
+            "date_batch_size": 50,
+            "http_engine": "requests",
+            "async_max_concurrent": 64
         }
         
         if os.path.exists(CONFIG_FILE):
@@ -188,7 +222,7 @@ class ModernImageUploader(ctk.CTk):
                             loaded_config[key] = default_config[key]
                     return loaded_config
             except Exception as e:
-                self._log(f"加载配置失败: {e}, 使用默认配置")
+                self._log(f"加载配置失败: {e}, 使用默认配置", "ERROR")
                 return default_config
         return default_config
 
@@ -203,7 +237,29 @@ class ModernImageUploader(ctk.CTk):
             with open(CONFIG_FILE, "w", encoding="utf-8") as f:
                 json.dump(self.config, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            self._log(f"保存配置失败: {e}")
+            self._log(f"保存配置失败: {e}", "ERROR")
+
+    def _configure_logging(self):
+        """根据配置设置日志级别、组件过滤和日志文件"""
+        self.log_buffer.resize(max(100, int(self.config.get("log_max_lines") or 1000)))
+        self.log_buffer.set_level(self.config.get("log_level", "INFO"))
+        self.log_buffer.set_component_levels(self.config.get("log_filters") or {})
+        log_file = self.config.get("log_file")
+        if log_file:
+            try:
+                self.log_buffer.open_file(log_file)
+            except Exception as e:
+                self._log(f"打开日志文件失败: {e}", "ERROR")
+        else:
+            self.log_buffer.close_file()
+
+    def _configure_tracing(self):
+        """配置了 trace_file 时把操作追踪写入该文件（Chrome trace 格式）"""
+        if self.config.get("trace_file"):
+            try:
+                tracing.enable(self.config["trace_file"])
+            except Exception as e:
+                self._log(f"打开追踪文件失败: {e}", "ERROR")
 
     def _setup_ui(self):
         """设置现代化UI界面"""
@@ -249,6 +305,27 @@ class ModernImageUploader(ctk.CTk):
         # 统计信息面板
         self._setup_stats_panel()
         
+        # 同步文件夹按钮
+        self.sync_btn = ctk.CTkButton(
+            self.sidebar,
+            text="同步文件夹",
+            command=self._sync_folder_dialog,
+            height=36,
+            font=ctk.CTkFont(size=13)
+        )
+        self.sync_btn.grid(row=4, column=0, padx=20, pady=5)
+        
+        # 监视文件夹按钮
+        self.watcher = None
+        self.watch_btn = ctk.CTkButton(
+            self.sidebar,
+            text="监视文件夹",
+            command=self._toggle_watch_folder,
+            height=36,
+            font=ctk.CTkFont(size=13)
+        )
+        self.watch_btn.grid(row=5, column=0, padx=20, pady=5, sticky="n")
+        
         # 日志区域
         self.log_frame = ctk.CTkFrame(self.sidebar)
         self.log_frame.grid(row=6, column=0, sticky="nsew", padx=10, pady=10)
@@ -259,6 +336,7 @@ class ModernImageUploader(ctk.CTk):
             font=ctk.CTkFont(size=11)
         )
         self.log_area.pack(fill="both", expand=True)
+        self.after(100, self._flush_log)
         
         # 设置按钮
         self.settings_btn = ctk.CTkButton(
@@ -275,20 +353,23 @@ class ModernImageUploader(ctk.CTk):
         # ===== 主内容区 =====
         self.main_content = ctk.CTkFrame(self, corner_radius=0)
         self.main_content.grid(row=0, column=1, sticky="nsew")
-        self.main_content.grid_rowconfigure(1, weight=1)
+        self.main_content.grid_rowconfigure(2, weight=1)
         self.main_content.grid_columnconfigure(0, weight=1)
         
         # 搜索栏
         self._setup_search_bar()
         
+        # 排序与过滤栏
+        self._setup_filter_bar()
+        
         # 图片网格展示区
         self._setup_image_grid()
         
         # 底部状态栏
         self._setup_status_bar()
         
-        # 右键菜单
-        self._setup_context_menu()
+        # 右键菜单在第一次使用时再创建
+        self.context_menu = None
 
     def _setup_stats_panel(self):
         """设置统计信息面板"""
@@ -321,6 +402,22 @@ class ModernImageUploader(ctk.CTk):
             font=ctk.CTkFont(size=12)
         )
         self.total_size_label.pack(anchor="w", pady=(5, 0))
+        
+        self.thumbnail_memory_label = ctk.CTkLabel(
+            self.stats_frame,
+            text="缩略图内存: 0 MB",
+            font=ctk.CTkFont(size=12)
+        )
+        self.thumbnail_memory_label.pack(anchor="w", pady=(5, 0))
+        
+        self.request_stats_label = ctk.CTkLabel(
+            self.stats_frame,
+            text="请求: 0  API限额: -",
+            font=ctk.CTkFont(size=12),
+            cursor="hand2"
+        )
+        self.request_stats_label.pack(anchor="w", pady=(5, 0))
+        self.request_stats_label.bind("<Button-1>", lambda e: self._open_metrics())
 
     def _setup_search_bar(self):
         """设置搜索栏"""
@@ -354,6 +451,44 @@ class ModernImageUploader(ctk.CTk):
             command=self._clear_search
         )
         self.clear_search_btn.pack(side="left", padx=5)
+        self.search_entry.bind("<Return>", lambda e: self._search_images())
+
+    def _setup_filter_bar(self):
+        """设置排序与过滤栏"""
+        self.filter_frame = ctk.CTkFrame(self.main_content, fg_color="transparent")
+        self.filter_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
+        
+        ctk.CTkLabel(self.filter_frame, text="排序:").pack(side="left", padx=(10, 5))
+        self.sort_option = ctk.CTkOptionMenu(
+            self.filter_frame,
+            values=list(SORT_LABELS),
+            width=100,
+            command=self._set_sort_mode
+        )
+        self.sort_option.set(next(k for k, v in SORT_LABELS.items() if v == self.sort_mode))
+        self.sort_option.pack(side="left", padx=5)
+        
+        self.format_option = ctk.CTkOptionMenu(
+            self.filter_frame,
+            values=list(FORMAT_LABELS),
+            width=100,
+            command=lambda _: self._apply_filters()
+        )
+        self.format_option.pack(side="left", padx=5)
+        
+        ctk.CTkLabel(self.filter_frame, text="大小(KB):").pack(side="left", padx=(10, 5))
+        self.min_size_entry = ctk.CTkEntry(self.filter_frame, width=60, placeholder_text="最小")
+        self.min_size_entry.pack(side="left")
+        ctk.CTkLabel(self.filter_frame, text="-").pack(side="left", padx=3)
+        self.max_size_entry = ctk.CTkEntry(self.filter_frame, width=60, placeholder_text="最大")
+        self.max_size_entry.pack(side="left")
+        
+        ctk.CTkLabel(self.filter_frame, text="目录:").pack(side="left", padx=(10, 5))
+        self.folder_entry = ctk.CTkEntry(self.filter_frame, width=120, placeholder_text="子目录")
+        self.folder_entry.pack(side="left")
+        
+        for entry in (self.min_size_entry, self.max_size_entry, self.folder_entry):
+            entry.bind("<Return>", lambda e: self._apply_filters())
 
     def _setup_image_grid(self):
         """设置图片网格展示区"""
@@ -361,7 +496,7 @@ class ModernImageUploader(ctk.CTk):
             self.main_content,
             fg_color="transparent"
         )
-        self.image_grid_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=(0, 10))
+        self.image_grid_frame.grid(row=2, column=0, sticky="nsew", padx=10, pady=(0, 10))
         
         # 3列网格布局
         for i in range(3):
@@ -399,7 +534,7 @@ class ModernImageUploader(ctk.CTk):
     def _setup_status_bar(self):
         """设置底部状态栏"""
         self.status_bar = ctk.CTkFrame(self.main_content, height=40)
-        self.status_bar.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
+        self.status_bar.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 10))
         
         self.status_label = ctk.CTkLabel(
             self.status_bar,
@@ -417,6 +552,27 @@ class ModernImageUploader(ctk.CTk):
         )
         self.progress_bar.pack(side="right", padx=15)
         self.progress_bar.set(0)
+        
+        # 多选操作栏，有选中图片时显示
+        self.selection_frame = ctk.CTkFrame(self.status_bar, fg_color="transparent")
+        self.selection_label = ctk.CTkLabel(self.selection_frame, text="", font=ctk.CTkFont(size=12))
+        self.selection_label.pack(side="left", padx=(0, 10))
+        for text, command in (
+            ("删除所选", self._delete_selected),
+            ("移动所选", self._move_selected),
+            ("取消选择", self._clear_selection)
+        ):
+            ctk.CTkButton(
+                self.selection_frame,
+                text=text,
+                width=80,
+                height=24,
+                font=ctk.CTkFont(size=11),
+                command=command
+            ).pack(side="left", padx=(0, 5))
+        
+        self.bind("<Control-a>", self._select_all)
+        self.bind("<Escape>", lambda e: self._clear_selection())
 
     def _setup_context_menu(self):
         """设置右键菜单"""
@@ -439,6 +595,10 @@ class ModernImageUploader(ctk.CTk):
             label="📂 重命名图片",
             command=self._rename_image
         )
+        self.context_menu.add_command(
+            label="📁 移动到...",
+            command=lambda: self._move_keys(self._target_keys())
+        )
         self.context_menu.add_separator()
         self.context_menu.add_command(
             label="🗑️ 删除图片",
@@ -446,40 +606,42 @@ class ModernImageUploader(ctk.CTk):
         )
 
     def _rename_image(self):
-        """重命名图片"""
-        if not self.current_image:
+        """重命名图片（网络请求在后台线程中进行，不阻塞界面）"""
+        record = self.current_image
+        if not record:
             return
 
-        old_name = self.current_image["name"]
+        old_name = record.name
         new_name = simpledialog.askstring("重命名图片", "输入新的文件名:", initialvalue=old_name)
+        if not new_name or new_name == old_name:
+            return
+        folder = record.folder
+        new_path = f"{folder}/{new_name}" if folder else new_name
+        if record_key(record.shard, new_path) in self.library:
+            messagebox.showerror("重命名失败", f"已存在同名文件: {new_path}")
+            return
 
-        if new_name and new_name != old_name:
+        def rename_task():
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
             try:
-                self._log(f"开始重命名: {old_name} -> {new_name}")
-                
-                # 下载旧图
-                response = requests.get(self.current_image["raw_url"], stream=True)
-                image_data = response.content
-                temp_path = os.path.join("temp_rename", new_name)
-
-                os.makedirs("temp_rename", exist_ok=True)
-                with open(temp_path, "wb") as f:
-                    f.write(image_data)
-                
-                # 上传新图
-                GitHubImageManager.upload_image(temp_path, self.config)
+                self._log(f"开始重命名: {old_name} -> {new_name}", component="rename")
+                # 一次提交改写文件树，新路径直接引用原有内容
+                known = {"sha": record.sha, "size": record.size} if record.sha else None
+                item = GitHubImageManager.rename_path(
+                    record.path, new_name, self._shard_config(record.shard), item=known
+                )
+                self._log(f"重命名成功: {new_name}", component="rename")
+                self.ui.call(self._apply_rename, record.key, make_record(item, record.shard, now_string()))
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "重命名失败", str(e))
 
-                # 删除旧图
-                GitHubImageManager.delete_image(self.current_image["raw_url"], self.config)
+        threading.Thread(target=rename_task, daemon=True).start()
 
-                self._log(f"重命名成功: {new_name}")
-                self.refresh_images()
-
-                os.remove(temp_path)
-                os.rmdir("temp_rename")
-            
-            except Exception as e:
-                messagebox.showerror("重命名失败", str(e))
+    def _apply_rename(self, old_key, new_record):
+        """主线程：用重命名后的记录替换原卡片"""
+        with tracing.span("rename.ui_update", path=new_record.path):
+            self._view_remove(old_key)
+            self._view_insert(new_record)
 
     def _upload_files_dialog(self):
         """打开文件选择对话框"""
@@ -494,126 +656,789 @@ class ModernImageUploader(ctk.CTk):
         if files:
             self._upload_files(files)
 
+    def _shard_size(self, shard):
+        """分片路由使用的分片大小（读取快照，可在任意线程调用）"""
+        return self.shard_sizes.get(shard, 0)
+
     def _upload_files(self, file_paths):
-        """上传文件到GitHub"""
-        def upload_task():
-            self._show_progress(True)
+        """把文件加入上传队列（记录在磁盘日志中，中断后下次启动自动继续）"""
+        router = shards.router_from_config(self.config, self.shards, self._shard_size)
+        items = []
+        for path in file_paths:
+            filename = os.path.basename(path)
+            shard = router.route(filename, os.path.getsize(path))
+            items.append((
+                path,
+                GitHubImageManager.upload_path(self._shard_config(shard), filename),
+                shard.repo,
+                shard.branch
+            ))
+        # 整批只 fsync 一次，拖入几百个文件也不会让界面逐个等待磁盘
+        self.upload_journal.enqueue_many(items)
+        self._start_upload_worker()
+
+    def _start_upload_worker(self):
+        """启动上传线程（已在运行时新条目会被它继续处理）"""
+        with self._upload_lock:
+            if self._upload_worker is not None:
+                return
+            self._upload_worker = threading.Thread(target=self._upload_task, daemon=True)
+            self._upload_worker.start()
+
+    def _upload_task(self):
+        """逐个处理上传队列；网络错误时保留条目并退避重试"""
+        net_scheduler.set_thread_priority(net_scheduler.WRITE)
+        self._show_progress(True)
+        retry_delay = 5
+        
+        while not self._closing.is_set():
+            with self._upload_lock:
+                entry = self.upload_journal.next_unfinished()
+                if entry is None:
+                    self._upload_worker = None
+                    break
             
-            for i, path in enumerate(file_paths, 1):
-                try:
-                    filename = os.path.basename(path)
-                    self._update_status(f"正在上传 ({i}/{len(file_paths)}): {filename}")
-                    
-                    # 检查文件大小 (GitHub限制25MB)
-                    file_size = os.path.getsize(path)
-                    if file_size > 25 * 1024 * 1024:
-                        self._log(f"文件过大: {filename} (超过25MB)")
-                        continue
-                    
-                    # 上传到GitHub
-                    upload_url = GitHubImageManager.upload_image(path, self.config)
+            filename = os.path.basename(entry["file"])
+            remaining = len(self.upload_journal.unfinished())
+            self._update_status(f"正在上传 (剩余 {remaining}): {filename}")
+            try:
+                # 检查文件大小 (GitHub限制25MB)
+                if os.path.getsize(entry["file"]) > 25 * 1024 * 1024:
+                    self.upload_journal.mark(entry["id"], upload_journal.FAILED, error="文件过大")
+                    self._log(f"文件过大: {filename} (超过25MB)", "WARNING", "upload")
+                    continue
+                
+                # 上传到GitHub（已提交过的内容不会重复上传）
+                with tracing.span("upload", file=entry["file"]), metrics.REGISTRY.time("upload.file"):
+                    item = upload_journal.upload_entry(self.upload_journal, entry, self.config)
+                retry_delay = 5
+                
+                self._log(f"上传成功: {filename}", component="upload")
+                shard = shards.find_shard(self.shards, entry["repo"], entry["branch"], entry["target"])
+                if shard is not None:
+                    # 二分插入到已有的有序视图，只补充这一张卡片
+                    self.ui.call(self._view_insert, make_record(item, shard, now_string()))
                     
-                    if upload_url:
-                        self._log(f"上传成功: {filename}")
-                        self.refresh_images()
-                    else:
-                        self._log(f"上传失败: {filename}")
-                        
-                except Exception as e:
-                    self._log(f"上传错误: {str(e)}")
-            
+            except Exception as e:
+                if upload_journal.is_network_error(e):
+                    self._log(f"网络错误，{retry_delay} 秒后重试: {filename}", "WARNING", "upload")
+                    self._closing.wait(retry_delay)
+                    retry_delay = min(retry_delay * 2, 60)
+                else:
+                    self.upload_journal.mark(entry["id"], upload_journal.FAILED, error=str(e))
+                    self._log(f"上传错误: {filename}: {str(e)}", "ERROR", "upload")
+        
+        if not self._closing.is_set():
+            self.upload_journal.compact()
             self._show_progress(False)
             self._update_status("上传完成")
+
+    def _sync_folder_dialog(self):
+        """选择本地文件夹并增量同步到存储路径"""
+        directory = filedialog.askdirectory(title="选择要同步的文件夹")
+        if not directory:
+            return
+        delete = messagebox.askyesno("同步文件夹", "是否删除仓库中存在但本地已没有的图片？")
         
-        threading.Thread(target=upload_task, daemon=True).start()
+        def sync_task():
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
+            self._show_progress(True)
+            self._update_status("正在比较本地文件与仓库...")
+            try:
+                with metrics.REGISTRY.time("sync.plan"):
+                    plan = plan_sync(directory, self.config, delete=delete)
+                if plan.is_empty():
+                    self._log(f"同步完成: {plan.unchanged} 个文件均未变化", component="sync")
+                else:
+                    with metrics.REGISTRY.time("sync.apply"):
+                        apply_sync(
+                            plan, self.config,
+                            progress=lambda done, total: self._update_status(f"正在上传 ({done}/{total})")
+                        )
+                    self._log(
+                        f"同步完成: 上传 {len(plan.uploads)}，删除 {len(plan.deletes)}，未变化 {plan.unchanged}",
+                        component="sync"
+                    )
+                    self.ui.call(self.refresh_images)
+            except Exception as e:
+                self._log(f"同步失败: {str(e)}", "ERROR", "sync")
+            self._show_progress(False)
+            self._update_status("就绪")
+        
+        threading.Thread(target=sync_task, daemon=True).start()
+
+    def _toggle_watch_folder(self):
+        """开始/停止监视文件夹：新截图写入完成后按批自动上传，并把链接复制到剪贴板"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_btn.configure(text="监视文件夹")
+            self._log("已停止监视文件夹", component="watch")
+            return
+        
+        directory = filedialog.askdirectory(title="选择要监视的文件夹")
+        if not directory:
+            return
+        
+        def on_batch(files):
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
+            self._update_status(f"正在自动上传 {len(files)} 张图片...")
+            # 监视线程中运行：使用主线程最近一次更新的大小快照
+            router = shards.router_from_config(self.config, self.shards, self._shard_size)
+            groups = {}
+            for file_path in files:
+                shard = router.route(os.path.basename(file_path), os.path.getsize(file_path))
+                groups.setdefault(shard, []).append(file_path)
+            links = []
+            for shard, group in groups.items():
+                for file_path, repo_path, sha in upload_batch(group, self._shard_config(shard)):
+                    record = make_record(
+                        {"path": repo_path, "sha": sha, "size": os.path.getsize(file_path)}, shard, now_string()
+                    )
+                    url = self._display_url(record)
+                    name = record.name
+                    links.append(f"![{name}]({url})" if self.config.get("watch_markdown") else url)
+                    self.ui.call(self._view_insert, record)
+                    self._log(f"自动上传: {name} -> {url}", component="watch")
+            self.ui.call(self._copy_to_clipboard, "\n".join(links))
+            self._update_status("就绪")
+        
+        try:
+            self.watcher = FolderWatcher(
+                directory, on_batch,
+                on_error=lambda e: self._log(f"自动上传失败: {e}", "ERROR", "watch"),
+                debounce=float(self.config.get("watch_debounce") or 2.0)
+            ).start()
+        except Exception as e:
+            messagebox.showerror("监视失败", str(e))
+            return
+        self.watch_btn.configure(text="停止监视")
+        self._log(f"正在监视 {directory} ({self.watcher.backend})", component="watch")
 
     def refresh_images(self):
-        """刷新图片列表"""
+        """刷新图片列表（与仓库做一次完整对账）"""
         def refresh_task():
+            net_scheduler.set_thread_priority(net_scheduler.VISIBLE)
             self._show_progress(True)
             self._update_status("正在加载图片...")
             
             try:
-                self._clear_images()
-                
-                urls = GitHubImageManager.list_images(self.config)
-                
-                if not urls:
-                    self._log("没有找到图片")
-                    return
-                
-                # 初始加载部分图片
-                initial_batch = urls[:self.dynamic_batch_size] if self.lazyload_enabled else urls
-                for url in initial_batch:
-                    self._add_image_preview(url)
-                
-                self.current_loaded = len(initial_batch)
-                self._log(f"已加载 {len(initial_batch)} 张图片")
-                self._update_stats()
-                
-                # 如果启用懒加载，启动懒加载检查
-                if self.lazyload_enabled and len(urls) > self.current_loaded:
-                    self._start_lazy_loader(urls[self.current_loaded:])
+                with metrics.REGISTRY.time("refresh.list"):
+                    if self.config.get("upload_layout"):
+                        items = self._list_partitions()
+                    else:
+                        self.partitions = None
+                        items = shards.list_items(self.shards, self.config)
+                records = self._make_records(items)
+                self.ui.call(self._apply_listing, records)
+                self._resolve_dates(records)
                 
             except Exception as e:
-                self._log(f"加载失败: {str(e)}")
+                self._log(f"加载失败: {str(e)}", "ERROR", "refresh")
+                if STARTUP_BENCH:
+                    self.ui.call(self._on_close)
             
             self._show_progress(False)
             self._update_status("就绪")
         
         threading.Thread(target=refresh_task, daemon=True).start()
 
-    def _start_lazy_loader(self, remaining_urls):
-        """启动懒加载器"""
-        def lazy_load_task():
-            while remaining_urls and self.lazyload_enabled:
-                # 检查当前可见区域
-                visible_widgets = []
-                for widget in self.image_grid_frame.winfo_children():
-                    if hasattr(widget, "image_data") and self._is_widget_visible(widget):
-                        visible_widgets.append(widget)
-                
-                # 如果滚动到底部附近，加载更多
-                if len(visible_widgets) > 0 and visible_widgets[-1] == self.image_grid_frame.winfo_children()[-1]:
-                    batch = remaining_urls[:self.dynamic_batch_size]
-                    for url in batch:
-                        self._add_image_preview(url)
-                        remaining_urls.remove(url)
-                    self.current_loaded += len(batch)
-                    self._log(f"懒加载 {len(batch)} 张图片")
-                
-                self.after(500, lazy_load_task)
+    def _list_partitions(self):
+        """列出当月分区，以及此前已经加载过的更早分区（刷新时保持已加载的范围）"""
+        loader = PartitionLoader(
+            [(shard, self._shard_config(shard)) for shard in self.shards],
+            self.config["upload_layout"]
+        )
+        previous = self.partitions.loaded if self.partitions is not None else 1
+        items = loader.load_current()
+        while loader.loaded < previous:
+            older = loader.load_next()
+            if older is None:
                 break
+            items.extend(older[1])
+        self.partitions = loader
+        return items
+
+    def _maybe_load_older(self):
+        """滚动到已加载部分的末尾、或正在搜索时，在后台加载下一个更早的分区"""
+        loader = self.partitions
+        if loader is None or loader.exhausted or self._partition_loading:
+            return
+        if time.monotonic() < self._partition_retry_at:
+            return
+        searching = self.image_filter.keyword or self.image_filter.folder
+        if self.view and not searching:
+            if self.current_loaded < len(self.view) or self._visible_range()[1] < self.current_loaded - 3:
+                return
+        self._partition_loading = True
+        
+        def load_task():
+            net_scheduler.set_thread_priority(net_scheduler.PREFETCH)
+            try:
+                with metrics.REGISTRY.time("refresh.partition"):
+                    older = loader.load_next()
+                if older is not None and loader is self.partitions:
+                    partition, items = older
+                    records = self._make_records(items)
+                    self.ui.call(self._view_insert_many, records)
+                    self._resolve_dates(records)
+                    self._log(f"已加载分区 {partition or '(根目录)'}: {len(items)} 张图片", "DEBUG", "refresh")
+            except Exception as e:
+                self._log(f"加载分区失败: {e}", "ERROR", "refresh")
+                self._partition_retry_at = time.monotonic() + 30
+            finally:
+                self._partition_loading = False
+        
+        threading.Thread(target=load_task, daemon=True).start()
+
+    def _make_records(self, items):
+        """由列表结果构建记录，上传时间取自本地索引（内容未变化的图片无需再查询）"""
+        index = self.date_index
+        return [
+            make_record(item, shard, index.get(shard, item["path"], item.get("sha") or ""))
+            for shard, item in items
+        ]
+
+    def _resolve_dates(self, records):
+        """把索引中没有上传时间的记录交给后台批量查询"""
+        groups = {}
+        for record in records:
+            if not record.date:
+                groups.setdefault(record.shard, []).append((record.key, record.path, record.sha))
+        for shard, pending in groups.items():
+            self.date_resolver.submit(self._shard_config(shard), shard, pending)
+
+    def _apply_dates(self, updates):
+        """在主线程中写入查询到的上传时间；按日期排序时只移动日期变化的卡片"""
+        changes = []
+        for key, date in updates:
+            card = self.cards.get(key)
+            if card is not None:
+                card.date_label.configure(text=date)
+            changes.append((key, {"date": date}))
+        self._update_records(changes)
+        self._update_stats()
+
+    def _update_records(self, changes):
+        """主线程：批量更新记录字段 [(key, {字段: 值})]
+
+        排序键随之变化的记录在视图中移到新位置，只创建、销毁越过已渲染边界的卡片，
+        最后统一重排一次网格；视图因此始终按 view_index 使用的排序键有序。
+        """
+        first = None
+        for key, fields in changes:
+            moved = self.library.update_in_view(self.view, key, self.sort_mode, self.image_filter, **fields)
+            if moved is None:
+                continue
+            index, new_index = moved
+            fully_loaded = self.current_loaded >= len(self.view)
+            if index < self.current_loaded:
+                self.current_loaded -= 1
+            card = self.cards.get(key)
+            if new_index < self.current_loaded or fully_loaded:
+                if card is None:
+                    self._add_image_preview(self.view[new_index], new_index)
+                self.current_loaded += 1
+            elif card is not None:
+                # 移出已渲染区域，等滚动到时由懒加载重新创建
+                del self.cards[key]
+                self.thumbnails.release(key)
+                self.after(10, card.destroy)
+            first = min(i for i in (first, index, new_index) if i is not None)
+        if first is not None:
+            self._regrid_cards(first)
+
+    def _apply_listing(self, records):
+        """在主线程中把新的列表结果与图片库对账
+
+        首次加载或变化过大时整体重建；否则只对新增、删除和内容变化的图片
+        做局部更新，已有卡片与滚动位置保持不变。
+        """
+        with metrics.REGISTRY.time("refresh.apply"):
+            self._reconcile_listing(records)
+        
+        if not records:
+            self._log("没有找到图片", component="refresh")
+            if STARTUP_BENCH:
+                self.after(0, self._on_close)
+        else:
+            self._log(f"已加载 {self.current_loaded} 张图片", component="refresh")
+
+    def _reconcile_listing(self, records):
+        """对账并更新网格（计入 refresh.apply 阶段耗时）"""
+        new_records = {r.key: r for r in records}
+        removed = [key for key in [r.key for r in self.library.records()] if key not in new_records]
+        changed = [
+            r for key, r in new_records.items()
+            if key not in self.library or self.library.get(key).sha != r.sha
+        ]
+        
+        if not self.library or len(removed) + len(changed) > max(50, len(records) // 2):
+            self.library.reset(records)
+            self._render_view()
+        else:
+            self._view_remove_many(removed)
+            self._view_insert_many(changed)
+
+    def _render_view(self):
+        """按当前排序与过滤条件重建图片网格"""
+        self._clear_images()
+        self._render_generation += 1
+        self.view = self.library.query(self.sort_mode, self.image_filter)
+        
+        # 初始加载部分图片
+        initial_batch = self.view[:self.dynamic_batch_size] if self.lazyload_enabled else self.view
+        for i, record in enumerate(initial_batch):
+            self._add_image_preview(record, i)
+        self.current_loaded = len(initial_batch)
+        self._update_stats()
+        
+        # 如果启用懒加载，启动懒加载检查
+        if self.lazyload_enabled and len(self.view) > self.current_loaded:
+            self._start_lazy_loader(self._render_generation)
+
+    @tracing.traced("grid.insert")
+    def _view_insert(self, record):
+        """新增或替换单条记录，只在已渲染区域内插入对应卡片"""
+        self._view_insert_many([record])
+
+    def _view_insert_many(self, records):
+        """批量新增或替换记录，所有卡片插入后只重排一次网格"""
+        replaced = [r.key for r in records if r.key in self.library]
+        if replaced:
+            self._view_remove_many(replaced)
+        
+        first = None
+        for record in records:
+            self.library.add(record)
+            if not self.image_filter.match(record):
+                continue
+            index = self.library.view_index(self.view, record.key, self.sort_mode)
+            fully_loaded = self.current_loaded >= len(self.view)
+            self.view.insert(index, record)
+            # 插入点位于已渲染区域内（或列表已全部渲染）时才创建卡片
+            if index < self.current_loaded or fully_loaded:
+                self._add_image_preview(record, index)
+                self.current_loaded += 1
+                first = index if first is None else min(first, index)
+        if first is not None:
+            self._regrid_cards(first)
+        self._update_stats()
+
+    def _view_remove(self, key):
+        """删除单条记录，只销毁对应卡片并前移后续卡片"""
+        self._view_remove_many([key])
+
+    def _view_remove_many(self, keys):
+        """批量删除记录，销毁对应卡片后只重排一次网格"""
+        first = None
+        for key in keys:
+            if key not in self.library:
+                continue
+            if self.image_filter.match(self.library.get(key)):
+                index = self.library.view_index(self.view, key, self.sort_mode)
+                if index < len(self.view) and self.view[index].key == key:
+                    del self.view[index]
+                    card = self.cards.pop(key, None)
+                    if card is not None:
+                        self.thumbnails.release(key)
+                        self.after(10, card.destroy)
+                        self.current_loaded -= 1
+                        first = index if first is None else min(first, index)
+            self.library.remove(key)
+            self.thumbnails.discard(key)
+            self.selected.discard(key)
+        if first is not None:
+            self._regrid_cards(first)
+        self._update_selection_bar()
+        self._update_stats()
+
+    # ---- 多选 ----
+    def _on_card_click(self, event, key):
+        """单击选中；Ctrl 单击切换；Shift 单击选中与上次点击之间的范围"""
+        if event.state & 0x0001 and self._select_anchor in self.library:
+            start = self.library.view_index(self.view, self._select_anchor, self.sort_mode)
+            end = self.library.view_index(self.view, key, self.sort_mode)
+            if start > end:
+                start, end = end, start
+            changed = {r.key for r in self.view[start:end + 1]}
+            self.selected |= changed
+        elif event.state & 0x0004:
+            changed = {key}
+            self.selected ^= changed
+            self._select_anchor = key
+        else:
+            changed = self.selected | {key}
+            self.selected = set() if self.selected == {key} else {key}
+            self._select_anchor = key
+        for changed_key in changed:
+            card = self.cards.get(changed_key)
+            if card is not None:
+                self._paint_selection(card)
+        self._update_selection_bar()
+
+    def _select_all(self, event=None):
+        """选中当前过滤结果中的全部图片（输入框中保持默认的全选文字行为）"""
+        focus = self.focus_get()
+        if focus is not None and focus.winfo_class() in ("Entry", "Text"):
+            return
+        self.selected = {r.key for r in self.view}
+        for card in self.cards.values():
+            self._paint_selection(card)
+        self._update_selection_bar()
+        return "break"
+
+    def _clear_selection(self):
+        previous, self.selected = self.selected, set()
+        for key in previous:
+            card = self.cards.get(key)
+            if card is not None:
+                self._paint_selection(card)
+        self._update_selection_bar()
+
+    def _paint_selection(self, card):
+        if card.image_data.key in self.selected:
+            card.configure(border_width=2, border_color="#2A8CFF")
+        else:
+            card.configure(border_width=1, border_color=("#E1E1E1", "#4A4A4A"))
+
+    def _update_selection_bar(self):
+        if self.selected:
+            self.selection_label.configure(text=f"已选择 {len(self.selected)} 张")
+            self.selection_frame.pack(side="left", padx=10)
+        else:
+            self.selection_frame.pack_forget()
+
+    def _target_keys(self):
+        """右键操作的对象：右键的图片在多选范围内时为全部所选，否则为该图片"""
+        if self.current_image and self.current_image.key not in self.selected:
+            return [self.current_image.key]
+        return sorted(key for key in self.selected if key in self.library)
+
+    def _by_shard(self, keys):
+        """按所在分片分组记录：{分片: [记录]}"""
+        groups = {}
+        for key in keys:
+            record = self.library.get(key)
+            groups.setdefault(record.shard, []).append(record)
+        return groups
+
+    def _shard_config(self, shard):
+        """分片对应的配置（单一仓库时就是当前配置）"""
+        return self.config if shard is None or not shard.name else shard.config(self.config)
+
+    def _delete_selected(self):
+        """一次提交删除所有选中的图片"""
+        self.current_image = None
+        self._delete_keys(self._target_keys())
+
+    def _delete_keys(self, keys):
+        if not keys:
+            return
+        if not messagebox.askyesno(
+            "确认删除",
+            f"确定要永久删除选中的 {len(keys)} 张图片吗？\n此操作不可撤销！"
+        ):
+            return
+        groups = self._by_shard(keys)
+        
+        def delete_task():
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
+            self._show_progress(True)
+            self._update_status(f"正在删除 {len(keys)} 张图片...")
+            try:
+                # 每个分片一次提交
+                for shard, records in groups.items():
+                    with tracing.span("bulk.delete", count=len(records)):
+                        GitHubImageManager.delete_paths([r.path for r in records], self._shard_config(shard))
+                    self.ui.call(self._view_remove_many, [r.key for r in records])
+                self._log(f"已删除 {len(keys)} 张图片（{len(groups)} 次提交）", component="bulk")
+            except Exception as e:
+                self._log(f"批量删除失败: {str(e)}", "ERROR", "bulk")
+                self.ui.call(messagebox.showerror, "删除失败", str(e))
+            self._show_progress(False)
+            self._update_status("就绪")
+        
+        threading.Thread(target=delete_task, daemon=True).start()
+
+    def _move_selected(self):
+        """一次提交移动所有选中的图片"""
+        self.current_image = None
+        self._move_keys(self._target_keys())
+
+    def _move_keys(self, keys):
+        """每个分片一次提交把图片移动到另一个目录（只改写文件树，不重新上传内容）"""
+        if not keys:
+            return
+        folder = simpledialog.askstring(
+            "移动图片",
+            f"把 {len(keys)} 张图片移动到目录（仓库路径）:",
+            initialvalue=self.config.get("path", "")
+        )
+        if folder is None:
+            return
+        folder = folder.strip().strip("/")
+        
+        groups = self._by_shard(keys)
+        conflicts = [
+            record.name for records in groups.values() for record in records
+            if record_key(record.shard, f"{folder}/{record.name}" if folder else record.name) in self.library
+            and record.folder != folder
+        ]
+        if conflicts:
+            messagebox.showerror("移动失败", f"目标目录中已有同名图片: {', '.join(conflicts[:5])}")
+            return
+        
+        def move_task():
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
+            self._show_progress(True)
+            self._update_status(f"正在移动 {len(keys)} 张图片...")
+            try:
+                moved = 0
+                for shard, records in groups.items():
+                    by_path = {r.path: r for r in records}
+                    with tracing.span("bulk.move", count=len(records), folder=folder):
+                        moves = GitHubImageManager.move_paths(
+                            list(by_path), folder, self._shard_config(shard),
+                            shas={path: record.sha for path, record in by_path.items()}
+                        )
+                    new_records = [
+                        make_record(
+                            {"path": new_path, "sha": by_path[old].sha, "size": by_path[old].size}, shard, now_string()
+                        )
+                        for old, new_path in moves.items()
+                    ]
+                    moved += len(moves)
+                    self.ui.call(self._apply_moves, [by_path[old].key for old in moves], new_records)
+                self._log(f"已移动 {moved} 张图片到 {folder or '/'}（{len(groups)} 次提交）", component="bulk")
+            except Exception as e:
+                self._log(f"批量移动失败: {str(e)}", "ERROR", "bulk")
+                self.ui.call(messagebox.showerror, "移动失败", str(e))
+            self._show_progress(False)
+            self._update_status("就绪")
+        
+        threading.Thread(target=move_task, daemon=True).start()
+
+    def _apply_moves(self, old_keys, new_records):
+        """移动完成后一次性更新视图，并保持这些图片的选中状态"""
+        self._view_remove_many(old_keys)
+        self.selected |= {r.key for r in new_records}
+        self._view_insert_many(new_records)
+        self._update_selection_bar()
+
+    def _regrid_cards(self, start):
+        """重新定位 start 之后的已渲染卡片"""
+        for i in range(start, self.current_loaded):
+            card = self.cards.get(self.view[i].key)
+            if card is not None:
+                row, col = divmod(i, 3)
+                card.grid(row=row, column=col)
+
+    def _start_lazy_loader(self, generation):
+        """启动懒加载器，视图重建后旧的加载器自动退出"""
+        def lazy_load_task():
+            if generation != self._render_generation or not self.lazyload_enabled:
+                return
+            if self.current_loaded >= len(self.view):
+                return
+            
+            # 如果最后一张已渲染的卡片进入可见区域，加载更多
+            last_card = self.cards.get(self.view[self.current_loaded - 1].key) if self.current_loaded else None
+            if last_card is None or self._is_widget_visible(last_card):
+                batch = self.view[self.current_loaded:self.current_loaded + self.dynamic_batch_size]
+                for i, record in enumerate(batch, self.current_loaded):
+                    self._add_image_preview(record, i)
+                self.current_loaded += len(batch)
+                self._log(f"懒加载 {len(batch)} 张图片", "DEBUG", "lazyload")
+            
+            self.after(500, lazy_load_task)
         
         self.after(500, lazy_load_task)
 
+    def _viewport(self):
+        """返回网格当前可见区域的纵向范围（网格内坐标）"""
+        canvas = self.image_grid_frame._parent_canvas
+        top, bottom = canvas.yview()
+        height = self.image_grid_frame.winfo_height()
+        return top * height, bottom * height
+
     def _is_widget_visible(self, widget):
         """检查部件是否在可见区域内"""
         try:
-            canvas = self.image_grid_frame._parent_canvas
+            view_top, view_bottom = self._viewport()
             widget_y = widget.winfo_y()
-            canvas_height = self.image_grid_frame.winfo_height()
-            return 0 <= widget_y <= canvas_height
+            return widget_y + widget.winfo_height() >= view_top and widget_y <= view_bottom
         except Exception:
             return False
 
+    def _row_height(self):
+        card = next(iter(self.cards.values()), None)
+        row_height = (card.winfo_height() + 20) if card is not None else 300
+        return max(row_height, 1)
+
+    def _visible_range(self):
+        """按行高估算当前可见的视图下标范围 [start, end)"""
+        row_height = self._row_height()
+        view_top, view_bottom = self._viewport()
+        start = int(view_top // row_height) * 3
+        end = (int(view_bottom // row_height) + 1) * 3
+        return start, min(end, self.current_loaded)
+
+    def _sync_viewport(self):
+        """定时同步视口：加载可见卡片的缩略图，并在超出内存预算时释放远处的卡片"""
+        try:
+            if self.cards:
+                start, end = self._visible_range()
+                self._update_prefetch(start, end)
+                for record in self.view[start:end]:
+                    card = self.cards.get(record.key)
+                    if card is None:
+                        continue
+                    if record.loaded:
+                        self.thumbnails.touch(record.key)
+                    elif record.failed or not self.thumbnails.has_compact(record.key):
+                        continue  # 等待预取完成
+                    elif not self.lazyload_enabled or self._is_widget_visible(card):
+                        self._load_card_image(card)
+                
+                if self.thumbnails.over_budget():
+                    keep = self.thumbnail_keep_rows * 3
+                    self._release_far_thumbnails(start - keep, end + keep)
+            
+            self._maybe_load_older()
+            self.thumbnail_memory_label.configure(
+                text=f"缩略图内存: {self.thumbnails.resident_bytes / 1024 / 1024:.1f} MB"
+            )
+            self._update_request_stats()
+        except Exception as e:
+            self._log(f"视口同步失败: {e}", "DEBUG", "grid")
+        self.after(250, self._sync_viewport)
+
+    def _update_prefetch(self, start, end):
+        """根据滚动速度更新预取窗口：可见卡片优先，其次是滚动方向前方的若干行"""
+        now = time.monotonic()
+        top = self._viewport()[0]
+        if self._scroll_sample is not None:
+            last_top, last_time = self._scroll_sample
+            if now > last_time:
+                velocity = (top - last_top) / (now - last_time)
+                self._scroll_velocity = 0.5 * self._scroll_velocity + 0.5 * velocity
+        self._scroll_sample = (top, now)
+        
+        # 前方预取行数 = 基础 2 行 + 按速度在 lookahead 秒内会滚过的行数
+        lookahead = float(self.config.get("prefetch_lookahead") or 1.0)
+        max_rows = int(self.config.get("prefetch_max_rows") or 12)
+        rows = 2 + min(max_rows, int(abs(self._scroll_velocity) * lookahead / self._row_height()))
+        if not self.prefetch_ahead:
+            ahead = behind = []
+        elif self._scroll_velocity >= 0:
+            ahead = self.view[end:end + rows * 3]
+            behind = self.view[max(0, start - 3):start][::-1]
+        else:
+            ahead = self.view[max(0, start - rows * 3):start][::-1]
+            behind = self.view[end:end + 3]
+        
+        # 可见卡片按可见优先级请求，其余按预取优先级（排队时会让位给更重要的请求）
+        window = [(record, net_scheduler.VISIBLE) for record in self.view[start:end]]
+        window += [(record, net_scheduler.PREFETCH) for record in ahead + behind]
+        self.prefetcher.update([
+            (record.key, (record, priority))
+            for record, priority in window
+            if not record.loaded and not record.failed
+            and not self.thumbnails.has_compact(record.key)
+        ])
+
+    def _prefetch_fetch(self, task):
+        """异步引擎下的下载阶段：本地已有时直接返回，否则交给事件循环（按任务的优先级排队）"""
+        record, priority = task
+        sha = record.sha
+        data = self.blobs.get(sha) if sha else None
+        if data is not None:
+            future = Future()
+            future.set_result(data)
+            return future
+        return self.mirrors.fetch_async(
+            record.path, self._shard_config(record.shard),
+            lambda url: self.async_engine.download(url, timeout=10, priority=priority),
+            self._blob_verifier(sha)
+        )
+
+    def _prefetch_thumbnail(self, task, data=None):
+        """后台线程：读取图片内容并生成缩略图，存入紧凑缓存"""
+        record, priority = task
+        if data is None:
+            with net_scheduler.priority(priority):
+                data = self._image_bytes(record, timeout=10)
+        elif record.sha and record.sha not in self.blobs:
+            try:
+                self.blobs.put(record.sha, data)
+            except OSError:
+                pass
+        img, width, height = thumbnail_render.render(data)
+        self.thumbnails.store_compact(record.key, img)
+        return img, width, height
+
+    def _on_prefetched(self, key, task, result, error, wanted):
+        self.ui.call(self._apply_prefetched, key, result, error, wanted)
+
+    def _apply_prefetched(self, key, result, error, wanted):
+        """主线程：把预取的缩略图挂到仍在窗口中的卡片上"""
+        if key not in self.library:
+            return
+        card = self.cards.get(key)
+        if error is not None:
+            self.library.get(key).failed = True
+            if card is not None:
+                card.image_label.configure(text="[预览加载失败]")
+            self._log(f"缩略图加载失败: {key}: {error}", "DEBUG", "prefetch")
+            return
+        img, width, height = result
+        if wanted and card is not None and not card.image_data.loaded:
+            self._attach_thumbnail(card, img)
+        # 按尺寸排序时卡片随之移动到新位置
+        self._update_records([(key, {"width": width, "height": height})])
+
+    def _release_far_thumbnails(self, keep_start, keep_end):
+        """按最久未用顺序释放视口保留区之外的缩略图，直到回到预算内"""
+        for path in self.thumbnails.eviction_candidates():
+            if not self.thumbnails.over_budget():
+                break
+            card = self.cards.get(path)
+            if card is None:
+                self.thumbnails.release(path)
+                continue
+            index = self.library.view_index(self.view, path, self.sort_mode)
+            if keep_start <= index < keep_end:
+                continue
+            self._release_thumbnail(card)
+
+    def _release_thumbnail(self, card):
+        """释放卡片上已解码的缩略图，只保留紧凑缓存"""
+        card.image_label.configure(image=None, text="加载中...")
+        card.image_label._label.configure(image="")
+        card.image_label.image = None
+        card.image_data.loaded = False
+        self.thumbnails.release(card.image_data.key)
+
     def _clear_images(self):
         """清空图片列表"""
         for widget in self.image_grid_frame.winfo_children():
             if widget != self.upload_card:
                 self.after(10, widget.destroy)  # 延迟销毁避免 canvas 被引用错误
-        self.images = []
+        self.cards = {}
+        self.thumbnails.release_all()
         self.current_loaded = 0
 
         # 隐藏上传卡片
         self.upload_card.grid_remove()
 
-    def _add_image_preview(self, image_url):
-        """添加现代化图片预览卡片"""
+    @tracing.traced("grid.add_preview")
+    def _add_image_preview(self, record, index):
+        """在视图第 index 个位置添加现代化图片预览卡片"""
         try:
             # 解析文件名和路径
-            filename = os.path.basename(image_url)
-            display_url = self._apply_custom_domain(image_url)
+            filename = record.name
+            display_url = self._display_url(record)
             
             # 创建卡片容器
             card = ctk.CTkFrame(
@@ -625,16 +1450,13 @@ class ModernImageUploader(ctk.CTk):
                 border_color=("#E1E1E1", "#4A4A4A")
             )
             
-            # 计算插入位置（保持上传卡片在中间）
-            row, col = divmod(len(self.images), 3)
+            # 计算网格位置
+            row, col = divmod(index, 3)
             card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-            card.image_data = {
-                "url": display_url, 
-                "raw_url": image_url, 
-                "name": filename,
-                "date": datetime.now().strftime("%Y-%m-%d"),
-                "loaded": False
-            }
+            record.loaded = False
+            card.image_data = record
+            if record.key in self.selected:
+                self._paint_selection(card)
             
             # 加载缩略图（带圆角效果）
             img_label = ctk.CTkLabel(
@@ -662,15 +1484,20 @@ class ModernImageUploader(ctk.CTk):
             name_label.pack(fill="x")
             name_label.bind("<Button-3>", self._show_context_menu)
             
+            # 单击选择（Ctrl/Shift 多选）
+            for widget in (card, img_label, name_label):
+                widget.bind("<Button-1>", lambda e, k=record.key: self._on_card_click(e, k))
+            
             # 日期信息
             date_label = ctk.CTkLabel(
                 info_frame,
-                text=card.image_data["date"],
+                text=card.image_data.date,
                 font=ctk.CTkFont(size=10),
                 text_color=("gray50", "gray40"),
                 anchor="w"
             )
             date_label.pack(fill="x", pady=(2, 0))
+            card.date_label = date_label
             
             # 操作按钮组
             btn_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
@@ -697,109 +1524,180 @@ class ModernImageUploader(ctk.CTk):
             # 绑定右键菜单
             card.bind("<Button-3>", self._show_context_menu)
             
-            # 添加到图片列表
-            self.images.append(card.image_data)
-            self._update_stats()
+            # 记录已渲染的卡片
+            self.cards[record.key] = card
             
-            # 如果是懒加载模式，延迟加载图片
-            if self.lazyload_enabled:
-                def load_image():
-                    if self._is_widget_visible(card) and not card.image_data["loaded"]:
-                        self._load_card_image(card)
-                
-                self.after(100, load_image)
-            else:
+            # 缩略图由视口同步交给预取线程加载；非懒加载模式下紧凑缓存中已有的立即恢复
+            if not self.lazyload_enabled and self.thumbnails.has_compact(record.key):
                 self._load_card_image(card)
             
         except Exception as e:
-            self._log(f"添加预览失败: {str(e)}")
+            self._log(f"添加预览失败: {str(e)}", "ERROR", "grid")
 
+    @tracing.traced("grid.load_thumbnail")
     def _load_card_image(self, card):
-        """加载卡片图片内容"""
-        try:
-            url = card.image_data["raw_url"]
-            response = requests.get(url, timeout=5)
-            img = Image.open(io.BytesIO(response.content))
-            img = ImageOps.fit(img, (240, 180), method=Image.LANCZOS)
-            
-            # 创建圆角遮罩
-            mask = Image.new("L", (240, 180), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.rounded_rectangle((0, 0, 240, 180), radius=10, fill=255)
-            
-            img.putalpha(mask)
-            
-            # 转换为CTkImage
+        """从紧凑缓存恢复卡片缩略图（不访问网络；下载与解码都在预取线程中进行）"""
+        cached = self.thumbnails.load_compact(card.image_data.key)
+        if cached is not None:
+            self._attach_thumbnail(card, cached)
+
+    def _attach_thumbnail(self, card, img):
+        """把缩略图挂到卡片上并计入常驻内存"""
+        # 转换为CTkImage
+        with metrics.REGISTRY.time("thumbnail.attach"):
             photo = ctk.CTkImage(
                 light_image=img,
                 dark_image=img,
                 size=(240, 180)
             )
-            
             card.image_label.configure(image=photo, text="")
-            card.image_label.image = photo
-            card.image_label.bind("<Double-1>", lambda e: self._preview_image(url))
-            card.image_data["loaded"] = True
-            
-        except Exception as img_err:
-            card.image_label.configure(text="[预览加载失败]")
+        card.image_label.image = photo
+        card.image_label.bind("<Double-1>", lambda e: self._preview_image(card.image_data))
+        card.image_data.loaded = True
+        # PIL 图像与 Tk PhotoImage 各占一份
+        self.thumbnails.mark_resident(card.image_data.key, ThumbnailCache.image_bytes(img) * 2)
+        
+        if not self._first_thumbnail_shown:
+            self._first_thumbnail_shown = True
+            if STARTUP_BENCH:
+                print(f"STARTUP first_thumbnail {time.time():.6f}", flush=True)
+                self.after(0, self._on_close)
+
+    def _update_request_stats(self):
+        """在统计面板显示请求总数与API限额余量"""
+        total = 0
+        remaining = limit = None
+        snapshot = metrics.REGISTRY.snapshot()
+        for counter in snapshot["counters"]:
+            if counter["name"] == "ghiu_http_requests_total":
+                total += counter["value"]
+        for gauge in snapshot["gauges"]:
+            if gauge["name"] == "ghiu_ratelimit_remaining":
+                remaining = gauge["value"]
+            elif gauge["name"] == "ghiu_ratelimit_limit":
+                limit = gauge["value"]
+        quota = f"{remaining}/{limit}" if remaining is not None else "-"
+        self.request_stats_label.configure(text=f"请求: {total}  API限额: {quota}")
+
+    def _open_metrics(self):
+        """性能指标窗口：每秒刷新，可导出为JSON或Prometheus格式"""
+        window = ctk.CTkToplevel(self)
+        window.title("性能指标")
+        window.geometry("560x480")
+        window.transient(self)
+        
+        text = ctk.CTkTextbox(window, wrap="none", font=ctk.CTkFont(family="Courier", size=12))
+        text.pack(fill="both", expand=True, padx=10, pady=(10, 0))
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            text.delete("1.0", "end")
+            text.insert("end", metrics.REGISTRY.summary())
+            scheduler = net_scheduler.stats()
+            if scheduler:
+                text.insert("end", "\n\n优先级        进行中  排队\n")
+                for name in scheduler["active"]:
+                    text.insert("end", f"{name:<12} {scheduler['active'][name]:>6} {scheduler['waiting'][name]:>5}\n")
+            hosts = self.mirrors.stats()
+            if len(hosts) > 1:
+                text.insert("end", "\n主机            延迟ms  请求  失败  状态\n")
+                for host in hosts:
+                    latency = "-" if host["latency_ms"] is None else f"{host['latency_ms']:.1f}"
+                    state = "正常" if host["healthy"] else "冷却"
+                    text.insert("end", f"{host['host']:<14} {latency:>8} {host['requests']:>5} {host['errors']:>5}  {state}\n")
+            window.after(1000, refresh)
+        
+        def export(kind):
+            extension = ".prom" if kind == "prometheus" else ".json"
+            save_path = filedialog.asksaveasfilename(
+                parent=window,
+                initialfile=f"metrics{extension}",
+                defaultextension=extension,
+                filetypes=[("Prometheus", "*.prom")] if kind == "prometheus" else [("JSON", "*.json")]
+            )
+            if save_path:
+                try:
+                    metrics.REGISTRY.export(save_path)
+                    self._log(f"指标已导出到: {save_path}", component="metrics")
+                except Exception as e:
+                    messagebox.showerror("导出失败", str(e), parent=window)
+        
+        toolbar = ctk.CTkFrame(window, fg_color="transparent")
+        toolbar.pack(fill="x", padx=10, pady=10)
+        ctk.CTkButton(toolbar, text="导出JSON", width=100, command=lambda: export("json")).pack(side="left", padx=5)
+        ctk.CTkButton(
+            toolbar, text="导出Prometheus", width=120, command=lambda: export("prometheus")
+        ).pack(side="left", padx=5)
+        ctk.CTkButton(toolbar, text="清零", width=80, command=metrics.REGISTRY.reset).pack(side="left", padx=5)
+        ctk.CTkButton(toolbar, text="关闭", width=80, command=window.destroy).pack(side="right", padx=5)
+        
+        refresh()
 
     def _update_stats(self):
-        """更新统计信息"""
-        self.image_count_label.configure(text=f"图片总数: {len(self.images)}")
-        if self.images:
-            last_upload = max(img["date"] for img in self.images)
-            self.last_upload_label.configure(text=f"最后上传: {last_upload}")
+        """更新统计信息（图片库变化后在主线程调用，同时刷新分片大小快照）"""
+        self.shard_sizes = self.library.shard_sizes()
+        self.image_count_label.configure(text=f"图片总数: {len(self.library)}")
+        latest = self.library.last("date")
+        if latest and latest.date:
+            self.last_upload_label.configure(text=f"最后上传: {latest.date}")
         else:
             self.last_upload_label.configure(text="最后上传: 无")
+        self.total_size_label.configure(
+            text=f"总大小: {self.library.total_size() / 1024 / 1024:.2f} MB"
+        )
+
+    def _parse_size_kb(self, entry):
+        """解析大小输入框（KB），空或非法时返回None"""
+        text = entry.get().strip()
+        if not text:
+            return None
+        try:
+            return int(float(text) * 1024)
+        except ValueError:
+            self._log(f"无效的大小: {text}")
+            return None
+
+    def _apply_filters(self):
+        """根据搜索栏与过滤栏重建视图"""
+        self.image_filter = ImageFilter(
+            formats=FORMAT_LABELS[self.format_option.get()],
+            min_size=self._parse_size_kb(self.min_size_entry),
+            max_size=self._parse_size_kb(self.max_size_entry),
+            folder=self.folder_entry.get(),
+            keyword=self.search_entry.get().strip()
+        )
+        self._render_view()
+        if self.image_filter.is_empty():
+            self._update_status("就绪")
+        else:
+            self._update_status(f"找到 {len(self.view)} 张匹配图片")
 
     def _search_images(self):
         """搜索图片"""
-        keyword = self.search_entry.get().lower()
-        if not keyword:
-            return
-            
-        count = 0
-        for widget in self.image_grid_frame.winfo_children():
-            if hasattr(widget, "image_data"):
-                img_name = widget.image_data["name"].lower()
-                if keyword in img_name:
-                    widget.grid()
-                    count += 1
-                else:
-                    widget.grid_remove()
-        
-        self._update_status(f"找到 {count} 张匹配图片")
+        self._apply_filters()
 
     def _clear_search(self):
-        """清除搜索"""
+        """清除搜索与过滤条件"""
         self.search_entry.delete(0, "end")
-        for widget in self.image_grid_frame.winfo_children():
-            if hasattr(widget, "image_data"):
-                widget.grid()
+        self.min_size_entry.delete(0, "end")
+        self.max_size_entry.delete(0, "end")
+        self.folder_entry.delete(0, "end")
+        self.format_option.set(next(iter(FORMAT_LABELS)))
+        self.image_filter = ImageFilter()
+        self._render_view()
         self._update_status("已清除搜索")
 
-    def _apply_custom_domain(self, url):
-        """应用自定义域名"""
-        if not self.config.get("custom_domain"):
-            return url
-            
-        try:
-            # 从原始URL中提取路径
-            parsed = urlparse(url)
-            path = parsed.path
-            
-            # 移除可能的branch路径 (如/main/)
-            if "/main/" in path:
-                path = path.split("/main/", 1)[1]
-            elif "/master/" in path:
-                path = path.split("/master/", 1)[1]
-            
-            # 组合自定义域名
-            return self.config["custom_domain"].rstrip("/") + "/" + path.lstrip("/")
-            
-        except:
-            return url
+    def _set_sort_mode(self, label):
+        """切换排序方式"""
+        self.sort_mode = SORT_LABELS[label]
+        self.config["sort_mode"] = self.sort_mode.name
+        self._save_config()
+        self._render_view()
+
+    def _display_url(self, record):
+        """复制给用户的链接（设置了自定义域名时使用自定义域名）"""
+        return GitHubImageManager.url_scheme(self._shard_config(record.shard)).display_url(record.path)
 
     def _show_context_menu(self, event):
         """显示右键菜单"""
@@ -810,38 +1708,76 @@ class ModernImageUploader(ctk.CTk):
                 return
                 
         self.current_image = widget.image_data
+        if self.context_menu is None:
+            self._setup_context_menu()
         self.context_menu.tk_popup(event.x_root, event.y_root)
 
     def _copy_image_url(self):
         """复制图片URL"""
         if self.current_image:
             self.clipboard_clear()
-            self.clipboard_append(self.current_image["url"])
-            self._log(f"已复制链接: {self.current_image['url']}")
+            url = self._display_url(self.current_image)
+            self.clipboard_append(url)
+            self._log(f"已复制链接: {url}", component="clipboard")
 
     def _copy_markdown(self):
         """复制Markdown格式"""
         if self.current_image:
-            md = f"![{self.current_image['name']}]({self.current_image['url']})"
+            md = f"![{self.current_image.name}]({self._display_url(self.current_image)})"
             self.clipboard_clear()
             self.clipboard_append(md)
-            self._log(f"已复制Markdown: {md}")
+            self._log(f"已复制Markdown: {md}", component="clipboard")
 
     def _copy_to_clipboard(self, text):
         """复制文本到剪贴板"""
         self.clipboard_clear()
         self.clipboard_append(text)
-        self._log(f"已复制: {text[:50]}...")
+        self._log(f"已复制: {text[:50]}...", component="clipboard")
 
-    def _preview_image(self, image_url=None):
-        """现代化图片预览窗口"""
-        url = image_url or (self.current_image["raw_url"] if self.current_image else None)
-        if not url:
+    @staticmethod
+    def _blob_verifier(sha):
+        """已知 SHA 时校验下载内容（镜像可能返回过期的版本）"""
+        if not sha:
+            return None
+        return lambda data: git_blob_sha(data) == sha
+
+    def _image_bytes(self, record, timeout=30):
+        """读取图片内容：优先本地 blob 存储，没有时从最快的主机下载一次并存入"""
+        sha = record.sha
+        loader = lambda: self.mirrors.fetch(
+            record.path, self._shard_config(record.shard),
+            lambda url: GitHubImageManager.download(url, timeout=timeout),
+            self._blob_verifier(sha)
+        )
+        if not sha:
+            return loader()
+        return self.blobs.fetch(sha, loader)
+
+    def _preview_image(self, record=None):
+        """现代化图片预览窗口（图片内容在后台线程中读取）"""
+        record = record or self.current_image
+        if not record:
             return
+
+        def fetch_task():
+            net_scheduler.set_thread_priority(net_scheduler.PREVIEW)
+            try:
+                data = self._image_bytes(record, timeout=10)
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "预览失败", str(e))
+                return
+            self.ui.call(self._show_preview, record, data)
+
+        threading.Thread(target=fetch_task, daemon=True).start()
+
+    def _show_preview(self, record, data):
+        """主线程：用已读取的内容打开预览窗口"""
+        url = GitHubImageManager.raw_url(record.path, self._shard_config(record.shard))
             
         try:
-            response = requests.get(url, timeout=10)
-            img = Image.open(io.BytesIO(response.content))
+            from PIL import Image
+            
+            img = Image.open(io.BytesIO(data))
             
             preview = ctk.CTkToplevel(self)
             preview.title(f"图片预览 - {os.path.basename(url)}")
@@ -893,7 +1829,7 @@ class ModernImageUploader(ctk.CTk):
                 toolbar,
                 text="下载",
                 width=80,
-                command=lambda: self._download_image(url)
+                command=lambda: self._download_image(record)
             ).pack(side="left", padx=5)
             
             ctk.CTkButton(
@@ -912,41 +1848,59 @@ class ModernImageUploader(ctk.CTk):
         except Exception as e:
             messagebox.showerror("预览失败", str(e))
 
-    def _download_image(self, url):
-        """下载图片到本地"""
+    def _download_image(self, record):
+        """保存图片到本地（内容来自本地 blob 存储）"""
         try:
-            filename = os.path.basename(url)
+            filename = record.name
             save_path = filedialog.asksaveasfilename(
                 initialfile=filename,
                 defaultextension=".*",
                 filetypes=[("图片文件", "*.png;*.jpg;*.jpeg;*.gif")]
             )
             if save_path:
-                response = requests.get(url, stream=True)
-                with open(save_path, "wb") as f:
-                    for chunk in response.iter_content(1024):
-                        f.write(chunk)
-                self._log(f"图片已保存到: {save_path}")
+                threading.Thread(target=self._save_image_task, args=(record, save_path), daemon=True).start()
         except Exception as e:
             messagebox.showerror("下载失败", str(e))
 
+    def _save_image_task(self, record, save_path):
+        """后台线程：读取图片内容并写入文件"""
+        net_scheduler.set_thread_priority(net_scheduler.PREVIEW)
+        try:
+            data = self._image_bytes(record)
+            with open(save_path, "wb") as f:
+                f.write(data)
+            self._log(f"图片已保存到: {save_path}")
+        except Exception as e:
+            self.ui.call(messagebox.showerror, "下载失败", str(e))
+
     def _delete_image(self):
-        """删除图片"""
+        """删除图片（右键的图片在多选范围内时删除全部所选）"""
         if not self.current_image:
             return
+        if self.current_image.key in self.selected and len(self.selected) > 1:
+            self._delete_selected()
+            return
             
+        record = self.current_image
         if not messagebox.askyesno(
             "确认删除",
-            f"确定要永久删除 {self.current_image['name']} 吗？\n此操作不可撤销！"
+            f"确定要永久删除 {record.name} 吗？\n此操作不可撤销！"
         ):
             return
-            
-        try:
-            if GitHubImageManager.delete_image(self.current_image["raw_url"], self.config):
-                self._log(f"已删除: {self.current_image['name']}")
-                self.refresh_images()
-        except Exception as e:
-            messagebox.showerror("删除失败", str(e))
+
+        def delete_task():
+            net_scheduler.set_thread_priority(net_scheduler.WRITE)
+            try:
+                deleted = GitHubImageManager.delete_path(
+                    record.path, self._shard_config(record.shard), sha=record.sha or None
+                )
+                if deleted:
+                    self._log(f"已删除: {record.name}")
+                    self.ui.call(self._view_remove, record.key)
+            except Exception as e:
+                self.ui.call(messagebox.showerror, "删除失败", str(e))
+
+        threading.Thread(target=delete_task, daemon=True).start()
 
     def _open_settings(self):
         """打开设置窗口"""
@@ -1068,6 +2022,24 @@ class ModernImageUploader(ctk.CTk):
         theme_option.set(self.config.get("theme_mode", "System"))
         theme_option.pack(side="left", padx=5)
         
+        # 日志级别
+        log_frame = ctk.CTkFrame(advanced_frame, fg_color="transparent")
+        log_frame.pack(fill="x", pady=5)
+        
+        ctk.CTkLabel(
+            log_frame,
+            text="日志级别:",
+            width=120,
+            anchor="e"
+        ).pack(side="left", padx=5)
+        
+        log_level_option = ctk.CTkOptionMenu(
+            log_frame,
+            values=list(LEVELS)
+        )
+        log_level_option.set(self.config.get("log_level", "INFO"))
+        log_level_option.pack(side="left", padx=5)
+        
         # 保存按钮
         def save_settings():
             for key, entry in entries.items():
@@ -1079,10 +2051,14 @@ class ModernImageUploader(ctk.CTk):
             self.config.update({
                 "lazyload_enabled": self.lazyload_enabled,
                 "dynamic_batch_size": self.dynamic_batch_size,
-                "theme_mode": theme_option.get()
+                "theme_mode": theme_option.get(),
+                "log_level": log_level_option.get()
             })
             
             self._save_config()
+            self._configure_logging()
+            self.mirrors = MirrorSelector(hosts_from_config(self.config))
+            self.shards = shards.shards_from_config(self.config)
             self._log("配置已保存")
             settings.destroy()
             self.refresh_images()
@@ -1106,25 +2082,55 @@ class ModernImageUploader(ctk.CTk):
         ctk.set_appearance_mode(mode)
         self._log(f"主题已切换为: {mode}")
 
-    def _log(self, message):
-        """记录日志"""
+    def _log(self, message, level="INFO", component="app"):
+        """记录日志（可在任意线程调用，界面按批次刷新）"""
+        self.log_buffer.log(message, level, component)
+
+    def _flush_log(self):
+        """把缓冲中的新日志批量写入日志区域，并裁剪超出上限的旧行"""
         try:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            if hasattr(self, 'log_area'):
-                self.log_area.insert("end", f"[{timestamp}] {message}\n")
+            lines = self.log_buffer.drain()
+            if lines:
+                self.log_area.insert("end", "\n".join(lines) + "\n")
+                line_count = int(self.log_area.index("end-1c").split(".")[0])
+                excess = line_count - self.log_buffer.capacity
+                if excess > 0:
+                    self.log_area.delete("1.0", f"{excess + 1}.0")
                 self.log_area.see("end")
-                self.log_area.update()
-            else:
-                print(f"[{timestamp}] {message}")  # Fallback to console
         except Exception as e:
             print(f"Logging error: {str(e)}")
+        self.after(100, self._flush_log)
+
+    def _on_close(self):
+        """关闭窗口前停止后台日志线程"""
+        self._closing.set()
+        self.prefetcher.close()
+        self.ui.close()
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.async_engine is not None:
+            github_manager.set_engine(None)
+            self.async_engine.close()
+        try:
+            self.date_index.save()
+        except OSError:
+            pass
+        self.log_buffer.close_file()
+        tracing.disable()
+        self.destroy()
 
     def _update_status(self, message):
-        """更新状态栏"""
+        """更新状态栏（可在任意线程调用，连续更新只保留最新值）"""
+        self.ui.post("status", self._set_status, message)
+
+    def _set_status(self, message):
         self.status_label.configure(text=message)
 
     def _show_progress(self, show=True):
-        """显示/隐藏进度条"""
+        """显示/隐藏进度条（可在任意线程调用）"""
+        self.ui.post("progress", self._set_progress, show)
+
+    def _set_progress(self, show):
         if show:
             self.progress_bar.start()
             self.progress_bar.pack(side="right", padx=15)
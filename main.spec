@@ -31,7 +31,7 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # UPX 压缩的文件每次启动都要解压，会拖慢冷启动
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -44,7 +44,7 @@ coll = COLLECT(
     a.zipfiles,
     a.datas,
     strip=False,
-    upx=True,
+    upx=False,
     upx_exclude=[],
     name='GitHubImageUploader',
 )
@@ -0,0 +1,288 @@
+"""请求级指标
+
+所有经 github_manager.request 发出的 HTTP 请求都会按端点记录次数、状态码、
+收发字节数与延迟分布，同时记录重试次数与 API 限额余量；各处理阶段
+（列表、缩略图解码/缩放、上传等）用 REGISTRY.time(...) 计时。
+指标可导出为 JSON 或 Prometheus 文本格式。
+"""
+import bisect
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import tracing
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "ghiu_http_requests_total": "HTTP请求次数",
+    "ghiu_http_request_seconds": "HTTP请求耗时（秒）",
+    "ghiu_http_bytes_sent_total": "发送的请求体字节数",
+    "ghiu_http_bytes_received_total": "接收的响应体字节数",
+    "ghiu_http_retries_total": "请求重试次数",
+    "ghiu_ratelimit_limit": "API限额上限",
+    "ghiu_ratelimit_remaining": "API限额剩余",
+    "ghiu_ratelimit_reset_timestamp": "API限额重置时间（Unix秒）",
+    "ghiu_stage_seconds": "处理阶段耗时（秒）",
+    "ghiu_net_queue_seconds": "请求在优先级调度中排队的时间（秒）",
+    "ghiu_prefetch_total": "缩略图预取任务（done/stale/cancelled/error）",
+    "ghiu_blob_store_requests_total": "本地blob存储读取次数（hit/miss/shared）",
+}
+
+_GIT_ENDPOINT = re.compile(r"^/repos/[^/]+/[^/]+/git/(trees|blobs|commits|refs?)(/|$)")
+_REPO_ENDPOINT = re.compile(r"^/repos/[^/]+/[^/]+/(contents)(/|$)")
+
+
+def endpoint_of(url):
+    """把URL归类为低基数的端点名（contents、git/trees、graphql、download 等）"""
+    path = urlparse(url).path
+    match = _GIT_ENDPOINT.match(path)
+    if match:
+        name = match.group(1)
+        return "git/refs" if name == "ref" else f"git/{name}"
+    if _REPO_ENDPOINT.match(path):
+        return "contents"
+    if path.rstrip("/").endswith("/graphql"):
+        return "graphql"
+    if path.startswith("/repos/"):
+        return "api"
+    return "download"
+
+
+class Histogram:
+    """固定分桶的直方图"""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """按分桶估算分位数（返回所在桶的上界，超出最大桶时返回最大值）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """线程安全的计数器、仪表与直方图集合"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}     # (名称, 标签) -> 数值
+        self._gauges = {}
+        self._histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, stage):
+        """记录一个处理阶段的耗时（开启追踪时同时记录为 span）"""
+        start = time.perf_counter()
+        try:
+            with tracing.span(stage):
+                yield
+        finally:
+            self.observe("ghiu_stage_seconds", time.perf_counter() - start, stage=stage)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    # ---- 导出 ----
+    def snapshot(self):
+        """返回可直接序列化为JSON的指标快照"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "time": time.time(),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._gauges.items())
+                ],
+                "histograms": [
+                    dict(histogram.to_dict(), name=name, labels=dict(labels))
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus 文本格式（0.0.4）"""
+        lines = []
+        with self._lock:
+            groups = {}
+            for (name, labels), value in self._counters.items():
+                groups.setdefault((name, "counter"), []).append((labels, value))
+            for (name, labels), value in self._gauges.items():
+                groups.setdefault((name, "gauge"), []).append((labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                groups.setdefault((name, "histogram"), []).append((labels, histogram))
+
+            for (name, kind), series in sorted(groups.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series, key=lambda s: s[0]):
+                    if kind != "histogram":
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """按扩展名导出：.prom / .txt 为 Prometheus 格式，其余为 JSON"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def summary(self):
+        """供界面显示的简要文本：按端点与阶段汇总"""
+        snapshot = self.snapshot()
+        requests, errors, sent, received = {}, {}, {}, {}
+        retries = 0
+        for counter in snapshot["counters"]:
+            labels = counter["labels"]
+            key = (labels.get("endpoint"), labels.get("method"))
+            if counter["name"] == "ghiu_http_requests_total":
+                requests[key] = requests.get(key, 0) + counter["value"]
+                if not labels.get("status", "").startswith(("2", "3")):
+                    errors[key] = errors.get(key, 0) + counter["value"]
+            elif counter["name"] == "ghiu_http_bytes_sent_total":
+                sent[labels.get("endpoint")] = counter["value"]
+            elif counter["name"] == "ghiu_http_bytes_received_total":
+                received[labels.get("endpoint")] = counter["value"]
+            elif counter["name"] == "ghiu_http_retries_total":
+                retries += counter["value"]
+
+        lines = [f"请求总数: {sum(requests.values())}  失败: {sum(errors.values())}  重试: {retries}"]
+        gauges = {g["name"]: g["value"] for g in snapshot["gauges"]}
+        if "ghiu_ratelimit_remaining" in gauges:
+            reset = gauges.get("ghiu_ratelimit_reset_timestamp")
+            reset_text = time.strftime("%H:%M:%S", time.localtime(reset)) if reset else "-"
+            lines.append(
+                f"API限额: {gauges['ghiu_ratelimit_remaining']}/{gauges.get('ghiu_ratelimit_limit', '?')}"
+                f"  重置: {reset_text}"
+            )
+
+        lines.append("")
+        lines.append("端点              次数   失败   p50ms   p95ms   接收KB")
+        for histogram in snapshot["histograms"]:
+            if histogram["name"] != "ghiu_http_request_seconds":
+                continue
+            labels = histogram["labels"]
+            key = (labels.get("endpoint"), labels.get("method"))
+            name = f"{labels.get('method')} {labels.get('endpoint')}"
+            lines.append(
+                f"{name:<16} {requests.get(key, 0):>5} {errors.get(key, 0):>6} "
+                f"{histogram['p50'] * 1000:>7.0f} {histogram['p95'] * 1000:>7.0f} "
+                f"{received.get(labels.get('endpoint'), 0) / 1024:>8.0f}"
+            )
+
+        stages = [h for h in snapshot["histograms"] if h["name"] == "ghiu_stage_seconds"]
+        if stages:
+            lines.append("")
+            lines.append("阶段              次数   总计s   p50ms   p95ms")
+            for histogram in stages:
+                lines.append(
+                    f"{histogram['labels'].get('stage', ''):<16} {histogram['count']:>5} "
+                    f"{histogram['sum']:>7.2f} {histogram['p50'] * 1000:>7.0f} {histogram['p95'] * 1000:>7.0f}"
+                )
+        return "\n".join(lines)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_request(method, url, status, seconds, bytes_sent=0, bytes_received=0, headers=None):
+    """记录一次HTTP请求（status 为状态码，连接失败时为 "error"）"""
+    endpoint = endpoint_of(url)
+    REGISTRY.inc("ghiu_http_requests_total", method=method, endpoint=endpoint, status=status)
+    REGISTRY.observe("ghiu_http_request_seconds", seconds, method=method, endpoint=endpoint)
+    if bytes_sent:
+        REGISTRY.inc("ghiu_http_bytes_sent_total", bytes_sent, endpoint=endpoint)
+    if bytes_received:
+        REGISTRY.inc("ghiu_http_bytes_received_total", bytes_received, endpoint=endpoint)
+    if headers is not None and "X-RateLimit-Remaining" in headers:
+        try:
+            REGISTRY.set("ghiu_ratelimit_remaining", int(headers["X-RateLimit-Remaining"]))
+            REGISTRY.set("ghiu_ratelimit_limit", int(headers.get("X-RateLimit-Limit", 0)))
+            REGISTRY.set("ghiu_ratelimit_reset_timestamp", int(headers.get("X-RateLimit-Reset", 0)))
+        except ValueError:
+            pass
+
+
+def record_retry(url, reason):
+    REGISTRY.inc("ghiu_http_retries_total", endpoint=endpoint_of(url), reason=reason)
@@ -0,0 +1,177 @@
+"""图片下载的多主机选择
+
+缩略图、预览与下载可以从多个主机获取同一张图片：raw.githubusercontent.com、自定义域名
+（通常是仓库前面的 CDN）以及配置中的镜像（如 jsDelivr）。每个主机持续记录延迟（指数
+滑动平均）与失败次数，请求总是先发往最快的健康主机，失败时依次换下一个。
+
+- 连续失败的主机进入冷却期（按失败次数指数增长），冷却结束后重新参与排序；
+- 每隔若干次请求把一个非首选主机排到最前，使各主机的延迟数据保持最新；
+- 已知 blob SHA 时校验内容，镜像返回过期内容同样算作失败。
+
+镜像地址为模板，可用 {repo}、{branch}、{path} 占位，例如
+    https://cdn.jsdelivr.net/gh/{repo}@{branch}/{path}
+"""
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import quote
+
+from metrics import REGISTRY
+
+
+class Host:
+    """一个候选主机及其统计"""
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self.latency = None          # 秒，指数滑动平均；None 表示尚未测量
+        self.failures = 0            # 连续失败次数
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def url(self, path, config):
+        return self.template.format(
+            repo=config["repo"], branch=config.get("branch", "main"), path=quote(path)
+        )
+
+
+def hosts_from_config(config):
+    """raw、自定义域名与配置中的镜像，按配置顺序"""
+    raw_base = (config.get("raw_base") or "https://raw.githubusercontent.com").rstrip("/")
+    hosts = [Host("raw", raw_base + "/{repo}/{branch}/{path}")]
+    if config.get("custom_domain"):
+        hosts.append(Host("custom_domain", config["custom_domain"].rstrip("/") + "/{path}"))
+    for i, template in enumerate(config.get("mirrors") or []):
+        if "{path}" in template:
+            hosts.append(Host(f"mirror{i + 1}", template))
+    return hosts
+
+
+class MirrorSelector:
+    """按延迟与健康状况为每次下载排序候选主机"""
+    def __init__(self, hosts, alpha=0.3, cooldown=15.0, max_cooldown=300.0, explore_every=20):
+        self.hosts = hosts
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.explore_every = explore_every
+        self._lock = threading.Lock()
+        self._count = 0
+        self._explore_next = 0
+
+    def ranked(self):
+        """本次请求依次尝试的主机：健康主机按延迟排序，冷却中的主机排在最后"""
+        now = time.monotonic()
+        with self._lock:
+            self._count += 1
+            healthy = [h for h in self.hosts if h.cooldown_until <= now]
+            cooling = sorted((h for h in self.hosts if h.cooldown_until > now), key=lambda h: h.cooldown_until)
+            # 未测量过的主机排在最前，先得到一次测量
+            healthy.sort(key=lambda h: -1.0 if h.latency is None else h.latency)
+            if len(healthy) > 1 and self._count % self.explore_every == 0:
+                others = healthy[1:]
+                probe = others[self._explore_next % len(others)]
+                self._explore_next += 1
+                healthy.remove(probe)
+                healthy.insert(0, probe)
+            return healthy + cooling
+
+    def record(self, host, seconds, ok):
+        with self._lock:
+            host.requests += 1
+            if ok:
+                host.failures = 0
+                host.cooldown_until = 0.0
+                host.latency = seconds if host.latency is None else (
+                    self.alpha * seconds + (1 - self.alpha) * host.latency
+                )
+            else:
+                host.errors += 1
+                host.failures += 1
+                host.cooldown_until = time.monotonic() + min(
+                    self.cooldown * 2 ** (host.failures - 1), self.max_cooldown
+                )
+        REGISTRY.inc("ghiu_mirror_requests_total", host=host.name, result="ok" if ok else "error")
+        if ok:
+            REGISTRY.observe("ghiu_mirror_seconds", seconds, host=host.name)
+
+    def fetch(self, path, config, download, verify=None):
+        """依次从各主机下载直到成功；download(url) -> bytes，verify(bytes) -> 是否有效"""
+        last_error = None
+        for host in self.ranked():
+            start = time.perf_counter()
+            try:
+                data = download(host.url(path, config))
+                if verify is not None and not verify(data):
+                    raise Exception(f"{host.name} 返回的内容已过期")
+            except Exception as e:
+                self.record(host, time.perf_counter() - start, False)
+                last_error = e
+                continue
+            self.record(host, time.perf_counter() - start, True)
+            return data
+        raise last_error
+
+    def fetch_async(self, path, config, start_download, verify=None):
+        """fetch 的非阻塞版本：start_download(url) 返回 Future，本方法同样返回 Future
+
+        取消返回的 Future 时同时取消正在进行的下载。
+        """
+        result = Future()
+        hosts = iter(self.ranked())
+        state = {"error": None, "current": None}
+
+        def cancel_current(f):
+            if f.cancelled() and state["current"] is not None:
+                state["current"].cancel()
+
+        def attempt():
+            host = next(hosts, None)
+            if host is None:
+                if not result.done():
+                    result.set_exception(state["error"] or Exception("没有可用的主机"))
+                return
+            started = time.perf_counter()
+            try:
+                future = start_download(host.url(path, config))
+            except Exception as e:
+                state["error"] = e
+                self.record(host, 0.0, False)
+                return attempt()
+            state["current"] = future
+            future.add_done_callback(lambda f: finished(host, started, f))
+
+        def finished(host, started, future):
+            if future.cancelled() or result.done():
+                return
+            seconds = time.perf_counter() - started
+            error = future.exception()
+            if error is None and verify is not None and not verify(future.result()):
+                error = Exception(f"{host.name} 返回的内容已过期")
+            if error is not None:
+                self.record(host, seconds, False)
+                state["error"] = error
+                attempt()
+                return
+            self.record(host, seconds, True)
+            result.set_result(future.result())
+
+        result.add_done_callback(cancel_current)
+        attempt()
+        return result
+
+    def stats(self):
+        """各主机的当前状态（用于指标窗口）"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": h.name,
+                    "latency_ms": None if h.latency is None else round(h.latency * 1000, 1),
+                    "requests": h.requests,
+                    "errors": h.errors,
+                    "healthy": h.cooldown_until <= now,
+                }
+                for h in self.hosts
+            ]
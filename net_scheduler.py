@@ -0,0 +1,237 @@
+"""网络请求优先级调度
+
+所有经 github_manager.request 发出的请求在开始前先申请一个并发名额。等待中的请求
+按优先级放行，从高到低：
+
+    PREVIEW     交互式预览
+    VISIBLE     可见区域的缩略图、列表刷新
+    WRITE       用户发起的写操作（上传、删除、移动、同步）
+    PREFETCH    预取
+    BACKGROUND  后台索引
+
+每个级别有各自的并发上限；低于 VISIBLE 的请求不会占满全部名额，总会给交互请求留出
+一个空位。已开始的请求不会被打断，但排队中的低优先级请求总是让位给后到的高优先级请求。
+
+优先级按线程设置：with net_scheduler.priority(PREVIEW): ...
+异步引擎（async_http）的请求不占用线程，通过 slot_async(cls) 在事件循环中等待名额。
+未调用 enable() 时（例如命令行工具）不做任何限制。
+"""
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+
+from metrics import REGISTRY
+
+
+PREVIEW, VISIBLE, WRITE, PREFETCH, BACKGROUND = range(5)
+
+CLASS_NAMES = {
+    PREVIEW: "preview",
+    VISIBLE: "visible",
+    WRITE: "write",
+    PREFETCH: "prefetch",
+    BACKGROUND: "background",
+}
+
+DEFAULT_LIMITS = {PREVIEW: 4, VISIBLE: 6, WRITE: 3, PREFETCH: 4, BACKGROUND: 2}
+
+_local = threading.local()
+_scheduler = None
+
+
+class NetworkScheduler:
+    """按优先级分配并发名额"""
+    def __init__(self, max_concurrent=8, limits=None):
+        self.max_concurrent = max_concurrent
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._cond = threading.Condition()
+        self._active = {cls: 0 for cls in CLASS_NAMES}
+        self._total = 0
+        self._waiting = []   # [(优先级, 序号)]，保持有序
+        self._async = {}     # 异步等待者的 ticket -> Future
+        self._seq = 0
+
+    def _allowed(self, cls):
+        headroom = 1 if cls > VISIBLE and self.max_concurrent > 1 else 0
+        return (self._active[cls] < self.limits[cls]
+                and self._total < self.max_concurrent - headroom)
+
+    def _next_runnable(self):
+        """等待队列中第一个可以开始的请求"""
+        for ticket in self._waiting:
+            if self._allowed(ticket[0]):
+                return ticket
+        return None
+
+    def _enqueue(self, cls):
+        self._seq += 1
+        ticket = (cls, self._seq)
+        self._waiting.append(ticket)
+        self._waiting.sort()
+        return ticket
+
+    def _take(self, ticket):
+        self._waiting.remove(ticket)
+        self._active[ticket[0]] += 1
+        self._total += 1
+
+    def _grant_async(self):
+        """把名额直接分给排在最前面的异步等待者（调用方持有锁），返回得到名额的 Future"""
+        granted = []
+        while True:
+            ticket = self._next_runnable()
+            if ticket is None or ticket not in self._async:
+                break
+            self._take(ticket)
+            granted.append((ticket[0], self._async.pop(ticket)))
+        return granted
+
+    def _notify_granted(self, granted):
+        """在锁外通知异步等待者；等待期间已被取消的立即归还名额"""
+        for cls, future in granted:
+            if future.set_running_or_notify_cancel():
+                future.set_result(None)
+            else:
+                self.release(cls)
+
+    def acquire(self, cls):
+        """阻塞直到轮到该请求，返回等待的秒数"""
+        start = time.perf_counter()
+        with self._cond:
+            ticket = self._enqueue(cls)
+            while self._next_runnable() != ticket:
+                self._cond.wait()
+            self._take(ticket)
+            # 名额可能还够下一个请求使用
+            granted = self._grant_async()
+            self._cond.notify_all()
+        self._notify_granted(granted)
+        return time.perf_counter() - start
+
+    def acquire_future(self, cls):
+        """不阻塞的 acquire：返回得到名额时完成的 Future；取消 Future 即放弃排队"""
+        future = Future()
+        with self._cond:
+            ticket = self._enqueue(cls)
+            self._async[ticket] = future
+            granted = self._grant_async()
+
+        def on_cancel(f):
+            if not f.cancelled():
+                return
+            with self._cond:
+                if self._async.pop(ticket, None) is not None:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+
+        future.add_done_callback(on_cancel)
+        self._notify_granted(granted)
+        return future
+
+    def release(self, cls):
+        with self._cond:
+            self._active[cls] -= 1
+            self._total -= 1
+            granted = self._grant_async()
+            self._cond.notify_all()
+        self._notify_granted(granted)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": {CLASS_NAMES[c]: n for c, n in self._active.items()},
+                "waiting": {CLASS_NAMES[c]: sum(1 for t in self._waiting if t[0] == c) for c in CLASS_NAMES},
+            }
+
+
+def enable(max_concurrent=8, limits=None):
+    """开启调度；limits 可用级别名覆盖默认上限，如 {"write": 2}"""
+    global _scheduler
+    by_class = {}
+    for name, value in (limits or {}).items():
+        for cls, cls_name in CLASS_NAMES.items():
+            if cls_name == name:
+                by_class[cls] = int(value)
+    _scheduler = NetworkScheduler(max_concurrent, by_class)
+    return _scheduler
+
+
+def disable():
+    global _scheduler
+    _scheduler = None
+
+
+def stats():
+    """各优先级正在进行与排队中的请求数，未开启调度时返回None"""
+    scheduler = _scheduler
+    return scheduler.stats() if scheduler is not None else None
+
+
+def current_priority():
+    return getattr(_local, "priority", BACKGROUND)
+
+
+def set_thread_priority(cls):
+    """设置当前线程之后所有请求的默认优先级（用于专用的工作线程）"""
+    _local.priority = cls
+
+
+@contextmanager
+def priority(cls):
+    """在当前线程内以指定优先级发起请求（可嵌套）"""
+    previous = getattr(_local, "priority", None)
+    _local.priority = cls
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _local.priority
+        else:
+            _local.priority = previous
+
+
+@contextmanager
+def slot():
+    """请求开始前申请名额（未开启调度时直接放行）"""
+    scheduler = _scheduler
+    if scheduler is None:
+        yield
+        return
+    cls = current_priority()
+    waited = scheduler.acquire(cls)
+    REGISTRY.observe("ghiu_net_queue_seconds", waited, priority=CLASS_NAMES[cls])
+    try:
+        yield
+    finally:
+        scheduler.release(cls)
+
+
+@asynccontextmanager
+async def slot_async(cls):
+    """slot 的协程版本：在事件循环中等待名额，不占用线程
+
+    优先级需由提交请求的线程取得后传入（事件循环线程没有调用方的线程优先级）。
+    """
+    # 只有异步引擎用到 asyncio，不在模块顶层导入以免拖慢命令行启动
+    import asyncio
+
+    scheduler = _scheduler
+    if scheduler is None:
+        yield
+        return
+    start = time.perf_counter()
+    acquired = scheduler.acquire_future(cls)
+    try:
+        await asyncio.wrap_future(acquired)
+    except asyncio.CancelledError:
+        # 取消与分配名额同时发生时，已分配的名额要归还
+        if not acquired.cancel():
+            scheduler.release(cls)
+        raise
+    REGISTRY.observe("ghiu_net_queue_seconds", time.perf_counter() - start, priority=CLASS_NAMES[cls])
+    try:
+        yield
+    finally:
+        scheduler.release(cls)
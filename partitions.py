@@ -0,0 +1,139 @@
+"""按日期分区的存储布局
+
+配置 upload_layout（strftime 格式，如 "%Y/%m"）后，新上传的图片写入 存储路径/2024/05/ 这样的
+子目录，单个目录不再无限增长。列表按分区从新到旧逐个加载：启动时只列出当月分区（一次请求），
+更早的分区在滚动到末尾或搜索时再加载。
+
+分区目录名按逆序遍历即为从新到旧（%Y、%m、%d 都是定长数字）。只进入名称符合布局的目录
+（如 %Y 为四位数字、%m 为两位数字）；存储路径下直接存放的旧图片（启用分区前上传的）、
+中间层目录中的图片以及 thumbs 这类不符合布局的目录，都排在所有日期分区之后最后加载。
+"""
+import re
+from datetime import datetime
+
+from github_manager import GitHubImageManager
+
+
+# strftime 字段对应的目录名格式，未列出的字段匹配任意非空名称
+_FIELD_PATTERNS = {"Y": r"\d{4}", "y": r"\d{2}", "m": r"\d{2}", "d": r"\d{2}", "H": r"\d{2}", "j": r"\d{3}"}
+
+
+def current_partition(layout, when=None):
+    return (when or datetime.now()).strftime(layout.strip("/"))
+
+
+def _level_pattern(component):
+    """布局中一层目录（如 "%Y"、"%m月"）对应的正则"""
+    parts = []
+    for literal, field in re.findall(r"([^%]*)(?:%(.))?", component):
+        parts.append(re.escape(literal))
+        if field:
+            parts.append(_FIELD_PATTERNS.get(field, ".+?") if field != "%" else "%")
+    return re.compile("".join(parts))
+
+
+class PartitionWalker:
+    """在一个存储路径下按从新到旧的顺序逐个列出分区
+
+    日期分区全部返回后，再按发现顺序返回存储路径与中间层目录中直接存放的图片、不符合布局
+    的目录（含其子目录）中的图片；这些批次的分区名不是日期，用 is_partition() 区分。
+    """
+    def __init__(self, config, layout, skip=()):
+        self.config = config
+        self.base = config.get("path", "").strip("/")
+        self.levels = [_level_pattern(c) for c in layout.strip("/").split("/")]
+        self.depth = len(self.levels)
+        self.skip = set(skip)     # 已单独加载过的分区
+        self._stack = [("dir", "", 0)]
+        self._deferred = []       # 所有日期分区之后再加载的批次，按发现顺序
+
+    def _join(self, rel):
+        return "/".join(p for p in (self.base, rel) if p)
+
+    def is_partition(self, rel):
+        """rel 是否是符合布局的日期分区"""
+        names = rel.split("/") if rel else []
+        return (len(names) == self.depth
+                and all(level.fullmatch(name) for level, name in zip(self.levels, names)))
+
+    def next(self):
+        """下一个（更旧的）分区，返回 (分区, 图片条目)；已全部加载时返回None"""
+        while self._stack:
+            kind, rel, depth = self._stack[-1]
+            if depth == self.depth and rel in self.skip:
+                self._stack.pop()
+                continue
+            # 列出成功后才出栈，请求失败时下次从同一目录重试
+            dirs, images = GitHubImageManager.list_directory(self.config, self._join(rel), missing_ok=True)
+            self._stack.pop()
+            if depth == self.depth:
+                return rel, images
+            # 中间层目录中直接存放的图片比所有分区都旧
+            if images:
+                self._deferred.append(("files", rel, images))
+            for name in sorted(d["name"] for d in dirs):
+                child = f"{rel}/{name}" if rel else name
+                if self.levels[depth].fullmatch(name):
+                    self._stack.append(("dir", child, depth + 1))
+                else:
+                    self._deferred.append(("other", child, None))
+        while self._deferred:
+            kind, rel, images = self._deferred[0]
+            if kind == "files":
+                self._deferred.pop(0)
+                return rel, images
+            # 不符合布局的目录：连同子目录一起放在日期分区之后
+            dirs, images = GitHubImageManager.list_directory(self.config, self._join(rel), missing_ok=True)
+            self._deferred.pop(0)
+            self._deferred.extend(("other", f"{rel}/{name}", None) for name in sorted(d["name"] for d in dirs))
+            if images:
+                return rel, images
+        return None
+
+
+class PartitionLoader:
+    """把多个分片的分区合并为一个从新到旧的序列
+
+    load_current() 列出各分片的当月分区；之后每次 load_next() 加载所有分片中最新的
+    一个尚未加载的分区。只在单个后台线程中调用。
+    """
+    def __init__(self, shard_configs, layout, when=None):
+        self.layout = layout
+        self.current = current_partition(layout, when)
+        self._walkers = [
+            (shard, PartitionWalker(config, layout, skip=[self.current]))
+            for shard, config in shard_configs
+        ]
+        self._peeked = {}   # 下标 -> (分区, 条目)
+        self.exhausted = False
+        self.loaded = 0     # 已加载的分区数（含当月）
+
+    def load_current(self):
+        """各分片的当月分区，返回 [(分片, 条目)]"""
+        results = []
+        for shard, walker in self._walkers:
+            path = walker._join(self.current)
+            results.extend((shard, item) for item in
+                           GitHubImageManager.list_directory(walker.config, path, missing_ok=True)[1])
+        self.loaded = 1
+        return results
+
+    def load_next(self):
+        """下一个更旧的分区，返回 (分区, [(分片, 条目)])；全部加载完后返回None"""
+        for i, (_, walker) in enumerate(self._walkers):
+            if i not in self._peeked:
+                found = walker.next()
+                if found is not None:
+                    self._peeked[i] = found
+        if not self._peeked:
+            self.exhausted = True
+            return None
+        # 日期分区按名称取最新；都不是日期分区时按分片顺序逐个加载
+        dated = [p for i, (p, _) in self._peeked.items() if self._walkers[i][1].is_partition(p)]
+        newest = max(dated) if dated else next(iter(self._peeked.values()))[0]
+        results = []
+        for i in [i for i, (partition, _) in self._peeked.items() if partition == newest]:
+            _, items = self._peeked.pop(i)
+            results.extend((self._walkers[i][0], item) for item in items)
+        self.loaded += 1
+        return newest, results
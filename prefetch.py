@@ -0,0 +1,150 @@
+"""缩略图预取
+
+界面根据滚动方向与速度算出接下来会出现的卡片，按优先级（可见 > 前方 > 后方）交给
+后台线程下载并生成缩略图。每次更新窗口时，尚未开始、且已不在窗口中的任务直接取消；
+已在下载中的任务无法中断，完成后只保留缓存、不再挂到卡片上。
+
+提供 fetch 时任务分两段执行：fetch(payload) 返回下载的 Future（例如 async_http 引擎），
+最多 fetch_limit 个同时进行且不占用线程，离开窗口时直接 cancel；下载完成后再由
+后台线程执行 work(payload, 数据) 生成缩略图。
+"""
+import threading
+from collections import OrderedDict, deque
+
+from metrics import REGISTRY
+
+
+class Prefetcher:
+    """按优先级在后台线程执行任务，窗口变化时取消不再需要的任务"""
+    def __init__(self, work, on_done, workers=4, fetch=None, fetch_limit=64):
+        self._work = work          # work(payload) -> 结果，在后台线程执行
+        self._on_done = on_done    # on_done(key, payload, 结果, 错误, 是否仍在窗口中)
+        self._fetch = fetch
+        self._fetch_limit = fetch_limit
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()   # key -> payload，按优先级排列
+        self._inflight = set()
+        self._fetching = {}             # key -> 下载中的 Future
+        self._ready = deque()           # [(key, payload, 数据, 错误)]，等待后台线程处理
+        self._wanted = set()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"prefetch-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def update(self, items):
+        """用新的窗口替换待处理队列；items 为 [(key, payload)]，优先级从高到低"""
+        with self._cond:
+            pending = OrderedDict(
+                (key, payload) for key, payload in items
+                if key not in self._inflight and key not in self._fetching
+            )
+            cancelled = sum(1 for key in self._pending if key not in pending)
+            if cancelled:
+                REGISTRY.inc("ghiu_prefetch_total", cancelled, result="cancelled")
+            self._pending = pending
+            self._wanted = {key for key, _ in items}
+            stale = [future for key, future in self._fetching.items()
+                     if future is not None and key not in self._wanted]
+            self._cond.notify_all()
+        # cancel 会同步执行完成回调，放在锁外
+        for future in stale:
+            future.cancel()
+        self._start_fetches()
+
+    def _start_fetches(self):
+        """在下载名额内开始新的下载
+
+        名额在锁内预留，fetch（可能读取本地缓存）在锁外调用；fetch 返回已完成的 Future 时
+        就地处理，不经完成回调递归进入本方法。
+        """
+        while True:
+            batch = []
+            with self._cond:
+                while (self._fetch and self._pending and len(self._fetching) < self._fetch_limit
+                       and not self._closed):
+                    key, payload = self._pending.popitem(last=False)
+                    self._fetching[key] = None   # 占位，预留下载名额
+                    batch.append((key, payload))
+            if not batch:
+                return
+            for key, payload in batch:
+                try:
+                    future = self._fetch(payload)
+                except Exception as e:
+                    with self._cond:
+                        self._fetching.pop(key, None)
+                        self._inflight.add(key)
+                        self._ready.append((key, payload, None, e))
+                        self._cond.notify_all()
+                    continue
+                with self._cond:
+                    self._fetching[key] = future
+                    stale = self._closed or key not in self._wanted
+                if stale:
+                    future.cancel()
+                if future.done():
+                    self._finish_fetch(key, payload, future)
+                else:
+                    future.add_done_callback(lambda f, key=key, payload=payload: self._fetched(key, payload, f))
+
+    def _finish_fetch(self, key, payload, future):
+        with self._cond:
+            self._fetching.pop(key, None)
+            if future.cancelled():
+                REGISTRY.inc("ghiu_prefetch_total", result="cancelled")
+            else:
+                error = future.exception()
+                self._inflight.add(key)
+                self._ready.append((key, payload, None if error else future.result(), error))
+            self._cond.notify_all()
+
+    def _fetched(self, key, payload, future):
+        """下载结束（在下载所在的线程中回调）"""
+        self._finish_fetch(key, payload, future)
+        self._start_fetches()
+
+    def is_wanted(self, key):
+        with self._cond:
+            return key in self._wanted
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            fetching = [future for future in self._fetching.values() if future is not None]
+            self._cond.notify_all()
+        for future in fetching:
+            future.cancel()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._ready if self._fetch else self._pending) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if self._fetch:
+                    key, payload, data, error = self._ready.popleft()
+                else:
+                    key, payload = self._pending.popitem(last=False)
+                    self._inflight.add(key)
+                    error = None
+
+            result = None
+            if error is None:
+                try:
+                    result = self._work(payload, data) if self._fetch else self._work(payload)
+                except Exception as e:
+                    error = e
+
+            with self._cond:
+                self._inflight.discard(key)
+                wanted = key in self._wanted
+                if self._closed:
+                    return
+            REGISTRY.inc("ghiu_prefetch_total", result="error" if error else ("done" if wanted else "stale"))
+            self._on_done(key, payload, result, error, wanted)
@@ -0,0 +1,148 @@
+"""本地目录 -> 仓库存储路径 的增量同步
+
+在本地计算每个文件的 git blob SHA，与一次拉取的远程文件树比较，只上传新增或
+内容变化的文件，并可选删除远程多余的文件；所有变更合并为一次提交。
+目录未变化时整个同步只需一次文件树请求。
+"""
+import os
+
+from github_manager import GitHubImageManager, git_blob_sha
+from image_library import IMAGE_EXTENSIONS
+
+
+class SyncPlan:
+    """同步计划：待上传、待删除与未变化的文件"""
+    def __init__(self):
+        self.uploads = []      # (本地路径, 仓库路径, blob SHA)
+        self.deletes = []      # 仓库路径
+        self.unchanged = 0
+
+    def is_empty(self):
+        return not self.uploads and not self.deletes
+
+    def to_dict(self):
+        return {
+            "uploads": [{"file": f, "path": p, "sha": s} for f, p, s in self.uploads],
+            "deletes": list(self.deletes),
+            "unchanged": self.unchanged,
+        }
+
+
+def _iter_local_files(directory):
+    """递归遍历本地目录中的图片，返回 (本地路径, 相对路径)"""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                file_path = os.path.join(root, name)
+                rel_path = os.path.relpath(file_path, directory).replace(os.sep, "/")
+                yield file_path, rel_path
+
+
+def plan_sync(directory, config, delete=False):
+    """对比本地目录与远程文件树，生成同步计划"""
+    if not os.path.isdir(directory):
+        raise ValueError(f"目录不存在: {directory}")
+
+    remote = GitHubImageManager.get_tree(config)
+    plan = SyncPlan()
+    seen = set()
+    for file_path, rel_path in _iter_local_files(directory):
+        repo_path = GitHubImageManager.target_path(config, rel_path)
+        seen.add(repo_path)
+        with open(file_path, "rb") as f:
+            sha = git_blob_sha(f.read())
+        if remote.get(repo_path) == sha:
+            plan.unchanged += 1
+        else:
+            plan.uploads.append((file_path, repo_path, sha))
+
+    if delete:
+        plan.deletes = sorted(
+            path for path in remote
+            if path not in seen and path.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    return plan
+
+
+def apply_sync(plan, config, message=None, concurrency=4, progress=None):
+    """执行同步计划：并发创建 blob，然后一次提交写入全部变更
+
+    progress(已完成数, 总数) 可选，用于显示进度。返回提交 SHA（无变更时为 None）。
+    """
+    if plan.is_empty():
+        return None
+
+    def upload_blob(entry):
+        file_path, repo_path, sha = entry
+        with open(file_path, "rb") as f:
+            created = GitHubImageManager.create_blob(f.read(), config)
+        if created != sha:
+            raise Exception(f"上传内容校验失败: {file_path}")
+        return repo_path, sha
+
+    changes = {}
+    total = len(plan.uploads)
+    if concurrency > 1 and total > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for done, (repo_path, sha) in enumerate(pool.map(upload_blob, plan.uploads), 1):
+                changes[repo_path] = sha
+                if progress:
+                    progress(done, total)
+    else:
+        for done, entry in enumerate(plan.uploads, 1):
+            repo_path, sha = upload_blob(entry)
+            changes[repo_path] = sha
+            if progress:
+                progress(done, total)
+
+    for path in plan.deletes:
+        changes[path] = None
+
+    if message is None:
+        message = f"Sync {len(plan.uploads)} file(s), delete {len(plan.deletes)} file(s)"
+    return GitHubImageManager.commit_tree_changes(changes, message, config)
+
+
+def _free_path(repo_path, taken):
+    """同名文件已存在时依次尝试 name-1.ext、name-2.ext ……"""
+    stem, ext = os.path.splitext(repo_path)
+    counter = 1
+    while f"{stem}-{counter}{ext}" in taken:
+        counter += 1
+    return f"{stem}-{counter}{ext}"
+
+
+def upload_batch(file_paths, config, message=None, concurrency=4):
+    """把一批本地文件以一次提交上传到存储路径，返回 [(本地路径, 仓库路径, blob SHA)]
+
+    不覆盖远程已有的文件：同名且内容相同的文件直接返回已有路径，不再提交；
+    内容不同时改用不冲突的文件名。每个目标目录只需一次（非递归）文件树请求。
+    """
+    plan = SyncPlan()
+    results = []
+    remote = {}   # 目标目录 -> {仓库路径: blob SHA}
+    taken = set()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            sha = git_blob_sha(f.read())
+        repo_path = GitHubImageManager.upload_path(config, os.path.basename(file_path))
+        folder = repo_path.rpartition("/")[0]
+        if folder not in remote:
+            remote[folder] = GitHubImageManager.get_tree(config, folder, recursive=False)
+            taken.update(remote[folder])
+        if remote[folder].get(repo_path) == sha:
+            results.append((file_path, repo_path, sha))
+            continue
+        if repo_path in taken:
+            repo_path = _free_path(repo_path, taken)
+        taken.add(repo_path)
+        plan.uploads.append((file_path, repo_path, sha))
+        results.append((file_path, repo_path, sha))
+    if plan.uploads:
+        if message is None:
+            message = f"Upload {len(plan.uploads)} file(s)"
+        apply_sync(plan, config, message=message, concurrency=concurrency)
+    return results
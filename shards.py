@@ -0,0 +1,157 @@
+"""多仓库分片存储
+
+单个仓库超过数 GB 或数万个文件后，列表、推送都会明显变慢，也会触及 GitHub 的软限制。
+配置 shards 后图片分散存放在多个仓库（或同一仓库的多个分支）中，界面与命令行把所有
+分片合并成一个视图。
+
+    "shards": [
+        {"repo": "me/images-2023", "since": "2023-01"},
+        {"repo": "me/images-2024", "since": "2024-01"},
+        {"repo": "me/images", "branch": "archive", "path": "img"}
+    ],
+    "shard_policy": "size",      # size / date / hash
+    "shard_max_mb": 800
+
+未指定的 branch、path 沿用顶层配置。新上传写入哪个分片由路由策略决定：
+- size：按顺序写入第一个未超过 shard_max_mb 的分片（都满时写入最后一个）；
+- date：写入 since（YYYY-MM）不晚于上传月份的分片中 since 最晚的一个；
+- hash：按文件名哈希分配，同名文件总是落在同一个分片。
+未配置 shards 时只有一个由顶层 repo/branch/path 组成的分片，行为与以前相同。
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import net_scheduler
+from github_manager import GitHubImageManager
+
+
+POLICIES = ("size", "date", "hash")
+
+
+class Shard:
+    """一个存储位置：仓库 + 分支 + 存储路径"""
+    __slots__ = ("name", "repo", "branch", "path", "since")
+
+    def __init__(self, name, repo, branch="main", path="", since=""):
+        self.name = name
+        self.repo = repo
+        self.branch = branch
+        self.path = path
+        self.since = since
+
+    def config(self, base):
+        """该分片对应的完整配置（令牌、自定义域名等沿用 base）"""
+        return dict(base, repo=self.repo, branch=self.branch, path=self.path)
+
+    def _identity(self):
+        return (self.name, self.repo, self.branch, self.path)
+
+    def __eq__(self, other):
+        return isinstance(other, Shard) and self._identity() == other._identity()
+
+    def __hash__(self):
+        return hash(self._identity())
+
+    def __repr__(self):
+        return f"Shard({self.name!r}, {self.repo!r}, branch={self.branch!r}, path={self.path!r})"
+
+
+def shards_from_config(config):
+    """按配置构建分片列表；未配置 shards 时返回只含顶层仓库的单个分片（名称为空）"""
+    branch = config.get("branch") or "main"
+    path = config.get("path", "")
+    entries = config.get("shards") or []
+    if not entries:
+        return [Shard("", config.get("repo", ""), branch, path)]
+    shards = []
+    for entry in entries:
+        shard_branch = entry.get("branch") or branch
+        shards.append(Shard(
+            entry.get("name") or f"{entry['repo']}@{shard_branch}",
+            entry["repo"],
+            shard_branch,
+            entry.get("path", path),
+            entry.get("since", "")
+        ))
+    return shards
+
+
+def find_shard(shards, repo, branch, path=None):
+    """按仓库、分支与仓库内路径查找分片，没有时返回None
+
+    同一仓库分支上有多个分片时，取存储路径是 path 前缀的分片中最长的一个。
+    """
+    best = None
+    for shard in shards:
+        if shard.repo != repo or shard.branch != branch:
+            continue
+        if path is not None and shard.path:
+            prefix = shard.path.strip("/")
+            if path != prefix and not path.startswith(prefix + "/"):
+                continue
+        if best is None or len(shard.path.strip("/")) > len(best.path.strip("/")):
+            best = shard
+    return best
+
+
+class ShardRouter:
+    """为新上传的文件选择分片
+
+    size_of(shard) 返回分片当前的大小（字节），仅 size 策略使用：界面使用已加载的图片
+    总大小，命令行使用仓库信息中的大小。
+    """
+    def __init__(self, shards, policy="size", max_bytes=800 * 1024 * 1024, size_of=None):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的分片策略: {policy}")
+        self.shards = shards
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self._assigned = {}   # 本路由器已分配但尚未计入 size_of 的字节数
+
+    def route(self, filename, size=0, when=None):
+        if len(self.shards) == 1:
+            return self.shards[0]
+        if self.policy == "hash":
+            digest = hashlib.sha1(filename.encode("utf-8")).digest()
+            return self.shards[int.from_bytes(digest[:4], "big") % len(self.shards)]
+        if self.policy == "date":
+            month = (when or datetime.now()).strftime("%Y-%m")
+            eligible = [s for s in self.shards if s.since <= month]
+            return max(eligible or self.shards[:1], key=lambda s: s.since)
+        chosen = self.shards[-1]
+        for shard in self.shards:
+            used = (self.size_of(shard) if self.size_of else 0) + self._assigned.get(shard, 0)
+            if used + size <= self.max_bytes:
+                chosen = shard
+                break
+        self._assigned[chosen] = self._assigned.get(chosen, 0) + size
+        return chosen
+
+
+def router_from_config(config, shards=None, size_of=None):
+    return ShardRouter(
+        shards or shards_from_config(config),
+        config.get("shard_policy") or "size",
+        int(config.get("shard_max_mb") or 800) * 1024 * 1024,
+        size_of
+    )
+
+
+def list_items(shards, config):
+    """并行列出所有分片中的图片，返回 [(分片, contents 条目)]"""
+    if len(shards) == 1:
+        shard = shards[0]
+        config = config if not shard.name else shard.config(config)
+        return [(shard, item) for item in GitHubImageManager.list_image_items(config)]
+
+    cls = net_scheduler.current_priority()
+
+    def list_shard(shard):
+        with net_scheduler.priority(cls):
+            return GitHubImageManager.list_image_items(shard.config(config))
+
+    with ThreadPoolExecutor(max_workers=min(len(shards), 8)) as pool:
+        results = list(pool.map(list_shard, shards))
+    return [(shard, item) for shard, items in zip(shards, results) for item in items]
@@ -0,0 +1,36 @@
+"""日志缓冲：级别过滤、环形容量与异步日志文件"""
+from app_log import LogBuffer
+
+
+def test_level_and_component_filters_drop_before_formatting():
+    log = LogBuffer(level="INFO", component_levels={"lazyload": "WARNING"})
+    assert not log.log("debug", "DEBUG")
+    assert log.log("info")
+    assert not log.log("scroll", "INFO", "lazyload")
+    assert log.log("slow", "WARNING", "lazyload")
+    assert [line.split("] ", 1)[1] for line in log.drain()] == ["info", "slow"]
+    assert log.drain() == []
+
+
+def test_ring_buffer_keeps_the_latest_lines():
+    log = LogBuffer(capacity=3)
+    for i in range(10):
+        log.log(f"line {i}")
+    assert [line.split("] ", 1)[1] for line in log.lines] == ["line 7", "line 8", "line 9"]
+    log.resize(2)
+    assert [line.split("] ", 1)[1] for line in log.drain()] == ["line 8", "line 9"]
+
+
+def test_file_sink_writes_on_close(tmp_path):
+    path = tmp_path / "app.log"
+    log = LogBuffer(level="DEBUG")
+    log.open_file(str(path))
+    log.log("uploaded a.png", "INFO", "upload")
+    log.log("hidden", "DEBUG", "grid")
+    log.close_file()
+    text = path.read_text(encoding="utf-8")
+    assert "INFO [upload] uploaded a.png" in text
+    assert "DEBUG [grid] hidden" in text
+    # 关闭后不再写文件
+    log.log("after close")
+    assert "after close" not in path.read_text(encoding="utf-8")
@@ -0,0 +1,92 @@
+"""本地内容存储：SHA 校验、最近使用淘汰与并发下载合并"""
+import os
+import threading
+import time
+
+from blob_store import BlobStore
+from github_manager import git_blob_sha
+
+
+def _blob(i, size=100):
+    data = bytes([i]) * size
+    return git_blob_sha(data), data
+
+
+def test_put_rejects_content_not_matching_sha(tmp_path):
+    store = BlobStore(str(tmp_path))
+    sha, data = _blob(1)
+    assert not store.put(sha, data + b"changed")
+    assert sha not in store
+    assert store.put(sha, data)
+    assert store.get(sha) == data
+    assert os.path.exists(tmp_path / sha[:2] / sha[2:])
+
+
+def test_evicts_least_recently_used_within_budget(tmp_path):
+    store = BlobStore(str(tmp_path), budget_bytes=250)
+    (a, da), (b, db), (c, dc) = _blob(1), _blob(2), _blob(3)
+    store.put(a, da)
+    store.put(b, db)
+    assert store.get(a) == da   # a 变为最近使用
+    store.put(c, dc)
+    assert a in store and c in store
+    assert b not in store
+    assert store.total_bytes == 200
+    assert not os.path.exists(tmp_path / b[:2] / b[2:])
+
+
+def test_usage_order_survives_restart(tmp_path):
+    store = BlobStore(str(tmp_path), budget_bytes=250)
+    (a, da), (b, db), (c, dc) = _blob(1), _blob(2), _blob(3)
+    store.put(a, da)
+    store.put(b, db)
+    old = time.time() - 100
+    os.utime(tmp_path / a[:2] / a[2:], (old, old))
+    os.utime(tmp_path / b[:2] / b[2:], (old + 10, old + 10))
+    store.get(a)   # 更新修改时间
+
+    reopened = BlobStore(str(tmp_path), budget_bytes=250)
+    reopened.put(c, dc)
+    assert a in reopened and b not in reopened
+
+
+def test_fetch_counts_hits_and_shares_concurrent_downloads(tmp_path):
+    store = BlobStore(str(tmp_path))
+    sha, data = _blob(4)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return data
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.fetch(sha, loader))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [data] * 8
+    assert len(calls) == 1
+    assert store.misses == 1
+    hits = store.hits
+    assert store.fetch(sha, loader) == data
+    assert store.hits == hits + 1 and len(calls) == 1
+
+
+def test_fetch_does_not_store_mismatched_download(tmp_path):
+    store = BlobStore(str(tmp_path))
+    sha, data = _blob(5)
+    # 远程文件已变化：本次仍返回下载内容，但不写入缓存
+    assert store.fetch(sha, lambda: b"other") == b"other"
+    assert sha not in store
+    assert store.fetch(sha, lambda: data) == data
+    assert sha in store
@@ -0,0 +1,59 @@
+"""命令行参数解析：全局选项可以写在子命令前或后"""
+import json
+
+import pytest
+
+import cli
+import shards
+
+
+@pytest.mark.parametrize("argv", [
+    ["upload", "a.png", "b.jpg", "--concurrency", "4", "--json"],
+    ["--json", "--concurrency", "4", "upload", "a.png", "b.jpg"],
+    ["--concurrency", "4", "upload", "a.png", "b.jpg", "--json"],
+])
+def test_global_options_before_or_after_subcommand(argv):
+    args = cli.build_parser().parse_args(argv)
+    assert args.command == "upload"
+    assert args.files == ["a.png", "b.jpg"]
+    assert args.json is True
+    assert args.concurrency == 4
+
+
+def test_subcommand_does_not_reset_global_options():
+    args = cli.build_parser().parse_args(["--repo", "me/images", "--batch-size", "20", "list"])
+    assert args.repo == "me/images"
+    assert args.batch_size == 20
+    assert args.json is False
+    assert args.config == cli.CONFIG_FILE
+
+
+def test_find_shard_matches_path_prefix():
+    all_shards = shards.shards_from_config({"repo": "me/images", "shards": [
+        {"name": "old", "repo": "me/images", "path": "img"},
+        {"name": "new", "repo": "me/images", "path": "img/2024"},
+        {"name": "other", "repo": "me/images", "path": "misc"},
+    ]})
+    assert shards.find_shard(all_shards, "me/images", "main", "img/2024/a.png").name == "new"
+    assert shards.find_shard(all_shards, "me/images", "main", "img/2023/a.png").name == "old"
+    assert shards.find_shard(all_shards, "me/images", "main", "misc/a.png").name == "other"
+    assert shards.find_shard(all_shards, "me/images", "main", "imgs/a.png") is None
+    assert shards.find_shard(all_shards, "me/images", "archive", "img/a.png") is None
+
+
+def test_sync_writes_to_selected_shard(fake_github, tmp_path):
+    server, config = fake_github
+    server.store.seed({"README.md": b"readme"})
+    config = dict(config, shards=[
+        {"name": "a", "repo": config["repo"], "path": "a"},
+        {"name": "b", "repo": config["repo"], "path": "b"},
+    ])
+    config_file = tmp_path / "config.json"
+    config_file.write_text(json.dumps(config), encoding="utf-8")
+    source = tmp_path / "assets"
+    source.mkdir()
+    (source / "x.png").write_bytes(b"x")
+
+    assert cli.main(["--config", str(config_file), "sync", str(source), "--shard", "b"]) == 0
+    assert "b/x.png" in server.store.files("main")
+    assert "a/x.png" not in server.store.files("main")
@@ -0,0 +1,68 @@
+"""上传时间：GraphQL 批量查询、本地索引与后台解析"""
+import threading
+
+from commit_dates import CommitDateIndex, DateResolver, local_time
+from github_manager import GitHubImageManager
+from shards import Shard
+
+
+ISO = "2024-01-02T03:04:05Z"
+
+
+def _seed(server, count):
+    files = {f"images/{i}.png": b"%d" % i for i in range(count)}
+    server.store.seed(files)
+    server.store.dates["main"].update((path, ISO) for path in files)
+    return server.store.files("main")
+
+
+def test_commit_dates_batches_paths_in_one_request(fake_github):
+    server, config = fake_github
+    _seed(server, 80)
+    paths = [f"images/{i}.png" for i in range(80)] + ['images/missing "quoted".png']
+    before = server.request_count
+    dates = GitHubImageManager.commit_dates(paths, config)
+    assert server.request_count == before + 1
+    assert dates == {f"images/{i}.png": ISO for i in range(80)}
+    assert GitHubImageManager.commit_dates([], config) == {}
+
+
+def test_index_invalidates_on_sha_change_and_persists(tmp_path):
+    shard = Shard("s1", "me/a")
+    index = CommitDateIndex(str(tmp_path / "dates.json"))
+    index.put(shard, "images/a.png", "sha1", ISO)
+    assert index.get(shard, "images/a.png", "sha1") == local_time(ISO)
+    assert index.get(shard, "images/a.png", "sha2") == ""
+    assert index.get(Shard("s2", "me/b"), "images/a.png", "sha1") == ""
+    index.save()
+
+    reloaded = CommitDateIndex(str(tmp_path / "dates.json"))
+    assert reloaded.get(shard, "images/a.png", "sha1") == local_time(ISO)
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    assert CommitDateIndex(str(tmp_path / "broken.json")).get(shard, "images/a.png", "sha1") == ""
+
+
+def test_resolver_queries_in_batches_and_fills_index(fake_github, tmp_path):
+    server, config = fake_github
+    files = _seed(server, 120)
+    shard = Shard("s1", config["repo"], config["branch"])
+    index = CommitDateIndex(str(tmp_path / "dates.json"))
+    received = []
+    done = threading.Event()
+
+    def on_dates(updates):
+        received.extend(updates)
+        if len(received) >= 120:
+            done.set()
+
+    resolver = DateResolver(index, on_dates, batch_size=50)
+    records = [(i, f"images/{i}.png", files[f"images/{i}.png"]) for i in range(120)]
+    before = server.request_count
+    resolver.submit(config, shard, records)
+    resolver.submit(config, shard, records)   # 已排队的记录不重复查询
+    assert done.wait(10)
+
+    assert sorted(received) == [(i, local_time(ISO)) for i in range(120)]
+    assert server.request_count == before + 3
+    for _, path, sha in records:
+        assert index.get(shard, path, sha) == local_time(ISO)
@@ -0,0 +1,102 @@
+"""GitHubImageManager 的仓库写操作（在本地模拟服务器上）"""
+import base64
+import io
+
+import pytest
+
+from github_manager import GitHubImageManager, encode_base64, git_blob_sha
+
+
+def _stored(server):
+    store = server.store
+    return {path: store.blobs[sha] for path, sha in store.files("main").items()}
+
+
+def test_rename(fake_github):
+    server, config = fake_github
+    server.store.seed({"images/a.png": b"a"})
+    item = GitHubImageManager.rename_path("images/a.png", "b.png", config)
+    assert item["path"] == "images/b.png"
+    assert _stored(server) == {"images/b.png": b"a"}
+
+
+@pytest.mark.parametrize("new_name", ["b.png", "sub"])
+def test_rename_onto_existing_path_is_refused(fake_github, new_name):
+    server, config = fake_github
+    files = {"images/a.png": b"a", "images/b.png": b"b", "images/sub/c.png": b"c"}
+    head = server.store.seed(files)
+    with pytest.raises(FileExistsError):
+        GitHubImageManager.rename_path("images/a.png", new_name, config)
+    with pytest.raises(FileExistsError):
+        GitHubImageManager.rename_path("images/a.png", new_name, config, item={"sha": "x"})
+    assert server.store.branches["main"] == head
+    assert _stored(server) == files
+
+
+def test_rename_to_same_name_keeps_file(fake_github):
+    server, config = fake_github
+    head = server.store.seed({"images/a.png": b"a"})
+    with pytest.raises(ValueError):
+        GitHubImageManager.rename_path("images/a.png", "a.png", config)
+    assert server.store.branches["main"] == head
+
+
+def test_move_refuses_name_conflicts(fake_github):
+    server, config = fake_github
+    files = {"images/a.png": b"a", "images/x/b.png": b"b", "images/y/b.png": b"b2", "images/dest/a.png": b"old"}
+    head = server.store.seed(files)
+    with pytest.raises(FileExistsError):
+        GitHubImageManager.move_paths(["images/a.png"], "images/dest", config)
+    with pytest.raises(FileExistsError):
+        GitHubImageManager.move_paths(["images/x/b.png", "images/y/b.png"], "images/dest", config)
+    assert server.store.branches["main"] == head
+
+    moves = GitHubImageManager.move_paths(["images/x/b.png"], "images/dest", config)
+    assert moves == {"images/x/b.png": "images/dest/b.png"}
+    assert _stored(server)["images/dest/b.png"] == b"b"
+
+
+def test_bulk_delete_and_move_use_one_commit_each(fake_github):
+    server, config = fake_github
+    files = {f"images/{i}.png": b"%d" % i for i in range(30)}
+    head = server.store.seed(files)
+    blobs = len(server.store.blobs)
+
+    commit = GitHubImageManager.delete_paths([f"images/{i}.png" for i in range(10)], config)
+    assert server.store.commits[commit]["parents"] == [head]
+    shas = dict(server.store.files("main"))
+    moves = GitHubImageManager.move_paths(
+        [f"images/{i}.png" for i in range(10, 20)], "images/old", config, shas=shas
+    )
+    assert server.store.commits[server.store.branches["main"]]["parents"] == [commit]
+
+    # 移动只改写文件树，复用原有 blob
+    assert len(server.store.blobs) == blobs
+    assert moves == {f"images/{i}.png": f"images/old/{i}.png" for i in range(10, 20)}
+    expected = {f"images/{i}.png": files[f"images/{i}.png"] for i in range(20, 30)}
+    expected.update((f"images/old/{i}.png", files[f"images/{i}.png"]) for i in range(10, 20))
+    assert _stored(server) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 1024])
+def test_encode_base64_streams_in_aligned_chunks(chunk_size):
+    data = bytes(range(256)) * 7 + b"tail"
+    expected = base64.b64encode(data).decode("ascii")
+    assert encode_base64(data) == expected
+    assert encode_base64(io.BytesIO(data), chunk_size=chunk_size) == expected
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    assert encode_base64(chunks) == expected
+
+
+@pytest.mark.parametrize("make_source", [
+    lambda data: data,
+    lambda data: io.BytesIO(data),
+    lambda data: iter([data[:3], data[3:7], data[7:]]),
+], ids=["bytes", "file", "chunks"])
+def test_upload_content_accepts_bytes_files_and_chunks(fake_github, make_source):
+    server, config = fake_github
+    data = b"\x89PNG fake image content"
+    item = GitHubImageManager.upload_content(make_source(data), "images/x.png", "Upload x.png", config)
+    assert item["path"] == "images/x.png"
+    assert item["sha"] == git_blob_sha(data)
+    assert _stored(server) == {"images/x.png": data}
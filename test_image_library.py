@@ -0,0 +1,117 @@
+"""图片库：预先算好的排序字段、增量维护的有序视图与过滤"""
+import random
+
+from image_library import ImageFilter, ImageLibrary, ImageRecord, SortMode, make_record
+from shards import Shard
+
+
+def _library(*paths, **fields):
+    library = ImageLibrary()
+    library.reset([ImageRecord(p, **fields) for p in paths])
+    return library
+
+
+def test_record_precomputes_lowercase_name_and_format():
+    record = make_record({"path": "images/2024/Photo.JPEG", "sha": "a", "size": 3})
+    assert record.name == "Photo.JPEG"
+    assert record.name_lower == "photo.jpeg"
+    assert record.format == "jpeg"
+    assert record.folder == "images/2024"
+
+
+def test_sort_and_filter_use_precomputed_fields():
+    library = _library("b/Zeta.PNG", "a/alpha.jpg", "a/Beta.gif")
+    assert [r.name for r in library.query(SortMode.NAME_ASC)] == ["alpha.jpg", "Beta.gif", "Zeta.PNG"]
+    assert [r.name for r in library.query(SortMode.FORMAT_DESC)] == ["Zeta.PNG", "alpha.jpg", "Beta.gif"]
+    assert [r.name for r in library.query(SortMode.NAME_ASC, ImageFilter(formats=["PNG"]))] == ["Zeta.PNG"]
+    assert [r.name for r in library.query(SortMode.NAME_ASC, ImageFilter(keyword="ETA"))] == ["Beta.gif", "Zeta.PNG"]
+    assert [r.name for r in library.query(SortMode.NAME_ASC, ImageFilter(folder="a"))] == ["alpha.jpg", "Beta.gif"]
+
+
+def test_update_in_view_keeps_displayed_list_sorted():
+    library = _library("a.png", "b.png", "c.png", "d.png")
+    view = library.query(SortMode.DIMENSIONS_ASC)
+
+    assert library.update_in_view(view, "a.png", SortMode.DIMENSIONS_ASC, width=40, height=30) == (0, 3)
+    assert [r.name for r in view] == ["b.png", "c.png", "d.png", "a.png"]
+    assert view == library.query(SortMode.DIMENSIONS_ASC)
+    for index, record in enumerate(view):
+        assert library.view_index(view, record.key, SortMode.DIMENSIONS_ASC) == index
+
+    # 删除依赖 view_index 找到正确的位置
+    index = library.view_index(view, "c.png", SortMode.DIMENSIONS_ASC)
+    assert view[index].key == "c.png"
+    del view[index]
+    library.remove("c.png")
+    assert view == library.query(SortMode.DIMENSIONS_ASC)
+
+
+def test_update_in_view_ignores_other_sort_fields_and_filtered_records():
+    library = _library("a.png", "b.jpg")
+    view = library.query(SortMode.NAME_ASC)
+    assert library.update_in_view(view, "b.jpg", SortMode.NAME_ASC, width=10, height=10) is None
+    assert library.get("b.jpg").width == 10
+
+    png_only = ImageFilter(formats=["png"])
+    view = library.query(SortMode.DIMENSIONS_DESC, png_only)
+    assert library.update_in_view(view, "b.jpg", SortMode.DIMENSIONS_DESC, png_only, width=50, height=50) is None
+    assert [r.name for r in view] == ["a.png"]
+    assert [r.name for r in library.query(SortMode.DIMENSIONS_DESC)] == ["b.jpg", "a.png"]
+
+
+def test_shard_sizes_is_a_snapshot():
+    s1, s2 = Shard("s1", "me/a"), Shard("s2", "me/b")
+    library = ImageLibrary()
+    library.reset([ImageRecord("a.png", size=10, shard=s1), ImageRecord("b.png", size=5, shard=s2)])
+    sizes = library.shard_sizes()
+    library.add(ImageRecord("c.png", size=7, shard=s1))
+    assert sizes == {s1: 10, s2: 5}
+    assert library.shard_sizes() == {s1: 17, s2: 5}
+
+
+def test_incremental_views_match_a_full_sort():
+    rnd = random.Random(7)
+    library = ImageLibrary()
+    library.reset([ImageRecord(f"dir{i % 3}/img{i}.png", size=rnd.randint(1, 50)) for i in range(40)])
+    for mode in SortMode:
+        library.query(mode)   # 先构建所有视图，之后的修改都走增量维护
+
+    for step in range(200):
+        action = rnd.choice(["add", "remove", "update"])
+        if action == "add":
+            library.add(ImageRecord(f"dir{step % 3}/new{step}.{rnd.choice(['png', 'jpg', 'gif'])}",
+                                    size=rnd.randint(1, 50), date=f"2024-01-{rnd.randint(1, 28):02d}"))
+        elif action == "remove" and len(library):
+            library.remove(rnd.choice(library.records()).key)
+        elif len(library):
+            library.update(rnd.choice(library.records()).key, size=rnd.randint(1, 50),
+                           width=rnd.randint(1, 9), height=rnd.randint(1, 9))
+
+    fresh = ImageLibrary()
+    fresh.reset(library.records())
+    keyword = ImageFilter(keyword="new1", formats=["png", "gif"])
+    for mode in SortMode:
+        assert [r.key for r in library.query(mode)] == [r.key for r in fresh.query(mode)]
+        assert [r.key for r in library.query(mode, keyword)] == [r.key for r in fresh.query(mode, keyword)]
+        view = library.query(mode)
+        for index, record in enumerate(view):
+            assert library.view_index(view, record.key, mode) == index
+    assert library.total_size() == sum(r.size for r in library.records())
+
+
+def test_add_replaces_record_with_the_same_key():
+    library = _library("a.png", "b.png")
+    library.query(SortMode.SIZE_DESC)
+    library.add(ImageRecord("a.png", size=100))
+    assert len(library) == 2
+    assert [r.name for r in library.query(SortMode.SIZE_DESC)] == ["a.png", "b.png"]
+    assert library.total_size() == 100
+
+
+def test_last_returns_newest_date():
+    library = ImageLibrary()
+    library.reset([ImageRecord("a.png", date="2024-01-02"), ImageRecord("b.png", date="2024-03-01")])
+    assert library.last("date").name == "b.png"
+    library.update("a.png", date="2024-05-01")
+    assert library.last("date").name == "a.png"
+    assert ImageLibrary().last("date") is None
@@ -0,0 +1,76 @@
+"""请求指标：端点归类、直方图分位数与 JSON / Prometheus 导出"""
+import json
+
+import pytest
+
+import metrics
+from github_manager import GitHubImageManager
+from metrics import Histogram, MetricsRegistry
+
+
+@pytest.mark.parametrize("url, endpoint", [
+    ("https://api.github.com/repos/me/img/contents/a.png", "contents"),
+    ("https://api.github.com/repos/me/img/git/trees/main:images", "git/trees"),
+    ("https://api.github.com/repos/me/img/git/ref/heads/main", "git/refs"),
+    ("https://api.github.com/repos/me/img/git/refs/heads/main", "git/refs"),
+    ("https://api.github.com/graphql", "graphql"),
+    ("https://api.github.com/repos/me/img", "api"),
+    ("https://raw.githubusercontent.com/me/img/main/a.png", "download"),
+])
+def test_endpoint_of(url, endpoint):
+    assert metrics.endpoint_of(url) == endpoint
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == 3.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_and_json_export(tmp_path):
+    registry = MetricsRegistry()
+    registry.inc("ghiu_http_requests_total", method="GET", endpoint="contents", status=200)
+    registry.inc("ghiu_http_requests_total", 2, method="GET", endpoint="contents", status=200)
+    registry.set("ghiu_ratelimit_remaining", 42)
+    registry.observe("ghiu_stage_seconds", 0.02, stage='say "hi"')
+
+    text = registry.to_prometheus()
+    assert "# TYPE ghiu_http_requests_total counter" in text
+    assert 'ghiu_http_requests_total{endpoint="contents",method="GET",status="200"} 3' in text
+    assert "ghiu_ratelimit_remaining 42" in text
+    assert 'ghiu_stage_seconds_bucket{stage="say \\"hi\\"",le="0.025"} 1' in text
+    assert 'ghiu_stage_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 1' in text
+    assert 'ghiu_stage_seconds_count{stage="say \\"hi\\""} 1' in text
+
+    registry.export(str(tmp_path / "m.prom"))
+    assert (tmp_path / "m.prom").read_text(encoding="utf-8") == text
+    registry.export(str(tmp_path / "m.json"))
+    snapshot = json.loads((tmp_path / "m.json").read_text(encoding="utf-8"))
+    assert snapshot["counters"] == [{
+        "name": "ghiu_http_requests_total",
+        "labels": {"endpoint": "contents", "method": "GET", "status": "200"},
+        "value": 3,
+    }]
+    assert snapshot["histograms"][0]["count"] == 1
+
+
+def test_requests_are_recorded_per_endpoint(fake_github):
+    server, config = fake_github
+    server.store.seed({"images/a.png": b"a"})
+    metrics.REGISTRY.reset()
+    try:
+        GitHubImageManager.list_directory(config, "images")
+        snapshot = metrics.REGISTRY.snapshot()
+    finally:
+        metrics.REGISTRY.reset()
+    counters = {(c["name"], c["labels"].get("endpoint"), c["labels"].get("status")): c["value"]
+                for c in snapshot["counters"]}
+    assert counters[("ghiu_http_requests_total", "contents", "200")] == 1
+    assert counters[("ghiu_http_bytes_received_total", "contents", None)] > 0
+    gauges = {g["name"]: g["value"] for g in snapshot["gauges"]}
+    assert gauges["ghiu_ratelimit_remaining"] < gauges["ghiu_ratelimit_limit"]
@@ -0,0 +1,85 @@
+"""多主机下载：失败切换、冷却排序与过期内容校验"""
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from github_manager import GitHubImageManager, git_blob_sha
+from mirrors import Host, MirrorSelector, hosts_from_config
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _download(url):
+    return GitHubImageManager.download(url, timeout=5)
+
+
+@pytest.fixture
+def mirror_config(fake_github):
+    server, config = fake_github
+    server.store.seed({"images/a.png": b"fresh"})
+    config = dict(
+        config,
+        # 无法连接的自定义域名、指向不存在分支（返回 404）的镜像
+        custom_domain=f"http://127.0.0.1:{_closed_port()}",
+        mirrors=[config["raw_base"] + "/{repo}/stale/{path}", "no-placeholder"],
+    )
+    return server, config
+
+
+def test_hosts_from_config(mirror_config):
+    _, config = mirror_config
+    hosts = hosts_from_config(config)
+    assert [h.name for h in hosts] == ["raw", "custom_domain", "mirror1"]
+    assert hosts[0].url("images/a b.png", config) == f"{config['raw_base']}/owner/repo/main/images/a%20b.png"
+
+
+def test_fetch_fails_over_and_cools_down_failing_hosts(mirror_config):
+    _, config = mirror_config
+    hosts = hosts_from_config(config)
+    # 把可用的 raw 排到最后，前两个主机失败后才轮到它
+    selector = MirrorSelector(hosts[1:] + hosts[:1])
+    verify = lambda data: git_blob_sha(data) == git_blob_sha(b"fresh")
+
+    assert selector.fetch("images/a.png", config, _download, verify) == b"fresh"
+    stats = {s["host"]: s for s in selector.stats()}
+    assert stats["raw"]["healthy"] and stats["raw"]["errors"] == 0
+    assert not stats["custom_domain"]["healthy"] and stats["custom_domain"]["errors"] == 1
+    assert not stats["mirror1"]["healthy"]
+
+    # 冷却中的主机排到最后，下一次直接命中 raw
+    assert [h.name for h in selector.ranked()][0] == "raw"
+    assert selector.fetch("images/a.png", config, _download, verify) == b"fresh"
+    assert {s["host"]: s["requests"] for s in selector.stats()} == {"raw": 2, "custom_domain": 1, "mirror1": 1}
+
+
+def test_stale_content_counts_as_failure(mirror_config):
+    _, config = mirror_config
+    selector = MirrorSelector(hosts_from_config(dict(config, custom_domain=None, mirrors=[])))
+    with pytest.raises(Exception, match="过期"):
+        selector.fetch("images/a.png", config, _download, lambda data: False)
+    assert selector.stats()[0]["errors"] == 1
+
+
+def test_ranking_prefers_lower_latency_and_explores():
+    fast, slow = Host("fast", "{path}"), Host("slow", "{path}")
+    selector = MirrorSelector([slow, fast], explore_every=5)
+    selector.record(fast, 0.01, True)
+    selector.record(slow, 0.5, True)
+    firsts = [selector.ranked()[0].name for _ in range(10)]
+    assert firsts.count("slow") == 2
+    assert firsts[4] == firsts[9] == "slow"
+
+
+def test_fetch_async_fails_over(mirror_config):
+    _, config = mirror_config
+    hosts = hosts_from_config(config)
+    selector = MirrorSelector(hosts[1:] + hosts[:1])
+    with ThreadPoolExecutor(2) as pool:
+        future = selector.fetch_async("images/a.png", config, lambda url: pool.submit(_download, url))
+        assert future.result(timeout=10) == b"fresh"
+    assert [s["healthy"] for s in selector.stats()] == [False, False, True]
@@ -0,0 +1,87 @@
+"""优先级调度：同步与异步（事件循环）等待者共用名额"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import net_scheduler
+from net_scheduler import BACKGROUND, PREFETCH, PREVIEW, NetworkScheduler
+
+
+def test_async_waiter_is_granted_on_release():
+    scheduler = NetworkScheduler(max_concurrent=1)
+    scheduler.acquire(PREVIEW)
+    future = scheduler.acquire_future(PREVIEW)
+    assert not future.done()
+    scheduler.release(PREVIEW)
+    assert future.done()
+    assert scheduler.stats()["active"]["preview"] == 1
+
+
+def test_higher_priority_sync_waiter_goes_first():
+    scheduler = NetworkScheduler(max_concurrent=3)
+    scheduler.acquire(PREVIEW)
+    scheduler.acquire(PREVIEW)   # 低优先级只能使用 3 - 1 个名额，此时已满
+    background = scheduler.acquire_future(BACKGROUND)
+    started = threading.Event()
+
+    def preview():
+        scheduler.acquire(PREVIEW)
+        started.set()
+
+    thread = threading.Thread(target=preview)
+    thread.start()
+    assert started.wait(2)
+    assert not background.done()
+    scheduler.release(PREVIEW)
+    thread.join()
+    assert not background.done()   # 剩余名额是留给交互请求的
+    scheduler.release(PREVIEW)
+    assert background.done()
+
+
+def test_cancelled_async_waiter_leaves_queue():
+    scheduler = NetworkScheduler(max_concurrent=1)
+    scheduler.acquire(PREVIEW)
+    cancelled = scheduler.acquire_future(PREFETCH)
+    waiting = scheduler.acquire_future(PREVIEW)
+    assert cancelled.cancel()
+    assert scheduler.stats()["waiting"]["prefetch"] == 0
+    scheduler.release(PREVIEW)
+    assert waiting.done()
+    assert scheduler.stats()["active"] == {"preview": 1, "visible": 0, "write": 0, "prefetch": 0, "background": 0}
+
+
+def test_slot_async_limits_concurrency():
+    scheduler = net_scheduler.enable(4, {"prefetch": 2})
+    peak = 0
+    running = 0
+
+    async def job():
+        nonlocal peak, running
+        async with net_scheduler.slot_async(PREFETCH):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    async def main():
+        tasks = [asyncio.ensure_future(job()) for _ in range(10)]
+        await asyncio.sleep(0.001)
+        tasks[-1].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        asyncio.run(main())
+    finally:
+        net_scheduler.disable()
+    assert peak == 2
+    assert scheduler.stats()["active"]["prefetch"] == 0
+    assert scheduler.stats()["waiting"]["prefetch"] == 0
+
+
+def test_cli_import_does_not_load_asyncio():
+    # 只有异步引擎需要 asyncio，命令行启动不应为它付出导入时间
+    code = "import sys, cli; sys.exit('asyncio' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__))).returncode == 0
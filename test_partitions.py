@@ -0,0 +1,57 @@
+"""按日期分区加载：只进入符合布局的目录，其他目录和直接存放的图片排在所有分区之后"""
+from datetime import datetime
+
+from partitions import PartitionLoader, PartitionWalker
+
+
+def _load_all(loader):
+    order = []
+    for partition, items in iter(loader.load_next, None):
+        order.append((partition, sorted(item["name"] for _, item in items)))
+    return order
+
+
+def test_non_date_folders_load_after_all_partitions(fake_github):
+    server, config = fake_github
+    server.store.seed({
+        "images/2025/03/current.png": b"c",
+        "images/2025/02/feb.png": b"f",
+        "images/2024/12/dec.png": b"d",
+        "images/2024/bare.png": b"b",
+        "images/thumbs/t.png": b"t",
+        "images/thumbs/small/s.png": b"s",
+        "images/old.png": b"o",
+    })
+    loader = PartitionLoader([("", config)], "%Y/%m", when=datetime(2025, 3, 15))
+
+    assert [item["name"] for _, item in loader.load_current()] == ["current.png"]
+    order = _load_all(loader)
+    assert order[:2] == [("2025/02", ["feb.png"]), ("2024/12", ["dec.png"])]
+    assert sorted(order[2:]) == [
+        ("", ["old.png"]), ("2024", ["bare.png"]), ("thumbs", ["t.png"]), ("thumbs/small", ["s.png"]),
+    ]
+
+
+def test_partitions_merge_across_shards_before_undated(fake_github):
+    server, config = fake_github
+    server.store.seed({
+        "images/2024/11/a.png": b"a",
+        "images/misc/m.png": b"m",
+        "other/2024/12/b.png": b"b",
+        "other/2024/11/c.png": b"c",
+    })
+    loader = PartitionLoader(
+        [("a", config), ("b", dict(config, path="other"))], "%Y/%m", when=datetime(2025, 1, 1)
+    )
+    loader.load_current()
+    assert _load_all(loader) == [
+        ("2024/12", ["b.png"]), ("2024/11", ["a.png", "c.png"]), ("misc", ["m.png"]),
+    ]
+
+
+def test_is_partition_follows_layout():
+    walker = PartitionWalker({"path": "images"}, "%Y/%m")
+    assert walker.is_partition("2024/05")
+    assert not walker.is_partition("2024")
+    assert not walker.is_partition("thumbs/05")
+    assert not walker.is_partition("2024/5")
@@ -0,0 +1,75 @@
+"""缩略图预取：下载阶段在锁外启动，已完成的下载不会递归处理"""
+import threading
+from concurrent.futures import Future
+
+from prefetch import Prefetcher
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _run(prefetcher, keys, done, timeout=10):
+    prefetcher.update([(key, key) for key in keys])
+    assert done.wait(timeout)
+    prefetcher.close()
+
+
+def test_many_completed_fetches_do_not_recurse():
+    count = 3000
+    results, done = [], threading.Event()
+
+    def on_done(key, payload, result, error, wanted):
+        assert error is None
+        results.append(result)
+        if len(results) == count:
+            done.set()
+
+    prefetcher = Prefetcher(lambda payload, data: data * 2, on_done, workers=2, fetch=_done, fetch_limit=1)
+    _run(prefetcher, range(count), done)
+    assert sorted(results) == [i * 2 for i in range(count)]
+
+
+def test_fetch_runs_without_holding_the_lock():
+    held = []
+    done = threading.Event()
+    prefetcher = None
+
+    def fetch(payload):
+        # 其他线程此时必须能拿到锁（例如下载完成回调、界面线程更新窗口）
+        acquired = []
+
+        def probe():
+            acquired.append(prefetcher._cond.acquire(timeout=1))
+            if acquired[0]:
+                prefetcher._cond.release()
+
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        held.append(not acquired[0])
+        return _done(payload)
+
+    prefetcher = Prefetcher(lambda payload, data: data, lambda *args: done.set(), workers=1, fetch=fetch)
+    _run(prefetcher, ["a"], done)
+    assert held == [False]
+
+
+def test_window_change_cancels_pending_downloads():
+    futures = {}
+    cancelled = threading.Event()
+
+    def fetch(payload):
+        futures[payload] = Future()
+        futures[payload].add_done_callback(lambda f: f.cancelled() and cancelled.set())
+        return futures[payload]
+
+    prefetcher = Prefetcher(lambda payload, data: data, lambda *args: None, workers=1, fetch=fetch)
+    prefetcher.update([("a", "a")])
+    prefetcher.update([("b", "b")])
+    assert cancelled.wait(5)
+    assert futures["a"].cancelled() and not futures["b"].done()
+    prefetcher.close()
+    assert futures["b"].cancelled()
@@ -0,0 +1,80 @@
+"""批量上传与目录同步：不覆盖远程已有的文件，同步只提交变化的部分"""
+from repo_sync import apply_sync, plan_sync, upload_batch
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_upload_batch_never_overwrites(fake_github, tmp_path):
+    server, config = fake_github
+    server.store.seed({"images/a.png": b"old", "images/a-1.png": b"older", "images/same.png": b"same"})
+    (tmp_path / "sub").mkdir()
+    files = [
+        _write(tmp_path, "a.png", b"new"),
+        _write(tmp_path / "sub", "a.png", b"newer"),
+        _write(tmp_path, "same.png", b"same"),
+        _write(tmp_path, "fresh.png", b"fresh"),
+    ]
+
+    results = upload_batch(files, config, concurrency=1)
+
+    paths = [repo_path for _, repo_path, _ in results]
+    assert paths == ["images/a-2.png", "images/a-3.png", "images/same.png", "images/fresh.png"]
+    remote = server.store.files("main")
+    stored = {path: server.store.blobs[sha] for path, sha in remote.items()}
+    assert stored["images/a.png"] == b"old"
+    assert stored["images/a-1.png"] == b"older"
+    assert stored["images/a-2.png"] == b"new"
+    assert stored["images/a-3.png"] == b"newer"
+    assert stored["images/same.png"] == b"same"
+
+
+def test_upload_batch_skips_commit_when_all_present(fake_github, tmp_path):
+    server, config = fake_github
+    head = server.store.seed({"images/a.png": b"a"})
+    results = upload_batch([_write(tmp_path, "a.png", b"a")], config)
+    assert [p for _, p, _ in results] == ["images/a.png"]
+    assert server.store.branches["main"] == head
+
+
+def test_sync_uploads_only_changes_in_one_commit(fake_github, tmp_path):
+    server, config = fake_github
+    head = server.store.seed({
+        "images/same.png": b"same",
+        "images/sub/changed.png": b"old",
+        "images/gone.png": b"gone",
+        "images/notes.txt": b"not an image",
+    })
+    source = tmp_path / "assets"
+    (source / "sub").mkdir(parents=True)
+    (source / "same.png").write_bytes(b"same")
+    (source / "sub" / "changed.png").write_bytes(b"new")
+    (source / "added.jpg").write_bytes(b"added")
+    (source / "readme.md").write_bytes(b"ignored")
+
+    plan = plan_sync(str(source), config, delete=True)
+    assert sorted(p for _, p, _ in plan.uploads) == ["images/added.jpg", "images/sub/changed.png"]
+    assert plan.deletes == ["images/gone.png"]
+    assert plan.unchanged == 1
+
+    progress = []
+    commit = apply_sync(plan, config, concurrency=2, progress=lambda done, total: progress.append((done, total)))
+    assert server.store.branches["main"] == commit
+    assert server.store.commits[commit]["parents"] == [head]
+    assert progress[-1] == (2, 2)
+    stored = {path: server.store.blobs[sha] for path, sha in server.store.files("main").items()}
+    assert stored == {
+        "images/same.png": b"same",
+        "images/sub/changed.png": b"new",
+        "images/added.jpg": b"added",
+        "images/notes.txt": b"not an image",
+    }
+
+    # 再次同步没有任何变更，也不产生提交
+    again = plan_sync(str(source), config, delete=True)
+    assert again.is_empty() and again.unchanged == 3
+    assert apply_sync(again, config) is None
+    assert server.store.branches["main"] == commit
@@ -0,0 +1,53 @@
+"""缩略图渲染与紧凑缓存：各种图像模式都能渲染并编码为PNG"""
+import io
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+import thumbnail_render  # noqa: E402
+from thumbnail_cache import ThumbnailCache  # noqa: E402
+
+
+def _encode(img, fmt, **params):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def _palette_image():
+    return Image.new("RGB", (320, 200), (200, 40, 40)).convert("P", palette=Image.ADAPTIVE, colors=16)
+
+
+@pytest.mark.parametrize("data", [
+    _encode(_palette_image(), "GIF"),
+    _encode(_palette_image(), "PNG"),
+    _encode(_palette_image(), "PNG", transparency=0),
+    _encode(Image.new("L", (320, 200), 128), "PNG"),
+    _encode(Image.new("CMYK", (320, 200), (0, 255, 255, 0)), "JPEG"),
+    _encode(Image.new("RGBA", (320, 200), (0, 0, 255, 128)), "PNG"),
+], ids=["gif", "palette-png", "palette-png-transparent", "grayscale", "cmyk-jpeg", "rgba"])
+def test_render_and_store_compact(data):
+    thumb, width, height = thumbnail_render.render(data)
+    assert (width, height) == (320, 200)
+    assert thumb.size == thumbnail_render.THUMB_SIZE
+    assert thumb.mode in ("RGBA", "LA")
+    # 圆角之外透明，中心不透明
+    assert thumb.getchannel("A").getpixel((0, 0)) == 0
+    assert thumb.getchannel("A").getpixel((120, 90)) == 255
+
+    cache = ThumbnailCache()
+    cache.store_compact("images/a", thumb)
+    restored = cache.load_compact("images/a")
+    assert restored.size == thumb.size
+    assert restored.mode == thumb.mode
+
+
+def test_render_keeps_first_frame_of_animated_gif():
+    frames = [Image.new("P", (64, 48), i) for i in range(3)]
+    data = io.BytesIO()
+    frames[0].save(data, format="GIF", save_all=True, append_images=frames[1:])
+    thumb, width, height = thumbnail_render.render(data.getvalue())
+    assert (width, height) == (64, 48)
+    ThumbnailCache().store_compact("images/anim", thumb)
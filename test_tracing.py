@@ -0,0 +1,84 @@
+"""操作级追踪：Chrome trace event 输出与 span 嵌套"""
+import json
+import threading
+
+import pytest
+
+import tracing
+from github_manager import GitHubImageManager
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / "trace.json"
+    tracing.enable(str(path))
+    yield path
+    tracing.disable()
+
+
+def _events(path):
+    tracing.disable()
+    return [e for e in json.loads(path.read_text(encoding="utf-8")) if e["ph"] == "X"]
+
+
+def test_disabled_span_is_shared_noop():
+    assert not tracing.enabled()
+    with tracing.span("noop", a=1) as span:
+        span.set(b=2)
+    assert span is tracing.NULL_SPAN
+
+
+def test_nested_spans_attrs_and_errors(trace_path):
+    with tracing.span("outer.op", file="a.png") as outer:
+        with tracing.span("inner.step"):
+            pass
+        outer.set(status=200)
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+
+    @tracing.traced("decorated")
+    def work():
+        return 7
+    assert work() == 7
+
+    def in_thread():
+        with tracing.span("worker.op"):
+            pass
+    thread = threading.Thread(target=in_thread, name="worker-1")
+    thread.start()
+    thread.join()
+
+    events = _events(trace_path)
+    by_name = {e["name"]: e for e in events}
+    outer, inner = by_name["outer.op"], by_name["inner.step"]
+    # 同一线程内的子 span 落在父 span 的时间范围内
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 0.01
+    assert outer["cat"] == "outer"
+    assert outer["args"] == {"file": "a.png", "status": 200}
+    assert by_name["failing"]["args"]["error"] == "ValueError: boom"
+    assert "decorated" in by_name
+    assert by_name["worker.op"]["tid"] != outer["tid"]
+
+    meta = json.loads(trace_path.read_text(encoding="utf-8"))
+    thread_names = {e["args"]["name"] for e in meta if e["name"] == "thread_name"}
+    assert "worker-1" in thread_names
+
+
+def test_http_requests_nest_inside_operation(fake_github, trace_path):
+    server, config = fake_github
+    server.store.seed({"images/a.png": b"a"})
+    GitHubImageManager.rename_path("images/a.png", "b.png", config)
+
+    events = _events(trace_path)
+    rename = next(e for e in events if e["name"] == "rename")
+    http = [e for e in events if e["cat"] == "http"]
+    assert http
+    for event in http:
+        assert rename["ts"] <= event["ts"] <= rename["ts"] + rename["dur"]
+    # 先确认新路径不存在（404），其余请求均成功
+    statuses = [event["args"]["status"] for event in http]
+    assert 404 in statuses
+    assert all(status < 300 for status in statuses if status != 404)
+    assert rename["args"] == {"path": "images/a.png", "new_name": "b.png"}
@@ -0,0 +1,86 @@
+"""界面更新调度器：工作线程的提交在主线程按序执行，同一 key 的提交合并"""
+import threading
+
+from ui_dispatcher import UIDispatcher
+
+
+class FakeRoot:
+    """只记录 after 回调的Tk根窗口替身，由测试手动推进一帧"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, interval, func):
+        self.scheduled.append(func)
+
+    def frame(self):
+        func = self.scheduled.pop(0)
+        func()
+
+
+def _from_worker(func):
+    thread = threading.Thread(target=func)
+    thread.start()
+    thread.join()
+
+
+def test_worker_calls_run_in_order_on_the_main_thread():
+    root = FakeRoot()
+    ui = UIDispatcher(root)
+    calls = []
+
+    def record(value):
+        calls.append((value, threading.current_thread() is threading.main_thread()))
+
+    _from_worker(lambda: [ui.call(record, i) for i in range(5)])
+    assert calls == []
+    root.frame()
+    assert calls == [(i, True) for i in range(5)]
+
+
+def test_post_keeps_only_the_latest_value_per_key():
+    root = FakeRoot()
+    ui = UIDispatcher(root)
+    calls = []
+
+    def worker():
+        for i in range(100):
+            ui.post("status", calls.append, f"status {i}")
+        ui.call(calls.append, "done")
+
+    _from_worker(worker)
+    root.frame()
+    assert calls == ["status 99", "done"]
+
+
+def test_main_thread_calls_run_immediately_and_replace_pending_posts():
+    root = FakeRoot()
+    ui = UIDispatcher(root)
+    calls = []
+    _from_worker(lambda: ui.post("progress", calls.append, "stale"))
+    ui.post("progress", calls.append, "fresh")
+    ui.call(calls.append, "direct")
+    assert calls == ["fresh", "direct"]
+    root.frame()
+    assert calls == ["fresh", "direct"]
+
+
+def test_work_beyond_the_frame_budget_waits_for_the_next_frame():
+    root = FakeRoot()
+    ui = UIDispatcher(root, frame_budget=0.0)
+    calls = []
+    _from_worker(lambda: [ui.call(calls.append, i) for i in range(3)])
+    root.frame()
+    assert calls == []
+    ui.frame_budget = 1.0
+    root.frame()
+    assert calls == [0, 1, 2]
+
+
+def test_errors_do_not_stop_the_queue(capsys):
+    root = FakeRoot()
+    ui = UIDispatcher(root)
+    calls = []
+    _from_worker(lambda: (ui.call(lambda: 1 / 0), ui.call(calls.append, "after")))
+    root.frame()
+    assert calls == ["after"]
+    assert "UI dispatch error" in capsys.readouterr().out
@@ -0,0 +1,87 @@
+"""上传队列日志：批量加入、崩溃后重放与幂等上传"""
+import os
+
+import upload_journal
+from upload_journal import UploadJournal
+
+
+def test_enqueue_many_syncs_once_and_replays(tmp_path, monkeypatch):
+    journal = UploadJournal(str(tmp_path / "queue.jsonl"))
+    syncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(upload_journal.os, "fsync", lambda fd: (syncs.append(fd), real_fsync(fd)))
+
+    items = [(str(tmp_path / f"{i}.png"), f"images/{i}.png", "me/images", "main") for i in range(200)]
+    entries = journal.enqueue_many(items)
+    assert len(syncs) == 1
+    assert [e["target"] for e in entries] == [f"images/{i}.png" for i in range(200)]
+
+    # 已在队列中的文件返回原条目，不再写入
+    again = journal.enqueue_many(items[:2] + [(str(tmp_path / "new.png"), "images/new.png", "me/images", "main")])
+    assert [e["id"] for e in again[:2]] == [e["id"] for e in entries[:2]]
+    assert len(syncs) == 2
+    journal.close()
+
+    replayed = UploadJournal(str(tmp_path / "queue.jsonl"))
+    assert [e["target"] for e in replayed.unfinished()] == [f"images/{i}.png" for i in range(200)] + ["images/new.png"]
+    replayed.close()
+
+
+def test_replay_skips_half_written_line(tmp_path):
+    path = str(tmp_path / "queue.jsonl")
+    journal = UploadJournal(path)
+    entry = journal.enqueue(str(tmp_path / "a.png"), "images/a.png", "me/images", "main")
+    journal.close()
+    # 模拟崩溃：最后一行只写了一半
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "%s", "op": "update", "sta' % entry["id"])
+
+    journal = UploadJournal(path)
+    assert [e["state"] for e in journal.unfinished()] == [upload_journal.PENDING]
+    journal.mark(entry["id"], upload_journal.IN_FLIGHT, sha="abc")
+    journal.close()
+
+    # 新记录另起一行，再次重放能读到
+    replayed = UploadJournal(path)
+    assert replayed.next_unfinished()["state"] == upload_journal.IN_FLIGHT
+    assert replayed.next_unfinished()["sha"] == "abc"
+    replayed.close()
+
+
+def test_in_flight_entry_already_on_server_is_not_uploaded_again(tmp_path, fake_github):
+    server, config = fake_github
+    local = tmp_path / "a.png"
+    local.write_bytes(b"png-bytes")
+    server.store.seed({"images/a.png": b"png-bytes"})
+    commits = len(server.store.commits)
+
+    path = str(tmp_path / "queue.jsonl")
+    journal = UploadJournal(path)
+    entry = journal.enqueue(str(local), "images/a.png", config["repo"], config["branch"])
+    # 上次运行在写入服务器之后、记录完成之前崩溃
+    journal.mark(entry["id"], upload_journal.IN_FLIGHT, sha=upload_journal.git_blob_sha(b"png-bytes"))
+    journal.close()
+
+    journal = UploadJournal(path)
+    item = upload_journal.upload_entry(journal, journal.next_unfinished(), config)
+    assert item["sha"] == upload_journal.git_blob_sha(b"png-bytes")
+    assert len(server.store.commits) == commits
+    assert journal.next_unfinished() is None
+    journal.close()
+    assert UploadJournal(path).unfinished() == []
+
+
+def test_pending_entry_uploads_once(tmp_path, fake_github):
+    server, config = fake_github
+    server.store.seed({})
+    commits = len(server.store.commits)
+    local = tmp_path / "b.png"
+    local.write_bytes(b"new-bytes")
+
+    journal = UploadJournal(str(tmp_path / "queue.jsonl"))
+    entry = journal.enqueue(str(local), "images/b.png", config["repo"], config["branch"])
+    upload_journal.upload_entry(journal, entry, config)
+    assert server.store.files(config["branch"])["images/b.png"] == upload_journal.git_blob_sha(b"new-bytes")
+    assert len(server.store.commits) == commits + 1
+    assert journal.next_unfinished() is None
+    journal.close()
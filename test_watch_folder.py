@@ -0,0 +1,91 @@
+"""监视文件夹：失败的批次重试、只上传新文件、停止时释放管道"""
+import os
+import threading
+import time
+
+import pytest
+
+from watch_folder import FolderWatcher
+
+
+def _write(path, data=b"png"):
+    with open(path, "wb") as f:
+        f.write(data)
+    # 让文件看起来早已写完，不必等待 settle
+    old = time.time() - 10
+    os.utime(path, (old, old))
+
+
+def _watch(directory, on_batch, use_inotify, **kwargs):
+    return FolderWatcher(
+        str(directory), on_batch, debounce=0.05, settle=0.0, poll_interval=0.05,
+        use_inotify=use_inotify, **kwargs
+    ).start()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_failed_batch_is_retried(tmp_path, use_inotify):
+    batches, errors = [], []
+
+    def on_batch(files):
+        batches.append([os.path.basename(f) for f in files])
+        if len(batches) == 1:
+            raise ConnectionError("rate limited")
+
+    watcher = _watch(tmp_path, on_batch, use_inotify, retry_delay=0.1)
+    watcher.on_error = errors.append
+    try:
+        _write(tmp_path / "a.png")
+        assert _wait_for(lambda: len(batches) >= 2)
+    finally:
+        watcher.stop()
+    assert batches[:2] == [["a.png"], ["a.png"]]
+    assert len(errors) == 1
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_only_new_paths_are_uploaded(tmp_path, use_inotify):
+    _write(tmp_path / "old.png")
+    uploaded = []
+    watcher = _watch(tmp_path, lambda files: uploaded.extend(os.path.basename(f) for f in files), use_inotify)
+    try:
+        _write(tmp_path / "new.png")
+        assert _wait_for(lambda: uploaded == ["new.png"])
+        # 修改已有文件与已上传的文件都不会再次上传
+        _write(tmp_path / "old.png", b"changed")
+        _write(tmp_path / "new.png", b"changed")
+        time.sleep(0.5)
+        # 删除后重新出现的同名文件是新文件
+        os.remove(tmp_path / "new.png")
+        time.sleep(0.2)
+        _write(tmp_path / "new.png", b"again")
+        assert _wait_for(lambda: len(uploaded) == 2)
+    finally:
+        watcher.stop()
+    assert uploaded == ["new.png", "new.png"]
+
+
+def test_stop_from_watcher_thread_closes_pipe(tmp_path):
+    stopped = threading.Event()
+
+    def on_batch(files):
+        watcher.stop()
+        stopped.set()
+
+    watcher = _watch(tmp_path, on_batch, use_inotify=False)
+    wake_r, wake_w = watcher._wake_r, watcher._wake_w
+    _write(tmp_path / "a.png")
+    assert stopped.wait(5)
+    watcher.wait()
+    for fd in (wake_r, wake_w):
+        with pytest.raises(OSError):
+            os.fstat(fd)
@@ -0,0 +1,104 @@
+"""缩略图内存预算
+
+界面上的缩略图分两级保存：
+- 常驻：已解码的 PIL 图像 + CTkImage（按字节计入预算，超出后释放远离视口的卡片）
+- 紧凑：PNG 编码后的缩略图字节，卡片重新进入视口时直接解码恢复，无需再次下载
+"""
+import io
+import threading
+from collections import OrderedDict
+
+
+class ThumbnailCache:
+    """按路径管理缩略图的常驻内存与紧凑缓存"""
+    def __init__(self, budget_bytes=64 * 1024 * 1024, compact_budget_bytes=128 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.compact_budget_bytes = compact_budget_bytes
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()  # path -> 字节数，按最近使用排序
+        self._compact = OrderedDict()   # path -> PNG 字节
+        self.resident_bytes = 0
+        self.compact_bytes = 0
+
+    @staticmethod
+    def image_bytes(img):
+        """估算已解码图像占用的字节数"""
+        width, height = img.size
+        return width * height * len(img.getbands())
+
+    # ---- 紧凑缓存 ----
+    def store_compact(self, path, img):
+        """把缩略图编码为PNG保存，超出紧凑预算时淘汰最久未用的条目"""
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG", optimize=False, compress_level=1)
+        data = buffer.getvalue()
+        with self._lock:
+            old = self._compact.pop(path, None)
+            if old is not None:
+                self.compact_bytes -= len(old)
+            self._compact[path] = data
+            self.compact_bytes += len(data)
+            while self.compact_bytes > self.compact_budget_bytes and len(self._compact) > 1:
+                _, evicted = self._compact.popitem(last=False)
+                self.compact_bytes -= len(evicted)
+
+    def has_compact(self, path):
+        with self._lock:
+            return path in self._compact
+
+    def load_compact(self, path):
+        """从紧凑缓存解码缩略图，未命中返回None"""
+        with self._lock:
+            data = self._compact.get(path)
+            if data is None:
+                return None
+            self._compact.move_to_end(path)
+        from PIL import Image
+
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        return img
+
+    def discard(self, path):
+        """彻底移除某张图片的所有缓存（图片被删除时）"""
+        self.release(path)
+        with self._lock:
+            data = self._compact.pop(path, None)
+            if data is not None:
+                self.compact_bytes -= len(data)
+
+    # ---- 常驻集合 ----
+    def mark_resident(self, path, nbytes):
+        with self._lock:
+            old = self._resident.pop(path, None)
+            if old is not None:
+                self.resident_bytes -= old
+            self._resident[path] = nbytes
+            self.resident_bytes += nbytes
+
+    def touch(self, path):
+        with self._lock:
+            if path in self._resident:
+                self._resident.move_to_end(path)
+
+    def release(self, path):
+        """从常驻集合中移除，返回是否原本常驻"""
+        with self._lock:
+            nbytes = self._resident.pop(path, None)
+            if nbytes is None:
+                return False
+            self.resident_bytes -= nbytes
+            return True
+
+    def release_all(self):
+        with self._lock:
+            self._resident.clear()
+            self.resident_bytes = 0
+
+    def over_budget(self):
+        return self.resident_bytes > self.budget_bytes
+
+    def eviction_candidates(self):
+        """按最久未使用顺序返回常驻路径"""
+        with self._lock:
+            return list(self._resident)
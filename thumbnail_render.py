@@ -0,0 +1,64 @@
+"""缩略图渲染流水线
+
+把原图字节变成卡片上显示的圆角缩略图，拆成独立的阶段以便单独计时：
+解码 -> 裁剪缩放 -> 圆角遮罩 -> 应用透明通道。
+PIL 在函数内部导入，命令行模式不会因此变慢。
+"""
+import io
+
+from metrics import REGISTRY
+
+
+THUMB_SIZE = (240, 180)
+CORNER_RADIUS = 10
+
+
+def decode(data):
+    """解码图片字节（立即读取像素数据）"""
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    return img
+
+
+# 可以直接缩放并加上透明通道的模式；其余（调色板 GIF/PNG、CMYK、16 位灰度等）先转为 RGBA，
+# 否则调色板图像加透明通道后成为 "PA"，无法再编码为 PNG
+DIRECT_MODES = ("RGB", "RGBA", "L", "LA")
+
+
+def fit(img, size=THUMB_SIZE):
+    """居中裁剪并缩放到缩略图尺寸"""
+    from PIL import Image, ImageOps
+
+    if img.mode not in DIRECT_MODES:
+        img = img.convert("RGBA")
+    return ImageOps.fit(img, size, method=Image.LANCZOS)
+
+
+def rounded_mask(size=THUMB_SIZE, radius=CORNER_RADIUS):
+    """生成圆角遮罩"""
+    from PIL import Image, ImageDraw
+
+    mask = Image.new("L", size, 0)
+    draw = ImageDraw.Draw(mask)
+    draw.rounded_rectangle((0, 0, size[0], size[1]), radius=radius, fill=255)
+    return mask
+
+
+def apply_mask(img, mask):
+    """把遮罩作为透明通道应用到缩略图上"""
+    img.putalpha(mask)
+    return img
+
+
+def render(data, size=THUMB_SIZE, radius=CORNER_RADIUS):
+    """完整流水线，返回 (缩略图, 原图宽, 原图高)"""
+    with REGISTRY.time("thumbnail.decode"):
+        img = decode(data)
+    width, height = img.size
+    with REGISTRY.time("thumbnail.fit"):
+        thumb = fit(img, size)
+    with REGISTRY.time("thumbnail.mask"):
+        thumb = apply_mask(thumb, rounded_mask(size, radius))
+    return thumb, width, height
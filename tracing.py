@@ -0,0 +1,149 @@
+"""操作级追踪
+
+把一次操作（上传、刷新、重命名……）拆成嵌套的时间段（span），记录开始/结束时间与属性，
+以 Chrome trace event 格式写入文件，可直接用 chrome://tracing 或 https://ui.perfetto.dev 打开。
+同一线程内的 span 按时间自动嵌套显示。
+
+未开启时 span() 只做一次全局判断并返回共享的空对象，几乎没有开销。
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+_tracer = None
+
+
+class _NullSpan:
+    """追踪关闭时使用的空 span"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "start")
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.complete(self.name, self.start, end, self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """在 span 结束前补充属性（如状态码、字节数）"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """把 span 以 Chrome trace event（JSON 数组）格式流式写入文件"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = set()
+        self._file.write("[\n")
+        self._write({"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0,
+                     "args": {"name": "GitHubImageUploader"}})
+
+    def _write(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False, default=str))
+        self._file.write(",\n")
+
+    def complete(self, name, start, end, attrs):
+        thread = threading.current_thread()
+        tid = thread.ident
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round((end - start) * 1e6, 3),
+            "pid": self._pid,
+            "tid": tid,
+            "args": attrs,
+        }
+        with self._lock:
+            if self._file is None:
+                return
+            if tid not in self._threads:
+                self._threads.add(tid)
+                self._write({"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                             "args": {"name": thread.name}})
+            self._write(event)
+
+    def close(self):
+        with self._lock:
+            if self._file is None:
+                return
+            # 以一个元数据事件收尾，使文件成为合法的 JSON 数组
+            self._file.write(json.dumps({"name": "trace_end", "ph": "M", "pid": self._pid, "tid": 0,
+                                         "args": {}}))
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+
+
+def enable(path):
+    """开始把追踪写入 path（已开启时先关闭旧文件）"""
+    global _tracer
+    disable()
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def disable():
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **attrs):
+    """创建一个 span：with tracing.span("upload", file=name) as sp: ..."""
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return _Span(tracer, name, attrs)
+
+
+def traced(name):
+    """装饰器：把整个函数调用记录为一个 span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+"""线程安全的界面更新调度器
+
+Tkinter 只能在主线程里操作控件。工作线程通过本调度器提交界面操作，
+主线程每帧（after 定时）取出执行一次；同一 key 的重复提交（状态栏、进度条）
+只保留最新值，并限制每帧的执行时间，避免后台重负载拖慢界面。
+"""
+import threading
+import time
+from collections import deque
+
+
+class UIDispatcher:
+    """把工作线程的界面操作汇集到Tk主线程执行"""
+    def __init__(self, root, interval=16, frame_budget=0.008):
+        self.root = root
+        self.interval = interval
+        self.frame_budget = frame_budget
+        self._main_thread = threading.current_thread()
+        self._lock = threading.Lock()
+        self._queue = deque()   # (key, func, args)；key 为 None 表示不合并
+        self._latest = {}       # key -> (func, args)，合并后的最新值
+        self._closed = False
+        self.root.after(self.interval, self._drain)
+
+    def in_main_thread(self):
+        return threading.current_thread() is self._main_thread
+
+    def call(self, func, *args):
+        """按提交顺序在主线程执行；主线程内调用时立即执行"""
+        if self.in_main_thread():
+            func(*args)
+            return
+        with self._lock:
+            self._queue.append((None, func, args))
+
+    def post(self, key, func, *args):
+        """合并提交：同一 key 在下一次执行前只保留最后一次的参数"""
+        if self.in_main_thread():
+            with self._lock:
+                self._latest.pop(key, None)
+            func(*args)
+            return
+        with self._lock:
+            if key not in self._latest:
+                self._queue.append((key, None, None))
+            self._latest[key] = (func, args)
+
+    def close(self):
+        self._closed = True
+
+    def _next(self):
+        with self._lock:
+            while self._queue:
+                key, func, args = self._queue.popleft()
+                if key is None:
+                    return func, args
+                # 主线程已直接执行过的合并项不再重复执行
+                if key in self._latest:
+                    return self._latest.pop(key)
+            return None
+
+    def _drain(self):
+        """主线程每帧执行一次，超出时间预算的操作留到下一帧"""
+        if self._closed:
+            return
+        deadline = time.perf_counter() + self.frame_budget
+        while time.perf_counter() < deadline:
+            item = self._next()
+            if item is None:
+                break
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"UI dispatch error: {e}")
+        self.root.after(self.interval, self._drain)
@@ -0,0 +1,190 @@
+"""可在崩溃后恢复的上传队列
+
+每个待上传文件在磁盘日志（JSON Lines，只追加）中记录状态变化：
+pending -> in_flight -> committed / failed。每次写入后 fsync，进程被强制结束或断网时
+最多丢失正在写的那一行（重放时忽略不完整的行）。下次启动时重放日志，继续处理
+pending 与 in_flight 的条目。
+
+in_flight 条目可能已在服务器上写入成功但未来得及记录，重试前先比较远程文件的 SHA
+与本地内容的 git blob SHA，相同则直接视为完成，保证同一文件不会被上传两次。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+from github_manager import GitHubImageManager, git_blob_sha
+
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+COMMITTED = "committed"
+FAILED = "failed"
+
+UNFINISHED = (PENDING, IN_FLIGHT)
+
+
+class UploadJournal:
+    """上传队列及其磁盘日志"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}   # id -> 条目，保持加入顺序
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() > 0 and not self._ends_with_newline():
+            # 结束崩溃时写了一半的行，避免与后续记录连在一起
+            self._file.write("\n")
+            self._file.flush()
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的行
+                entry_id = record.pop("id", None)
+                op = record.pop("op", None)
+                if op == "add":
+                    self._entries[entry_id] = dict(record, id=entry_id)
+                elif op == "update" and entry_id in self._entries:
+                    self._entries[entry_id].update(record)
+
+    def _append(self, *records):
+        """追加若干行后只 fsync 一次"""
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def enqueue(self, file_path, target_path, repo, branch):
+        """加入队列，返回条目；同一文件已在队列中未完成时返回已有条目"""
+        return self.enqueue_many([(file_path, target_path, repo, branch)])[0]
+
+    def enqueue_many(self, items):
+        """批量加入 [(本地路径, 目标路径, 仓库, 分支)]，整批只写一次磁盘，返回对应的条目"""
+        with self._lock:
+            existing = {
+                (e["file"], e["target"], e["repo"]): e
+                for e in self._entries.values() if e["state"] in UNFINISHED
+            }
+            entries, added = [], []
+            for file_path, target_path, repo, branch in items:
+                file_path = os.path.abspath(file_path)
+                entry = existing.get((file_path, target_path, repo))
+                if entry is None:
+                    entry = {
+                        "id": uuid.uuid4().hex,
+                        "file": file_path,
+                        "target": target_path,
+                        "repo": repo,
+                        "branch": branch,
+                        "state": PENDING,
+                        "added": time.time(),
+                    }
+                    self._entries[entry["id"]] = entry
+                    existing[(file_path, target_path, repo)] = entry
+                    added.append(dict(entry, op="add"))
+                entries.append(entry)
+            if added:
+                self._append(*added)
+            return entries
+
+    def mark(self, entry_id, state, **fields):
+        """记录状态变化（可附带 sha、remote_sha、error 等字段）"""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return
+            fields["state"] = state
+            entry.update(fields)
+            self._append(dict(fields, id=entry_id, op="update"))
+
+    def next_unfinished(self):
+        """按加入顺序返回下一个未完成的条目"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry["state"] in UNFINISHED:
+                    return dict(entry)
+        return None
+
+    def unfinished(self):
+        with self._lock:
+            return [dict(e) for e in self._entries.values() if e["state"] in UNFINISHED]
+
+    def compact(self):
+        """只保留未完成的条目重写日志（写临时文件后原子替换）"""
+        with self._lock:
+            self._entries = {k: e for k, e in self._entries.items() if e["state"] in UNFINISHED}
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(dict(entry, op="add"), ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def is_network_error(error):
+    """连接失败、超时等可稍后重试的错误"""
+    from github_manager import network_errors
+
+    return isinstance(error, network_errors())
+
+
+def upload_entry(journal, entry, config):
+    """幂等地上传一个队列条目，返回contents API的文件条目
+
+    网络错误原样抛出，条目保持未完成状态以便稍后重试；其他错误把条目标记为失败。
+    """
+    config = dict(config, repo=entry["repo"], branch=entry["branch"])
+    target = entry["target"]
+
+    if entry["state"] == IN_FLIGHT and entry.get("sha"):
+        # 上次可能已写入成功但未来得及记录
+        remote = GitHubImageManager.get_file_item(target, config)
+        if remote is not None and remote["sha"] == entry["sha"]:
+            journal.mark(entry["id"], COMMITTED, remote_sha=remote["sha"])
+            return remote
+
+    try:
+        with open(entry["file"], "rb") as f:
+            data = f.read()
+    except OSError as e:
+        journal.mark(entry["id"], FAILED, error=str(e))
+        raise
+    sha = git_blob_sha(data)
+    journal.mark(entry["id"], IN_FLIGHT, sha=sha)
+
+    try:
+        item = GitHubImageManager.upload_content(
+            data, target, f"Upload {os.path.basename(target)}", config
+        )
+    except Exception as e:
+        if is_network_error(e):
+            raise
+        # 目标已存在且内容相同（例如响应丢失后的重试），同样视为成功
+        remote = GitHubImageManager.get_file_item(target, config)
+        if remote is not None and remote["sha"] == sha:
+            journal.mark(entry["id"], COMMITTED, remote_sha=remote["sha"])
+            return remote
+        journal.mark(entry["id"], FAILED, error=str(e))
+        raise
+
+    journal.mark(entry["id"], COMMITTED, remote_sha=item["sha"])
+    return item
@@ -0,0 +1,230 @@
+"""监视文件夹，自动上传新出现的图片
+
+Linux 上使用 inotify（通过 ctypes，无额外依赖），其他平台退回到定时扫描。
+每个文件要等到写入完成（大小与修改时间在 settle 秒内不再变化）才算就绪；
+debounce 秒内连续出现的文件合并为一批，交给回调一次处理。
+只上传新出现的路径：启动前已存在、已上传过的文件再被修改时不会重复上传。
+回调抛出异常（网络错误、限流等）时这一批重新排队，按指数退避稍后重试，不会丢失。
+空闲时 inotify 线程阻塞在 select 上，不占用 CPU。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from image_library import IMAGE_EXTENSIONS
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _open_inotify(directory):
+    """创建 inotify 监视，返回文件描述符；不支持时返回 None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        wd = libc.inotify_add_watch(
+            fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_MOVED_FROM
+        )
+        if wd < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class FolderWatcher:
+    """监视单个目录中新出现的图片文件"""
+    def __init__(self, directory, on_batch, on_error=None, debounce=2.0, settle=1.0,
+                 poll_interval=2.0, use_inotify=True, retry_delay=5.0, max_retry_delay=60.0):
+        self.directory = os.path.abspath(directory)
+        self.on_batch = on_batch
+        self.on_error = on_error
+        self.debounce = debounce
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.backend = None
+        self._pending = {}   # 路径 -> (最后一次变化的时间, 当时的大小)
+        self._known = set()  # 启动时已存在或已上传的文件名，之后的修改不再上传
+        self._retry_at = 0.0
+        self._next_delay = retry_delay
+        self._stop = threading.Event()
+        self._pipe_lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+
+    def start(self):
+        if not os.path.isdir(self.directory):
+            raise ValueError(f"目录不存在: {self.directory}")
+        fd = _open_inotify(self.directory) if self.use_inotify else None
+        # 启动前已存在的文件不上传
+        initial = self._snapshot()
+        self._known = set(initial)
+        if fd is not None:
+            self.backend = "inotify"
+            target = lambda: self._run_inotify(fd)
+        else:
+            self.backend = "polling"
+            target = lambda: self._run_polling(initial)
+        self._thread = threading.Thread(target=self._run, args=(target,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监视；可在任意线程（包括回调所在的监视线程）中调用"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        with self._pipe_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"x")
+        if self._thread is None:
+            self._close_pipe()
+        elif self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _run(self, target):
+        # 唤醒管道由监视线程退出时关闭，stop() 在哪个线程调用都不会泄漏
+        try:
+            target()
+        finally:
+            self._close_pipe()
+
+    def _close_pipe(self):
+        with self._pipe_lock:
+            if self._wake_r is not None:
+                os.close(self._wake_r)
+                os.close(self._wake_w)
+                self._wake_r = self._wake_w = None
+
+    def wait(self):
+        """阻塞直到 stop() 被调用（命令行模式使用）"""
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=0.5)
+
+    # ---- 就绪判断与批处理 ----
+    def _note(self, name):
+        if not name.lower().endswith(IMAGE_EXTENSIONS) or name.startswith(".") or name in self._known:
+            return
+        path = os.path.join(self.directory, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self._pending[path] = (time.monotonic(), size)
+
+    def _next_timeout(self):
+        """距离下一次需要检查的秒数；没有待处理文件时返回None（无限等待）"""
+        if not self._pending:
+            return None
+        latest = max(t for t, _ in self._pending.values())
+        due = max(latest + max(self.debounce, self.settle), self._retry_at)
+        return max(0.05, due - time.monotonic())
+
+    def _flush_ready(self):
+        """最近一次变化距今超过 debounce 时，把已写完的文件作为一批交出"""
+        if not self._pending:
+            return
+        now = time.monotonic()
+        if now < self._retry_at or now - max(t for t, _ in self._pending.values()) < self.debounce:
+            return
+
+        ready = {}
+        for path, (changed_at, size) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if stat.st_size != size or time.time() - stat.st_mtime < self.settle:
+                # 仍在写入，重新计时
+                self._pending[path] = (now, stat.st_size)
+                continue
+            ready[path] = stat.st_size
+            del self._pending[path]
+
+        if not ready:
+            return
+        try:
+            self.on_batch(sorted(ready))
+        except Exception as e:
+            # 整批重新排队，退避后重试（期间新出现的文件会并入同一批）
+            for path, size in ready.items():
+                self._pending.setdefault(path, (now, size))
+            self._retry_at = time.monotonic() + self._next_delay
+            self._next_delay = min(self._next_delay * 2, self.max_retry_delay)
+            if self.on_error:
+                self.on_error(e)
+            return
+        self._known.update(os.path.basename(path) for path in ready)
+        self._next_delay = self.retry_delay
+
+    # ---- 后端 ----
+    def _run_inotify(self, fd):
+        buffer_size = 64 * 1024
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd, self._wake_r], [], [], self._next_timeout())
+                if fd in readable:
+                    data = os.read(fd, buffer_size)
+                    offset = 0
+                    while offset + _EVENT_HEADER.size <= len(data):
+                        _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                        offset += _EVENT_HEADER.size
+                        name = data[offset:offset + length].rstrip(b"\0")
+                        offset += length
+                        if not name:
+                            continue
+                        if mask & (IN_DELETE | IN_MOVED_FROM):
+                            self._forget(os.fsdecode(name))
+                        else:
+                            self._note(os.fsdecode(name))
+                self._flush_ready()
+        finally:
+            os.close(fd)
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            if self.on_error:
+                self.on_error(e)
+        return snapshot
+
+    def _forget(self, name):
+        """文件被删除或移走：之后同名的新文件再次视为新文件"""
+        self._known.discard(name)
+        self._pending.pop(os.path.join(self.directory, name), None)
+
+    def _run_polling(self, previous):
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            for name in previous.keys() - current.keys():
+                self._forget(name)
+            for name, state in current.items():
+                if previous.get(name) != state:
+                    self._note(name)
+            previous = current
+            self._flush_ready()